@@ -0,0 +1,86 @@
+"""
+DaSiamRPN throughput on the CPU, tracking several targets per frame either
+one forward pass per target (update) or one batched pass per frame
+(update_many), on a synthetic video (see synthetic.py):
+
+    python -m benchmarks.dasiamrpn --targets 1 4 8 --threads 1 4
+
+Needs the DaSiamRPN submodule with its SiamRPNVOT.model and torch, or
+with --backend onnx only the files written by label_dasiamrpn_onnx. For
+every (threads, targets) pair it prints the tracked target-frames per
+second of both modes.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks.synthetic import make_video
+from open_labeling.dasiamrpn import BACKENDS, dasiamrpn, get_net, set_num_threads
+from open_labeling.tracking import find_frame_paths
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="DaSiamRPN per-target against batched multi-target throughput")
+    parser.add_argument("--targets", nargs="*", type=int, default=[1, 4, 8])
+    parser.add_argument("--threads", nargs="*", type=int, default=[1, 4])
+    parser.add_argument("--backend", default="torch", choices=BACKENDS)
+    parser.add_argument("--n-frames", default=50, type=int)
+    parser.add_argument("--width", default=1280, type=int)
+    parser.add_argument("--height", default=720, type=int)
+    parser.add_argument("--box-size", default=120, type=int)
+    args = parser.parse_args()
+    return args
+
+
+def init_trackers(init_frame, box, n_targets, backend):
+    xmin, ymin, xmax, ymax = box
+    trackers = []
+    for _ in range(n_targets):
+        tracker = dasiamrpn(backend)
+        tracker.init(init_frame, (xmin, ymin, xmax - xmin, ymax - ymin))
+        trackers.append(tracker)
+    return trackers
+
+
+def run_mode(frames, box, n_targets, backend, batched):
+    # every target starts on the same box, the cost per frame is what is measured
+    trackers = init_trackers(frames[0], box, n_targets, backend)
+    start = time.perf_counter()
+    for frame in frames[1:]:
+        if batched:
+            dasiamrpn.update_many(trackers, frame)
+        else:
+            for tracker in trackers:
+                tracker.update(frame)
+    return time.perf_counter() - start
+
+
+def main(args):
+    get_net(args.backend)  # load the model before timing
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        gt_boxes = make_video(
+            tmp_dir / "video", args.n_frames, args.width, args.height, box_size=args.box_size
+        )
+        frames = [cv2.imread(str(path)) for path in find_frame_paths(tmp_dir / "video")]
+    n_updates = len(frames) - 1
+    print("{:<10}{:>10}{:>16}{:>16}{:>10}".format("threads", "targets", "update/s", "update_many/s", "speedup"))
+    for n_threads in args.threads:
+        set_num_threads(n_threads)
+        for n_targets in args.targets:
+            single = run_mode(frames, gt_boxes[0], n_targets, args.backend, batched=False)
+            batched = run_mode(frames, gt_boxes[0], n_targets, args.backend, batched=True)
+            print("{:<10}{:>10}{:>16.1f}{:>16.1f}{:>10.2f}".format(
+                n_threads,
+                n_targets,
+                n_updates * n_targets / single,
+                n_updates * n_targets / batched,
+                single / batched,
+            ))
+
+
+if __name__ == "__main__":
+    main(get_args())
@@ -0,0 +1,78 @@
+"""
+Frame extraction throughput: the old sequential read + imwrite loop against
+extract_frames with 1 and more encoding threads, on a synthetic video:
+
+    python -m benchmarks.extract_frames --width 1920 --height 1080 --n-frames 200
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks.synthetic import make_video
+from open_labeling.extract_frames import extract_frames
+from open_labeling.tracking import find_frame_paths
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Frames per second of video to frames extraction")
+    parser.add_argument("--n-frames", default=200, type=int)
+    parser.add_argument("--width", default=1920, type=int)
+    parser.add_argument("--height", default=1080, type=int)
+    parser.add_argument("--workers", nargs="*", type=int, default=[1, os.cpu_count() or 1])
+    parser.add_argument("--format", default=".jpg")
+    args = parser.parse_args()
+    return args
+
+
+def write_video(video_path: Path, frames_dir: Path, n_frames, width, height):
+    make_video(frames_dir, n_frames, width, height, box_size=height // 6)
+    writer = cv2.VideoWriter(str(video_path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    for frame_path in find_frame_paths(frames_dir):
+        writer.write(cv2.imread(str(frame_path)))
+    writer.release()
+
+
+def sequential_extract(video_path: Path, out_dir: Path, img_format):
+    # what convert_video_to_images did before
+    out_dir.mkdir()
+    cap = cv2.VideoCapture(str(video_path))
+    i = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        cv2.imwrite(str(out_dir / "frame_{}{}".format(i, img_format)), frame)
+        i += 1
+    cap.release()
+    return i
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        video_path = tmp_dir / "video.avi"
+        write_video(video_path, tmp_dir / "source_frames", args.n_frames, args.width, args.height)
+
+        start = time.perf_counter()
+        n_frames = sequential_extract(video_path, tmp_dir / "sequential", args.format)
+        print("{:<24}{:>10.1f} frames/s".format("sequential", n_frames / (time.perf_counter() - start)))
+        for n_workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            _frames_dir, _video_name_ext, n_written = extract_frames(
+                video_path,
+                img_format=args.format,
+                n_workers=n_workers,
+                frames_dir=tmp_dir / "workers_{}".format(n_workers),
+                progress=False,
+            )
+            print("{:<24}{:>10.1f} frames/s".format(
+                "extract_frames x{}".format(n_workers), n_written / (time.perf_counter() - start)
+            ))
+
+
+if __name__ == "__main__":
+    main(get_args())
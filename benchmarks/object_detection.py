@@ -0,0 +1,54 @@
+"""
+Detector throughput on the CPU against batch size, with
+detect() one image at a time as the baseline:
+
+    python -m benchmarks.object_detection \
+        object_detection/models/ssdlite_mobilenet_v2_coco_2018_05_09/frozen_inference_graph.pb \
+        --batch-sizes 1 2 4 8 16
+
+Needs tensorflow and a frozen detection graph; an ONNX model, or a
+graph with its --config text graph, runs on OpenCV's dnn module only.
+The images are random noise of one size, so every batch is full; a real
+folder also pays for decoding.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from object_detection.detector import BACKENDS, create_detector
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Detector images per second against batch size")
+    parser.add_argument("graph_path", help="Frozen inference graph (.pb) or ONNX model.")
+    parser.add_argument("--backend", choices=BACKENDS, default=None)
+    parser.add_argument("--config", default=None, help="Text graph for the dnn backend.")
+    parser.add_argument("--batch-sizes", nargs="*", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--n-images", default=64, type=int)
+    parser.add_argument("--width", default=640, type=int)
+    parser.add_argument("--height", default=480, type=int)
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    detector = create_detector(args.graph_path, 0.5, None, args.backend, args.config)
+    rng = np.random.default_rng(0)
+    images = [
+        rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.n_images)
+    ]
+    detector.detect(images[0])  # warm up the session
+    print("{:<12}{:>12}".format("batch size", "images/s"))
+    start = time.perf_counter()
+    for im in images:
+        detector.detect(im)
+    print("{:<12}{:>12.1f}".format("detect", len(images) / (time.perf_counter() - start)))
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        detector.detect_batch(images, batch_size)
+        print("{:<12}{:>12.1f}".format(batch_size, len(images) / (time.perf_counter() - start)))
+
+
+if __name__ == "__main__":
+    main(get_args())
@@ -0,0 +1,67 @@
+"""
+Synthetic video used by the benchmarks: a textured square moving over a
+noisy textured background, written as numbered frames with the ground
+truth box of every frame and a YOLO_darknet seed annotation on the first.
+"""
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from open_labeling.yolo_annotations import yolo_format
+
+Box = Tuple[int, int, int, int]  # xmin, ymin, xmax, ymax
+
+
+def make_video(
+    video_dir,
+    n_frames: int = 100,
+    width: int = 1280,
+    height: int = 720,
+    box_size: int = 120,
+    speed: float = 4.0,
+    img_format: str = ".jpg",
+    seed: int = 0,
+    occluder_width: int = 0,
+) -> List[Box]:
+    """
+    Writes the frames and returns the ground truth box of each. A non-zero
+    occluder_width draws a static vertical band at three quarters of the
+    frame width that passes in front of the target.
+    """
+    video_dir = Path(video_dir)
+    video_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (7, 7), 0)
+    target = rng.integers(0, 255, (box_size // 8, box_size // 8, 3), dtype=np.uint8)
+    target = cv2.resize(target, (box_size, box_size), interpolation=cv2.INTER_NEAREST)
+    boxes = []
+    for i in range(n_frames):
+        # move along a smooth Lissajous path inside the frame
+        t = i * speed / max(width, height) * 2 * np.pi
+        xmin = int((width - box_size) * (0.5 + 0.4 * np.sin(t)))
+        ymin = int((height - box_size) * (0.5 + 0.4 * np.sin(1.5 * t)))
+        frame = background.copy()
+        frame[ymin:ymin + box_size, xmin:xmin + box_size] = target
+        if occluder_width > 0:
+            band_x = width * 3 // 4
+            frame[:, band_x:band_x + occluder_width] = background[:, :occluder_width]
+        cv2.imwrite(str(video_dir / f"frame_{i}{img_format}"), frame)
+        boxes.append((xmin, ymin, xmin + box_size, ymin + box_size))
+    ann_dir = video_dir / "YOLO_darknet"
+    ann_dir.mkdir(exist_ok=True)
+    xmin, ymin, xmax, ymax = boxes[0]
+    (ann_dir / "frame_0.txt").write_text(yolo_format(0, (xmin, ymin), (xmax, ymax), width, height) + "\n")
+    return boxes
+
+
+def iou(box_a: Box, box_b: Box) -> float:
+    inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return inter / float(area_a + area_b - inter)
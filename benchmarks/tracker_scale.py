@@ -0,0 +1,86 @@
+"""
+Tracking throughput against box accuracy for each tracker type and
+tracker scale, on a synthetic video (see synthetic.py):
+
+    python -m benchmarks.tracker_scale --width 3840 --height 2160 --n-frames 100
+
+For every (tracker, scale) pair it prints the tracked frames per second,
+the mean IoU of the predicted boxes with the ground truth and the mean
+IoU with the full-resolution predictions of the same tracker (the drift
+caused by tracking at reduced resolution).
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks.synthetic import iou, make_video
+from open_labeling.tracker_journal import TrackerJournal
+from open_labeling.tracking import TRACKER_SCALES, LabelTracker, available_tracker_types, find_frame_paths
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Tracker throughput and IoU drift per tracker scale")
+    parser.add_argument("--trackers", nargs="*", default=available_tracker_types())
+    parser.add_argument("--scales", nargs="*", type=int, default=TRACKER_SCALES)
+    parser.add_argument("--n-frames", default=100, type=int)
+    parser.add_argument("--width", default=3840, type=int)
+    parser.add_argument("--height", default=2160, type=int)
+    parser.add_argument("--box-size", default=240, type=int)
+    args = parser.parse_args()
+    return args
+
+
+def run_tracker(tmp_dir: Path, frame_paths, gt_boxes, tracker_type, scale):
+    journal = TrackerJournal(tmp_dir / ".tracker" / f"{tracker_type}_{scale}.json")
+    init_frame = cv2.imread(str(frame_paths[0]))
+    label_tracker = LabelTracker(tracker_type, init_frame, frame_paths[1:], scale=scale)
+    start = time.perf_counter()
+    label_tracker.start_trackers(
+        journal, frame_paths[0], [[0, *gt_boxes[0]]], len(frame_paths), lambda frame_path, lines: None
+    )
+    elapsed = time.perf_counter() - start
+    boxes = {}
+    for frame_path, obj_dict in journal.track(0).items():
+        bbox = obj_dict["bbox"]
+        boxes[frame_path] = (bbox["xmin"], bbox["ymin"], bbox["xmax"], bbox["ymax"])
+    return boxes, elapsed
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        gt_boxes = make_video(
+            tmp_dir / "video", args.n_frames, args.width, args.height, box_size=args.box_size
+        )
+        frame_paths = find_frame_paths(tmp_dir / "video")
+        gt = {str(path): box for path, box in zip(frame_paths, gt_boxes)}
+        print("{:<12}{:>6}{:>10}{:>10}{:>12}{:>10}".format("tracker", "scale", "frames", "fps", "IoU(gt)", "drift"))
+        for tracker_type in args.trackers:
+            full_res_boxes = None
+            for scale in sorted(args.scales):
+                try:
+                    boxes, elapsed = run_tracker(tmp_dir, frame_paths, gt_boxes, tracker_type, scale)
+                except (AttributeError, cv2.error) as error:
+                    print("{:<12} not available: {}".format(tracker_type, error))
+                    break
+                tracked = [path for path in boxes if path != str(frame_paths[0])]
+                fps = len(tracked) / elapsed if elapsed > 0 else float("inf")
+                iou_gt = sum(iou(boxes[path], gt[path]) for path in tracked) / max(1, len(tracked))
+                if scale == 1:
+                    full_res_boxes = boxes
+                drift = ""
+                if full_res_boxes is not None and tracked:
+                    common = [path for path in tracked if path in full_res_boxes]
+                    drift = "{:.3f}".format(
+                        sum(iou(boxes[path], full_res_boxes[path]) for path in common) / max(1, len(common))
+                    )
+                print("{:<12}{:>6}{:>10}{:>10.1f}{:>12.3f}{:>10}".format(
+                    tracker_type, scale, len(tracked), fps, iou_gt, drift
+                ))
+
+
+if __name__ == "__main__":
+    main(get_args())
@@ -0,0 +1,99 @@
+"""
+Compares the tracker types on procedurally generated sequences with known
+ground truth (see synthetic.py):
+
+    python -m benchmarks.trackers --n-frames 150
+
+For every tracker and sequence it prints the tracked frames per second,
+the mean IoU with the ground truth over the whole sequence (frames after
+a failure count as 0) and the failure frame: the first frame where the
+tracker gave up or its IoU dropped below --fail-iou ("-" if none).
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks.synthetic import iou, make_video
+from open_labeling.tracker_journal import TrackerJournal
+from open_labeling.tracking import LabelTracker, available_tracker_types, find_frame_paths
+
+# name -> make_video keyword arguments
+SEQUENCES = {
+    "slow": {"speed": 2.0},
+    "fast": {"speed": 12.0},
+    "small": {"box_size": 32, "speed": 4.0},
+    "occluded": {"speed": 6.0, "occluder_width": 60},
+}
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Speed and accuracy of each tracker type on synthetic sequences")
+    parser.add_argument("--trackers", nargs="*", default=available_tracker_types())
+    parser.add_argument("--sequences", nargs="*", default=list(SEQUENCES), choices=list(SEQUENCES))
+    parser.add_argument("--n-frames", default=150, type=int)
+    parser.add_argument("--width", default=1280, type=int)
+    parser.add_argument("--height", default=720, type=int)
+    parser.add_argument("--fail-iou", default=0.3, type=float)
+    args = parser.parse_args()
+    return args
+
+
+def evaluate(tmp_dir: Path, frame_paths, gt_boxes, tracker_type, fail_iou):
+    """
+    Returns (fps, mean IoU, failure frame or None) of one tracker on one sequence.
+    """
+    journal = TrackerJournal(tmp_dir / ".tracker" / f"{tracker_type}.json")
+    init_frame = cv2.imread(str(frame_paths[0]))
+    label_tracker = LabelTracker(tracker_type, init_frame, frame_paths[1:])
+    start = time.perf_counter()
+    label_tracker.start_trackers(
+        journal, frame_paths[0], [[0, *gt_boxes[0]]], len(frame_paths), lambda frame_path, lines: None
+    )
+    elapsed = time.perf_counter() - start
+    track = journal.track(0)
+
+    ious = []
+    failure_frame = None
+    for i, (frame_path, gt_box) in enumerate(zip(frame_paths[1:], gt_boxes[1:]), start=1):
+        obj_dict = track.get(str(frame_path))
+        if obj_dict is None:
+            frame_iou = 0.0
+        else:
+            bbox = obj_dict["bbox"]
+            frame_iou = iou((bbox["xmin"], bbox["ymin"], bbox["xmax"], bbox["ymax"]), gt_box)
+        if failure_frame is None and frame_iou < fail_iou:
+            failure_frame = i
+        ious.append(frame_iou)
+    n_tracked = len(track) - 1
+    fps = n_tracked / elapsed if elapsed > 0 else float("inf")
+    return fps, sum(ious) / max(1, len(ious)), failure_frame
+
+
+def main(args):
+    print("{:<12}{:<10}{:>10}{:>10}{:>10}".format("tracker", "sequence", "fps", "IoU", "failure"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        sequences = {}
+        for name in args.sequences:
+            video_dir = tmp_dir / name
+            gt_boxes = make_video(video_dir, args.n_frames, args.width, args.height, **SEQUENCES[name])
+            sequences[name] = (find_frame_paths(video_dir), gt_boxes)
+        for tracker_type in args.trackers:
+            for name, (frame_paths, gt_boxes) in sequences.items():
+                try:
+                    fps, mean_iou, failure_frame = evaluate(
+                        tmp_dir / name, frame_paths, gt_boxes, tracker_type, args.fail_iou
+                    )
+                except (AttributeError, cv2.error) as error:
+                    print("{:<12} not available: {}".format(tracker_type, str(error).splitlines()[0]))
+                    break
+                print("{:<12}{:<10}{:>10.1f}{:>10.3f}{:>10}".format(
+                    tracker_type, name, fps, mean_iou, "-" if failure_frame is None else failure_frame
+                ))
+
+
+if __name__ == "__main__":
+    main(get_args())
@@ -0,0 +1,117 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+CACHE_FILE_NAME = ".detection_cache.sqlite"
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def bytes_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_hash(path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DetectionCache:
+    """
+    Unfiltered detector outputs keyed by (model file hash, image content
+    hash), so that a new score threshold or object id filter is applied to
+    cached outputs instead of running the model again, and renamed or
+    copied images are still found.
+
+    Only the num_detections valid rows are stored, boxes and scores as
+    float32 and classes as uint16 blobs: about 22 bytes per detection.
+    """
+
+    def __init__(self, db_path, model_hash: str):
+        self.model_hash = model_hash
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS detections (
+                model_hash TEXT NOT NULL,
+                image_hash TEXT NOT NULL,
+                boxes BLOB NOT NULL,
+                scores BLOB NOT NULL,
+                classes BLOB NOT NULL,
+                PRIMARY KEY (model_hash, image_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+
+    def get_many(self, image_hashes: Iterable[str]) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        The cached outputs of the given images that are in the cache, in
+        the per-image layout of ObjectDetector.detect_raw.
+        """
+        image_hashes = list(set(image_hashes))
+        found = {}
+        with self._lock:
+            # stay below SQLite's limit on query parameters
+            for start in range(0, len(image_hashes), 500):
+                chunk = image_hashes[start:start + 500]
+                rows = self.conn.execute(
+                    "SELECT image_hash, boxes, scores, classes FROM detections "
+                    "WHERE model_hash = ? AND image_hash IN ({})".format(",".join("?" * len(chunk))),
+                    (self.model_hash, *chunk),
+                ).fetchall()
+                for image_hash, boxes, scores, classes in rows:
+                    found[image_hash] = decode_outputs(boxes, scores, classes)
+        return found
+
+    def put_many(self, items: List[Tuple[str, Dict[str, np.ndarray]]]):
+        rows = [(self.model_hash, image_hash, *encode_outputs(output)) for image_hash, output in items]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO detections (model_hash, image_hash, boxes, scores, classes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def __contains__(self, image_hash: str) -> bool:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT 1 FROM detections WHERE model_hash = ? AND image_hash = ?", (self.model_hash, image_hash)
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM detections WHERE model_hash = ?", (self.model_hash,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def encode_outputs(output: Dict[str, np.ndarray]) -> Tuple[bytes, bytes, bytes]:
+    n = int(output["num_detections"][0])
+    return (
+        output["detection_boxes"][0, :n].astype(np.float32).tobytes(),
+        output["detection_scores"][0, :n].astype(np.float32).tobytes(),
+        output["detection_classes"][0, :n].astype(np.uint16).tobytes(),
+    )
+
+
+def decode_outputs(boxes: bytes, scores: bytes, classes: bytes) -> Dict[str, np.ndarray]:
+    scores = np.frombuffer(scores, dtype=np.float32)
+    return {
+        "num_detections": np.array([len(scores)], dtype=np.float32),
+        "detection_boxes": np.frombuffer(boxes, dtype=np.float32).reshape(1, -1, 4),
+        "detection_scores": scores.reshape(1, -1),
+        "detection_classes": np.frombuffer(classes, dtype=np.uint16).astype(np.float32).reshape(1, -1),
+    }
@@ -0,0 +1,213 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import json
+import re
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+from object_detection.cache import bytes_hash, file_hash
+from object_detection.utils import RAW_OUTPUT_KEYS, post_process_batch, stack_outputs
+
+BATCH_SIZE = 8  # images per forward pass in detect_batch
+BACKENDS = ["tf", "dnn"]
+DNN_INPUT_SIZE = (300, 300)  # width, height of the SSD models of the TF detection model zoo
+DNN_SCALE = 1.0
+DNN_MEAN = (0, 0, 0)
+
+
+class BaseDetector(ABC):
+    """
+    What pre-labelling needs from a detector, whatever runs the model.
+    Subclasses implement detect_raw(), returning per image the outputs of
+    the TF object detection API (num_detections, detection_boxes as
+    normalized ymin, xmin, ymax, xmax, detection_scores and
+    detection_classes, each with a batch axis of one); filtering and
+    scaling are shared, so every backend gives the same
+    (boxes, scores, class_indices) as ObjectDetector.detect.
+    """
+
+    def __init__(self, score_threshold, objIds):
+        self.score_threshold = score_threshold  # object score threshold
+        self.objIds = objIds  # Only those object Ids can be gotten
+
+    @abstractmethod
+    def detect_raw(self, images, batch_size=BATCH_SIZE) -> List[Dict[str, np.ndarray]]:
+        pass
+
+    def detect(self, im):  # Assume the image is in RGB color space
+        return self.detect_batch([im], 1)[0]
+
+    def detect_batch(self, images, batch_size=BATCH_SIZE) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        detect() for a list of RGB images, see detect_raw(). The outputs of
+        all images are filtered and scaled together.
+        """
+        if not images:
+            return []
+        output_dict = stack_outputs(self.detect_raw(images, batch_size))
+        image_sizes = [(im.shape[1], im.shape[0]) for im in images]
+        boxes, scores, class_indices = post_process_batch(
+            output_dict, image_sizes, self.score_threshold, self.objIds
+        )
+        return list(zip(boxes, scores, class_indices))
+
+
+def detection_output_to_raw(detections: np.ndarray, n_images: int, class_offset: int = 0) -> List[Dict[str, np.ndarray]]:
+    """
+    Splits the (1, 1, n, 7) output of an OpenCV DetectionOutput layer, rows
+    of (image index, class id, score, x1, y1, x2, y2) normalized, into the
+    per-image layout of BaseDetector.detect_raw.
+    """
+    detections = detections.reshape(-1, 7)
+    outputs = []
+    for i in range(n_images):
+        rows = detections[detections[:, 0] == i]
+        outputs.append({
+            "num_detections": np.array([len(rows)], dtype=np.float32),
+            "detection_boxes": rows[:, [4, 3, 6, 5]].astype(np.float32)[np.newaxis],
+            "detection_scores": rows[:, 2].astype(np.float32)[np.newaxis],
+            "detection_classes": (rows[:, 1] + class_offset).astype(np.float32)[np.newaxis],
+        })
+    return outputs
+
+
+def net_outputs_to_raw(
+    output_names: List[str], net_outputs: List[np.ndarray], n_images: int, class_offset: int = 0
+) -> List[Dict[str, np.ndarray]]:
+    """
+    The per-image layout of BaseDetector.detect_raw from the outputs of a
+    network: either a single DetectionOutput layer (see
+    detection_output_to_raw) or the four outputs of the TF object
+    detection API (RAW_OUTPUT_KEYS), as in ONNX exports of its models,
+    found by name (a "/" scope and ":0" suffix are ignored).
+    """
+    if len(net_outputs) == 1 and net_outputs[0].shape[-1] == 7:
+        return detection_output_to_raw(net_outputs[0], n_images, class_offset)
+    by_key = {
+        re.sub(r":\d+$", "", name).rsplit("/", 1)[-1]: output for name, output in zip(output_names, net_outputs)
+    }
+    missing = [key for key in RAW_OUTPUT_KEYS if key not in by_key]
+    if missing:
+        raise ValueError(
+            "The model has neither a DetectionOutput layer nor the outputs {} (it has {})".format(
+                ", ".join(missing), ", ".join(output_names)
+            )
+        )
+    num_detections = by_key["num_detections"].reshape(n_images).astype(np.float32)
+    boxes = by_key["detection_boxes"].reshape(n_images, -1, 4).astype(np.float32)
+    scores = by_key["detection_scores"].reshape(n_images, -1).astype(np.float32)
+    classes = (by_key["detection_classes"].reshape(n_images, -1) + class_offset).astype(np.float32)
+    return [
+        {
+            "num_detections": num_detections[i:i + 1],
+            "detection_boxes": boxes[i:i + 1],
+            "detection_scores": scores[i:i + 1],
+            "detection_classes": classes[i:i + 1],
+        }
+        for i in range(n_images)
+    ]
+
+
+class DnnObjectDetector(BaseDetector):
+    """
+    A detector run with cv2.dnn on the CPU: a TF frozen graph with the
+    text graph OpenCV needs for it (tf_text_graph_ssd.py), whose output is
+    an SSD DetectionOutput layer, or an ONNX model with either that output
+    or the four outputs of the TF object detection API (num_detections,
+    detection_boxes, ...) and an NCHW float input, as blobFromImages
+    makes. Only OpenCV is needed, so there is no tensorflow import at
+    startup.
+
+    Images are resized to input_size and sent through the network in
+    batches of batch_size with cv2.dnn.blobFromImages; class_offset is
+    added to the class ids so that they match the ids of the TF model.
+    """
+
+    def __init__(
+        self,
+        model_path,
+        score_threshold,
+        objIds,
+        config_path=None,
+        input_size: Tuple[int, int] = DNN_INPUT_SIZE,
+        scale: float = DNN_SCALE,
+        mean: Tuple[float, float, float] = DNN_MEAN,
+        class_offset: int = 0,
+    ):
+        super().__init__(score_threshold, objIds)
+        if config_path is None:
+            self.net = cv2.dnn.readNet(str(model_path))
+        else:
+            self.net = cv2.dnn.readNet(str(model_path), str(config_path))
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.output_names = list(self.net.getUnconnectedOutLayersNames())
+        self.input_size = tuple(input_size)
+        self.scale = scale
+        self.mean = mean
+        self.class_offset = class_offset
+
+    def detect_raw(self, images, batch_size=BATCH_SIZE):
+        outputs = []
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            # the images are RGB already, as for ObjectDetector
+            blob = cv2.dnn.blobFromImages(batch, self.scale, self.input_size, self.mean, swapRB=False)
+            self.net.setInput(blob)
+            net_outputs = self.net.forward(self.output_names)
+            outputs.extend(net_outputs_to_raw(self.output_names, net_outputs, len(batch), self.class_offset))
+        return outputs
+
+
+def select_backend(model_path, backend: Optional[str] = None, config_path=None) -> str:
+    """
+    `backend` if given, else "dnn" for ONNX models or when a text graph is
+    given and "tf" for a bare frozen graph.
+    """
+    if backend is not None:
+        return backend
+    return "dnn" if Path(model_path).suffix.lower() == ".onnx" or config_path is not None else "tf"
+
+
+def model_hash(
+    model_path,
+    backend: str,
+    config_path=None,
+    input_size: Tuple[int, int] = DNN_INPUT_SIZE,
+    scale: float = DNN_SCALE,
+    mean: Tuple[float, float, float] = DNN_MEAN,
+    class_offset: int = 0,
+) -> str:
+    """
+    Identifies what the raw outputs of a detector depend on, for the
+    detection cache: the model file and, with the dnn backend, the text
+    graph and the preprocessing settings of DnnObjectDetector. With the tf
+    backend it is the hash of the model file, as before the dnn backend.
+    """
+    if backend != "dnn":
+        return file_hash(model_path)
+    settings = {
+        "model": file_hash(model_path),
+        "backend": backend,
+        "config": file_hash(config_path) if config_path is not None else None,
+        "input_size": list(input_size),
+        "scale": scale,
+        "mean": list(mean),
+        "class_offset": class_offset,
+    }
+    return bytes_hash(json.dumps(settings, sort_keys=True).encode())
+
+
+def create_detector(model_path, score_threshold, objIds, backend: Optional[str] = None, config_path=None, **kwargs):
+    """
+    The detector for a model file, run by the backend of select_backend();
+    kwargs go to DnnObjectDetector.
+    """
+    if select_backend(model_path, backend, config_path) == "dnn":
+        return DnnObjectDetector(model_path, score_threshold, objIds, config_path, **kwargs)
+    from object_detection.tf_object_detection import ObjectDetector
+
+    return ObjectDetector(model_path, score_threshold, objIds)
@@ -0,0 +1,422 @@
+import argparse
+import configparser
+import os
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from object_detection.cache import CACHE_FILE_NAME, DetectionCache, bytes_hash
+from object_detection.detector import BACKENDS, DNN_INPUT_SIZE, create_detector, model_hash, select_backend
+from object_detection.utils import ColumnarResults, post_process_batch, stack_outputs
+from open_labeling.common import IMAGE_SUFFIXES, natural_sort_key
+from open_labeling.frame_pipeline import DECODE_WORKERS, BackgroundWriter, prefetch_frames
+from open_labeling.image_size import get_image_size
+from open_labeling.load_classes import resolve_class_list
+from open_labeling.yolo_annotations import ANNOTATION_DIR, annotation_path_for_image, yolo_format
+
+CONFIG_PATH = Path(__file__).parent.parent / "open_labeling" / "config.ini"
+CHECKPOINT_FILE_NAME = ".prelabel_checkpoint"
+BATCH_SIZE = 8
+
+
+def read_detector_config(config_path=CONFIG_PATH) -> Tuple[float, Optional[List[int]], str]:
+    """
+    Score threshold, object ids (None for all) and CUDA_VISIBLE_DEVICES
+    from the OBJECT_DETECTOR_PARAMETERS section of config.ini.
+    """
+    config = configparser.ConfigParser()
+    config.read(str(config_path))
+    section = config["OBJECT_DETECTOR_PARAMETERS"]
+    score_threshold = section.getfloat("OBJECT_SCORE_THRESHOLD")
+    obj_ids = [int(obj_id) for obj_id in section.get("OBJECT_IDS", "").split(",") if obj_id.strip()]
+    cuda_visible_devices = section.get("CUDA_VISIBLE_DEVICES", "").strip("'\" ")
+    return score_threshold, obj_ids or None, cuda_visible_devices
+
+
+def class_indices_for(
+    detected_ids: np.ndarray, obj_ids: Optional[List[int]], n_classes: Optional[int] = None
+) -> np.ndarray:
+    """
+    YOLO class index of each detected object id: the position of the id in
+    OBJECT_IDS (so class_list.txt lists the classes in that order), or the
+    id - 1 (the detectors count classes from 1) when every id is kept.
+    Indices outside the n_classes of the class list, if given, are -1.
+    """
+    detected_ids = np.asarray(detected_ids, dtype=np.int64)
+    if obj_ids is None:
+        class_indices = detected_ids - 1
+    else:
+        lookup = {obj_id: i for i, obj_id in enumerate(obj_ids)}
+        class_indices = np.array([lookup[obj_id] for obj_id in detected_ids.tolist()], dtype=np.int64)
+    if n_classes is not None:
+        class_indices[(class_indices < 0) | (class_indices >= n_classes)] = -1
+    return class_indices
+
+
+def find_images(root: Path) -> List[Path]:
+    root = Path(root)
+    img_paths = [
+        img_path for img_path in root.rglob("*")
+        if img_path.suffix.lower() in IMAGE_SUFFIXES and ANNOTATION_DIR not in img_path.parts and img_path.is_file()
+    ]
+    return sorted(img_paths, key=natural_sort_key)
+
+
+def has_annotations(img_path: Path) -> bool:
+    ann_path = annotation_path_for_image(img_path)
+    try:
+        with open(ann_path) as f:
+            return f.read().strip() != ""
+    except FileNotFoundError:
+        return False
+
+
+def load_checkpoint(checkpoint_path: Path) -> Dict[str, Optional[str]]:
+    """
+    The images (relative paths) already run through the detector, mapped
+    to the hash of the annotation written for them (None for checkpoints
+    written before the hash was recorded).
+    """
+    done = {}
+    try:
+        with open(checkpoint_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rel_path, _tab, text_hash = line.rstrip("\n").partition("\t")
+                done[rel_path] = text_hash or None
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def annotation_hash(img_path: Path) -> Optional[str]:
+    try:
+        with open(annotation_path_for_image(img_path), "rb") as f:
+            return bytes_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def read_image(img_path, cache: Optional[DetectionCache] = None):
+    """
+    (content hash, (width, height), RGB image) of an image file, or None if
+    it can't be decoded. Images whose detector outputs are in the cache are
+    not decoded: their image is None and the size is read from the header.
+    """
+    data = np.fromfile(str(img_path), dtype=np.uint8)
+    image_hash = bytes_hash(data.tobytes())
+    if cache is not None and image_hash in cache:
+        try:
+            return image_hash, get_image_size(img_path), None
+        except ValueError:
+            return None
+    im = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if im is None:
+        return None
+    return image_hash, (im.shape[1], im.shape[0]), cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
+
+
+class LazyDetector:
+    """
+    Creates the detector (see create_detector) on first use, so that a run
+    answered entirely from the detection cache never loads the model.
+    """
+
+    def __init__(self, graph_path, score_threshold, obj_ids, backend=None, **detector_kwargs):
+        self.graph_path = graph_path
+        self.score_threshold = score_threshold
+        self.objIds = obj_ids
+        self.backend = backend
+        self.detector_kwargs = detector_kwargs
+        self._detector = None
+
+    def _get(self):
+        if self._detector is None:
+            self._detector = create_detector(
+                self.graph_path, self.score_threshold, self.objIds, self.backend, **self.detector_kwargs
+            )
+        return self._detector
+
+    def detect_raw(self, images, batch_size):
+        return self._get().detect_raw(images, batch_size)
+
+    def detect_batch(self, images, batch_size):
+        return self._get().detect_batch(images, batch_size)
+
+
+def detect_cached(
+    detector, cache: DetectionCache, image_hashes: List[str], images: List, image_sizes: List[Tuple[int, int]]
+) -> List:
+    """
+    detector.detect_batch(images) with the unfiltered outputs taken from
+    the cache where possible; the others are computed and cached. Only the
+    images missing from the cache need to be decoded, the others may be
+    None.
+    """
+    outputs = cache.get_many(image_hashes)
+    missing = [i for i, image_hash in enumerate(image_hashes) if image_hash not in outputs]
+    if missing:
+        raw_outputs = detector.detect_raw([images[i] for i in missing], len(missing))
+        new_items = [(image_hashes[i], output) for i, output in zip(missing, raw_outputs)]
+        cache.put_many(new_items)
+        outputs.update(new_items)
+    output_dict = stack_outputs([outputs[image_hash] for image_hash in image_hashes])
+    boxes, scores, class_indices = post_process_batch(
+        output_dict, image_sizes, detector.score_threshold, detector.objIds
+    )
+    return list(zip(boxes, scores, class_indices))
+
+
+def write_batch(root: Path, checkpoint_path: Path, labelled: List[Tuple[Path, List[str]]]):
+    checkpoint_lines = []
+    for img_path, lines in labelled:
+        ann_path = annotation_path_for_image(img_path)
+        ann_path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(line + "\n" for line in lines).encode()
+        with open(ann_path, "wb") as f:
+            f.write(data)
+        checkpoint_lines.append("{}\t{}\n".format(img_path.relative_to(root).as_posix(), bytes_hash(data)))
+    # checkpoint once the annotation files are written
+    with open(checkpoint_path, "a") as f:
+        f.writelines(checkpoint_lines)
+
+
+def prelabel_folder(
+    root,
+    detector,
+    obj_ids: Optional[List[int]],
+    batch_size: int = BATCH_SIZE,
+    n_workers: int = DECODE_WORKERS,
+    checkpoint_path=None,
+    progress: bool = True,
+    cache: Optional[DetectionCache] = None,
+    relabel: bool = False,
+    results: Optional[ColumnarResults] = None,
+    img_paths: Optional[List[Path]] = None,
+    n_classes: Optional[int] = None,
+) -> Tuple[int, int, int]:
+    """
+    Runs every image below root that has no (or an empty) YOLO_darknet
+    annotation through detector.detect_batch and writes the detections as
+    YOLO lines. Images are decoded by a thread pool ahead of the detector
+    and annotation files are written on a background thread.
+
+    Each processed image, with or without detections, is appended to the
+    checkpoint file after its annotation is written, so a restarted run
+    skips everything done before the interruption. With relabel, the
+    images of the checkpoint are labelled again, overwriting the
+    annotations the earlier run wrote (e.g. after changing the score
+    threshold, which the cache then makes cheap). The checkpoint records
+    the hash of each annotation written, so annotations edited since
+    (e.g. corrected in the GUI) are kept and counted as skipped.
+
+    The images are img_paths if given, else find_images(root). The
+    detections of this run are also added to results if given, the image
+    id of an image being its index in that list.
+
+    With n_classes (the length of the class list), detections whose class
+    index falls outside the class list are not written.
+
+    Returns the number of images processed, boxes written and images
+    skipped.
+    """
+    root = Path(root)
+    if checkpoint_path is None:
+        checkpoint_path = root / CHECKPOINT_FILE_NAME
+    checkpoint_path = Path(checkpoint_path)
+    done = load_checkpoint(checkpoint_path)
+    if img_paths is None:
+        img_paths = find_images(root)
+    todo = []
+    n_edited = 0
+    for img_path in img_paths:
+        rel_path = img_path.relative_to(root).as_posix()
+        if rel_path not in done:
+            if not has_annotations(img_path):
+                todo.append(img_path)
+        elif relabel:
+            if done[rel_path] is not None and done[rel_path] == annotation_hash(img_path):
+                todo.append(img_path)
+            else:
+                n_edited += 1
+    if n_edited:
+        print("Keeping {} annotations edited since they were pre-labelled".format(n_edited))
+    image_ids = {img_path: i for i, img_path in enumerate(img_paths)}
+    n_boxes = 0
+    # with a cache, only images without cached outputs are decoded
+    loader = partial(read_image, cache=cache)
+    frames = prefetch_frames(todo, n_workers=n_workers, window=2 * batch_size, loader=loader)
+    writer = BackgroundWriter()
+    try:
+        batch = []
+        for img_path, image in tqdm(frames, total=len(todo), disable=not progress, desc="prelabel"):
+            if image is None:
+                print("Could not read {}".format(img_path))
+                continue
+            batch.append((img_path, *image))
+            if len(batch) == batch_size:
+                n_boxes += detect_and_submit(
+                    root, checkpoint_path, detector, obj_ids, batch, writer, cache, results, image_ids, n_classes
+                )
+                batch = []
+        if batch:
+            n_boxes += detect_and_submit(
+                root, checkpoint_path, detector, obj_ids, batch, writer, cache, results, image_ids, n_classes
+            )
+    finally:
+        frames.close()
+        writer.close()
+    return len(todo), n_boxes, len(img_paths) - len(todo)
+
+
+def detect_and_submit(
+    root, checkpoint_path, detector, obj_ids, batch, writer, cache=None, results=None, image_ids=None, n_classes=None
+) -> int:
+    images = [im for _img_path, _image_hash, _size, im in batch]
+    if cache is None:
+        detections = detector.detect_batch(images, len(batch))
+    else:
+        image_hashes = [image_hash for _img_path, image_hash, _size, _im in batch]
+        image_sizes = [size for _img_path, _image_hash, size, _im in batch]
+        detections = detect_cached(detector, cache, image_hashes, images, image_sizes)
+    labelled = []
+    n_boxes = 0
+    for (img_path, _image_hash, (width, height), _im), (boxes, scores, detected_ids) in zip(batch, detections):
+        if results is not None:
+            results.add(boxes, scores, image_ids[img_path], detected_ids)
+        lines = [
+            yolo_format(class_index, (xmin, ymin), (xmin + w, ymin + h), width, height)
+            for class_index, (xmin, ymin, w, h) in zip(
+                class_indices_for(detected_ids, obj_ids, n_classes).tolist(), boxes.tolist()
+            )
+            if class_index >= 0
+        ]
+        labelled.append((img_path, lines))
+        n_boxes += len(lines)
+    writer.submit(partial(write_batch, root, checkpoint_path), labelled)
+    return n_boxes
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Pre-label a folder of images with an object detector")
+    parser.add_argument(
+        "-f",
+        "--root-folder",
+        required=True,
+        help="Root directory; every image below it without annotations is labelled.",
+    )
+    parser.add_argument(
+        "-g",
+        "--graph",
+        required=True,
+        help="Frozen inference graph of the detector (e.g. object_detection/models/<model>/frozen_inference_graph.pb) or an ONNX model (NCHW float input; DetectionOutput or the num_detections/detection_* outputs).",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=None,
+        help="Run the model with tensorflow or with OpenCV's dnn module on the CPU "
+        "(default: dnn for .onnx models or with --config, tf otherwise).",
+    )
+    parser.add_argument(
+        "--config",
+        default=None,
+        help="Text graph of a frozen TF graph for the dnn backend (made with OpenCV's tf_text_graph_ssd.py).",
+    )
+    parser.add_argument(
+        "--input-size",
+        nargs=2,
+        default=DNN_INPUT_SIZE,
+        type=int,
+        metavar=("WIDTH", "HEIGHT"),
+        help="Network input size of the dnn backend.",
+    )
+    parser.add_argument(
+        "-c",
+        "--class-list",
+        default=None,
+        nargs="*",
+        help="Class names (defaults to classes.json or class_list.txt); detections past the class list are not written.",
+    )
+    parser.add_argument("--batch-size", default=BATCH_SIZE, type=int, help="Images per detector call.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=DECODE_WORKERS,
+        type=int,
+        help="Number of image decoding threads.",
+    )
+    parser.add_argument(
+        "--relabel",
+        action="store_true",
+        help="Label the images of the checkpoint again, overwriting what the earlier run wrote (e.g. after changing the threshold).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Do not read or write the detector output cache ({CACHE_FILE_NAME} in the root folder).",
+    )
+    parser.add_argument(
+        "--results",
+        default=None,
+        help="Also save the detections of this run as COCO results (.json) or as columns (.npz, with the file names "
+        "of the image ids).",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint of an earlier run (images with annotations are still skipped).",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    score_threshold, obj_ids, cuda_visible_devices = read_detector_config()
+    if cuda_visible_devices:
+        os.environ["CUDA_VISIBLE_DEVICES"] = cuda_visible_devices
+    checkpoint_path = Path(args.root_folder) / CHECKPOINT_FILE_NAME
+    if args.restart and checkpoint_path.is_file():
+        checkpoint_path.unlink()
+    # the model is only loaded (with the environment above) if the cache is missing outputs
+    backend = select_backend(args.graph, args.backend, args.config)
+    detector_kwargs = {"config_path": args.config, "input_size": args.input_size} if backend == "dnn" else {}
+    detector = LazyDetector(args.graph, score_threshold, obj_ids, backend, **detector_kwargs)
+    results = ColumnarResults() if args.results else None
+    root = Path(args.root_folder)
+    # one list for the image ids of the results and their file names
+    img_paths = find_images(root)
+    # an empty class list leaves the class indices unchecked
+    n_classes = len(resolve_class_list(args.class_list, root)) or None
+    cache = None
+    if not args.no_cache:
+        cache = DetectionCache(
+            Path(args.root_folder) / CACHE_FILE_NAME, model_hash(args.graph, backend, **detector_kwargs)
+        )
+    try:
+        n_images, n_boxes, n_skipped = prelabel_folder(
+            args.root_folder, detector, obj_ids, args.batch_size, args.workers, checkpoint_path,
+            cache=cache, relabel=args.relabel, results=results, img_paths=img_paths, n_classes=n_classes,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    if results is not None:
+        file_names = [img_path.relative_to(root).as_posix() for img_path in img_paths]
+        results.write(args.results, file_names=np.array(file_names))
+    print("Labelled {} images with {} boxes ({} skipped)".format(n_images, n_boxes, n_skipped))
+
+
+def run():  # Entry point
+    args = get_args()
+    main(args=args)
+
+
+if __name__ == "__main__":
+    parsed_args = get_args()
+    main(args=parsed_args)
@@ -1,16 +1,18 @@
 import numpy as np
 import tensorflow as tf
 
+from object_detection.detector import BATCH_SIZE, BaseDetector
+from object_detection.utils import RAW_OUTPUT_KEYS, post_process_batch
 
-class ObjectDetector(object):
+
+class ObjectDetector(BaseDetector):
     def __init__(self, graph_path, score_threshold, objIds):
+        super().__init__(score_threshold, objIds)
         self.detection_graph = self._load_graph(graph_path)
         self.input_tensor, self.tensor_dict = self._get_input_output_tensors(
             self.detection_graph
         )
         self.sess = tf.Session(graph=self.detection_graph)
-        self.score_threshold = score_threshold  # object score threshold
-        self.objIds = objIds  # Only those object Ids can be gotten
 
     def _load_graph(self, graph_path):
         detection_graph = tf.Graph()
@@ -43,38 +45,11 @@ class ObjectDetector(object):
         return image_tensor, tensor_dict
 
     def _post_process(self, output_dict, im_width, im_height):
-        # all outputs are float32 numpy arrays, so convert types as appropriate
-        output_dict["num_detections"] = int(output_dict["num_detections"][0])
-        output_dict["detection_classes"] = output_dict["detection_classes"][0].astype(
-            np.uint8
-        )
-        output_dict["detection_boxes"] = output_dict["detection_boxes"][0]
-        output_dict["detection_scores"] = output_dict["detection_scores"][0]
-        # Filter out boxes with low confidences
-        boxes = output_dict["detection_boxes"]
-        class_indices = output_dict["detection_classes"]
-        scores = output_dict["detection_scores"]
-        mask = scores > self.score_threshold
-        boxes = boxes[mask, :]
-        class_indices = class_indices[mask]
-        scores = scores[mask]
-        # Only keep classes listed in catIds
-        if self.objIds is not None:
-            mask = np.isin(class_indices, self.objIds)
-            boxes = boxes[mask]
-            class_indices = class_indices[mask]
-            scores = scores[mask]
-        # Scale the box dimensions
-        boxes[:, [0, 2]] *= im_height
-        boxes[:, [1, 3]] *= im_width
-        # Convert from (ymin, xmin, ymax, xmax) to (xmin, ymin, width, height)
-        new_boxes = np.empty_like(boxes)
-        new_boxes[:, 0] = boxes[:, 1]
-        new_boxes[:, 1] = boxes[:, 0]
-        new_boxes[:, 2] = boxes[:, 3] - boxes[:, 1]
-        new_boxes[:, 3] = boxes[:, 2] - boxes[:, 0]
-        boxes = new_boxes
-        return boxes, scores, class_indices
+        boxes, scores, class_indices = self._post_process_batch(output_dict, [(im_width, im_height)])
+        return boxes[0], scores[0], class_indices[0]
+
+    def _post_process_batch(self, output_dict, image_sizes):
+        return post_process_batch(output_dict, image_sizes, self.score_threshold, self.objIds)
 
     def detect(self, im):  # Assume the image is in RGB color space
         height, width = im.shape[:2]
@@ -84,3 +59,25 @@ class ObjectDetector(object):
         # Post-processing
         boxes, scores, class_indices = self._post_process(output_dict, width, height)
         return boxes, scores, class_indices
+
+    def detect_raw(self, images, batch_size=BATCH_SIZE):
+        """
+        The unfiltered detector outputs (RAW_OUTPUT_KEYS) of each of a list
+        of RGB images, with one session call per batch of at most
+        batch_size images. The image tensor needs images of the same size,
+        so images are grouped by size (in order of first appearance);
+        outputs come back in the order of `images`, each with a batch axis
+        of one as from detect().
+        """
+        groups = {}
+        for i, im in enumerate(images):
+            groups.setdefault(im.shape, []).append(i)
+        outputs = [None] * len(images)
+        for indices in groups.values():
+            for start in range(0, len(indices), batch_size):
+                batch_indices = indices[start:start + batch_size]
+                batch = np.stack([images[i] for i in batch_indices])
+                output_dict = self.sess.run(self.tensor_dict, feed_dict={self.input_tensor: batch})
+                for row, i in enumerate(batch_indices):
+                    outputs[i] = {key: output_dict[key][row:row + 1] for key in RAW_OUTPUT_KEYS}
+        return outputs
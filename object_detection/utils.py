@@ -1,3 +1,16 @@
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+# detector outputs needed by post_process_batch (and kept by the detection cache)
+RAW_OUTPUT_KEYS = ("num_detections", "detection_boxes", "detection_scores", "detection_classes")
+RESULT_COLUMNS = ("image_id", "category_id", "bbox", "score")
+JSON_CHUNK_ROWS = 100000  # detections formatted per string operation in write_coco_json
+# one COCO result; the ids are written from floats, which %d formats as integers
+COCO_RESULT_FORMAT = '{"image_id": %d, "category_id": %d, "bbox": [%r, %r, %r, %r], "score": %r}'
+
+
 def format_results(boxes, scores, image_id, cat_id):
     results = []
     for box, score in zip(boxes, scores):
@@ -9,3 +22,136 @@ def format_results(boxes, scores, image_id, cat_id):
         }
         results.append(r)
     return results
+
+
+def post_process_batch(output_dict, image_sizes, score_threshold, obj_ids):
+    """
+    Filters and scales the detections of a batch, image_sizes holding
+    the (width, height) of each image, with whole-batch array operations.
+    The detections of image i are row i of the (n_images, max_detections)
+    outputs, as returned by the session (or by stack_outputs). Returns
+    lists of boxes (xmin, ymin, width, height), scores and class
+    indices, one entry per image.
+    """
+    # all outputs are float32 numpy arrays, so convert types as appropriate
+    num_detections = output_dict["num_detections"].astype(np.int64)
+    class_indices = output_dict["detection_classes"].astype(np.uint8)
+    boxes = output_dict["detection_boxes"]
+    scores = output_dict["detection_scores"]
+    # Filter out padding rows and boxes with low confidences
+    mask = np.arange(scores.shape[1]) < num_detections[:, np.newaxis]
+    mask &= scores > score_threshold
+    # Only keep classes listed in catIds
+    if obj_ids is not None:
+        mask &= np.isin(class_indices, obj_ids)
+    image_rows, _ = np.nonzero(mask)
+    boxes = boxes[mask]
+    scores = scores[mask]
+    class_indices = class_indices[mask]
+    # Scale the box dimensions
+    sizes = np.asarray(image_sizes, dtype=boxes.dtype)[image_rows]
+    im_width, im_height = sizes[:, 0], sizes[:, 1]
+    # Convert from (ymin, xmin, ymax, xmax) to (xmin, ymin, width, height)
+    new_boxes = np.empty_like(boxes)
+    new_boxes[:, 0] = boxes[:, 1] * im_width
+    new_boxes[:, 1] = boxes[:, 0] * im_height
+    new_boxes[:, 2] = (boxes[:, 3] - boxes[:, 1]) * im_width
+    new_boxes[:, 3] = (boxes[:, 2] - boxes[:, 0]) * im_height
+    # split per image (the rows of mask are in image order)
+    splits = np.cumsum(mask.sum(axis=1))[:-1]
+    return np.split(new_boxes, splits), np.split(scores, splits), np.split(class_indices, splits)
+
+
+def stack_outputs(outputs):
+    """
+    Stacks per-image detector outputs (batch axis of one) into one batch,
+    padding with zero scores where images have fewer detection rows.
+    """
+    n_rows = max(output["detection_scores"].shape[1] for output in outputs)
+    stacked = {"num_detections": np.concatenate([output["num_detections"] for output in outputs])}
+    for key in RAW_OUTPUT_KEYS[1:]:
+        arrays = []
+        for output in outputs:
+            array = output[key]
+            padding = [(0, 0)] * array.ndim
+            padding[1] = (0, n_rows - array.shape[1])
+            arrays.append(np.pad(array, padding))
+        stacked[key] = np.concatenate(arrays)
+    return stacked
+
+
+def results_columns(boxes, scores, image_id, cat_id) -> Dict[str, np.ndarray]:
+    """
+    format_results() as columns (RESULT_COLUMNS) instead of one dict per
+    box; cat_id is one category id or one per box (e.g. the class_indices
+    of post_process_batch).
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    n = len(boxes)
+    return {
+        "image_id": np.full(n, image_id, dtype=np.int64),
+        "category_id": np.broadcast_to(np.asarray(cat_id, dtype=np.int64), (n,)).copy(),
+        "bbox": boxes.astype(np.float32),
+        "score": np.asarray(scores, dtype=np.float32).reshape(n),
+    }
+
+
+def write_coco_json(f, columns: Dict[str, np.ndarray], chunk_rows: int = JSON_CHUNK_ROWS):
+    """
+    Writes columns as the JSON list of COCO results that
+    json.dump(format_results(...)) would write (the same floats, the same
+    separators), formatting chunk_rows detections per string operation.
+    """
+    table = np.column_stack([
+        columns["image_id"].astype(np.float64),
+        columns["category_id"].astype(np.float64),
+        columns["bbox"].astype(np.float64),
+        columns["score"].astype(np.float64),
+    ])
+    f.write("[")
+    for start in range(0, len(table), chunk_rows):
+        chunk = table[start:start + chunk_rows]
+        if start:
+            f.write(", ")
+        f.write(", ".join([COCO_RESULT_FORMAT] * len(chunk)) % tuple(chunk.ravel().tolist()))
+    f.write("]")
+
+
+def read_npz_results(path) -> Dict[str, np.ndarray]:
+    with np.load(str(path)) as data:
+        return {key: data[key] for key in data.files}
+
+
+class ColumnarResults(object):
+    """
+    Collects detections as per-image arrays and writes them all at once,
+    as COCO results (.json) or as one array per column (.npz), without a
+    Python object per box.
+    """
+
+    def __init__(self):
+        self._chunks = {key: [] for key in RESULT_COLUMNS}
+
+    def add(self, boxes, scores, image_id, cat_id):
+        for key, column in results_columns(boxes, scores, image_id, cat_id).items():
+            self._chunks[key].append(column)
+
+    def __len__(self):
+        return sum(len(column) for column in self._chunks["score"])
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        empty = results_columns(np.empty((0, 4)), [], 0, 0)
+        return {
+            key: np.concatenate(chunks) if chunks else empty[key] for key, chunks in self._chunks.items()
+        }
+
+    def write(self, path, **arrays):
+        """
+        Writes to path as .npz, along with the extra arrays (e.g. the file
+        names of the image ids), or else as COCO JSON.
+        """
+        if Path(path).suffix.lower() == ".npz":
+            np.savez(str(path), **self.columns(), **arrays)
+        else:
+            with open(path, "w") as f:
+                write_coco_json(f, self.columns())
@@ -0,0 +1,310 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List
+
+from open_labeling.yolo_annotations import N_COLUMNS, find_annotation_files
+
+SQLITE_FILE_NAME = "annotations.sqlite"
+IMPORT_BATCH_SIZE = 5000  # annotation files per transaction
+
+
+class TxtAnnotationStore:
+    """
+    The default layout: one YOLO_darknet/<image stem>.txt file per image.
+    All methods take the annotation path the GUI already computes with
+    get_annotation_paths, so the SQLite store below is a drop-in swap.
+    """
+
+    def exists(self, ann_path) -> bool:
+        return os.path.isfile(ann_path)
+
+    def mtime_ns(self, ann_path) -> int:
+        try:
+            return os.stat(ann_path).st_mtime_ns
+        except FileNotFoundError:
+            return -1
+
+    def read_text(self, ann_path) -> str:
+        try:
+            with open(ann_path) as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def read_lines(self, ann_path) -> List[str]:
+        with open(ann_path, "r") as old_file:
+            return old_file.readlines()
+
+    def write_lines(self, ann_path, lines: Iterable[str]):
+        with open(ann_path, "w") as new_file:
+            new_file.writelines(lines)
+
+    def append_line(self, ann_path, line: str):
+        with open(ann_path, "a") as myfile:
+            myfile.write(line + "\n")  # append line
+
+    def append_lines(self, ann_path, lines: Iterable[str]):
+        with open(ann_path, "a") as myfile:
+            myfile.writelines(line + "\n" for line in lines)
+
+    def ensure(self, ann_path):
+        if not os.path.isfile(ann_path):
+            Path(ann_path).parent.mkdir(parents=True, exist_ok=True)
+            open(str(ann_path), "a").close()
+
+    def ensure_all(self, ann_paths: Iterable):
+        for ann_path in ann_paths:
+            self.ensure(ann_path)
+
+    def delete(self, ann_path):
+        os.unlink(str(ann_path))
+
+    def close(self):
+        pass
+
+
+def _parse_line(line: str):
+    items = line.split()
+    if len(items) < N_COLUMNS:
+        return None, None, None, None, None
+    try:
+        return int(float(items[0])), float(items[1]), float(items[2]), float(items[3]), float(items[4])
+    except ValueError:
+        return None, None, None, None, None
+
+
+class SqliteAnnotationStore:
+    """
+    All annotation lines of a root folder in one SQLite database. Each line
+    is kept verbatim (so export reproduces the txt files exactly, blank
+    lines aside) together with its parsed class and box for queries.
+    Images are keyed by their annotation path relative to the root.
+    """
+
+    def __init__(self, db_path, root):
+        self.db_path = Path(db_path)
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                modified_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS boxes (
+                image_id INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                line TEXT NOT NULL,
+                class_index INTEGER,
+                cx REAL,
+                cy REAL,
+                w REAL,
+                h REAL,
+                PRIMARY KEY (image_id, position)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS boxes_class_index ON boxes (class_index, image_id);
+            """
+        )
+        self.conn.commit()
+
+    def key(self, ann_path) -> str:
+        return Path(os.path.relpath(os.path.abspath(ann_path), os.path.abspath(self.root))).as_posix()
+
+    def _image_id(self, ann_path, create=False):
+        key = self.key(ann_path)
+        row = self.conn.execute("SELECT id FROM images WHERE path = ?", (key,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            return None
+        cursor = self.conn.execute(
+            "INSERT INTO images (path, modified_ns) VALUES (?, ?)", (key, time.time_ns())
+        )
+        return cursor.lastrowid
+
+    def _touch(self, image_id):
+        self.conn.execute("UPDATE images SET modified_ns = ? WHERE id = ?", (time.time_ns(), image_id))
+
+    def _insert_lines(self, image_id, lines: Iterable[str], first_position=0):
+        rows = []
+        for position, line in enumerate(lines, start=first_position):
+            rows.append((image_id, position, line, *_parse_line(line)))
+        self.conn.executemany(
+            "INSERT INTO boxes (image_id, position, line, class_index, cx, cy, w, h) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def exists(self, ann_path) -> bool:
+        with self._lock:
+            return self._image_id(ann_path) is not None
+
+    def mtime_ns(self, ann_path) -> int:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT modified_ns FROM images WHERE path = ?", (self.key(ann_path),)
+            ).fetchone()
+        return -1 if row is None else row[0]
+
+    def _lines(self, ann_path) -> List[str]:
+        image_id = self._image_id(ann_path)
+        if image_id is None:
+            return []
+        rows = self.conn.execute(
+            "SELECT line FROM boxes WHERE image_id = ? ORDER BY position", (image_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def read_text(self, ann_path) -> str:
+        with self._lock:
+            return "".join(line + "\n" for line in self._lines(ann_path))
+
+    def read_lines(self, ann_path) -> List[str]:
+        with self._lock:
+            return [line + "\n" for line in self._lines(ann_path)]
+
+    def write_lines(self, ann_path, lines: Iterable[str]):
+        lines = [line.rstrip("\r\n") for line in lines]
+        with self._lock, self.conn:
+            image_id = self._image_id(ann_path, create=True)
+            self.conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+            self._insert_lines(image_id, (line for line in lines if line.strip()))
+            self._touch(image_id)
+
+    def append_line(self, ann_path, line: str):
+        self.append_lines(ann_path, [line])
+
+    def append_lines(self, ann_path, lines: Iterable[str]):
+        with self._lock, self.conn:
+            image_id = self._image_id(ann_path, create=True)
+            row = self.conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM boxes WHERE image_id = ?", (image_id,)
+            ).fetchone()
+            self._insert_lines(image_id, lines, first_position=row[0])
+            self._touch(image_id)
+
+    def ensure(self, ann_path):
+        self.ensure_all([ann_path])
+
+    def ensure_all(self, ann_paths: Iterable):
+        now = time.time_ns()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO images (path, modified_ns) VALUES (?, ?)",
+                ((self.key(ann_path), now) for ann_path in ann_paths),
+            )
+
+    def delete(self, ann_path):
+        with self._lock, self.conn:
+            image_id = self._image_id(ann_path)
+            if image_id is not None:
+                self.conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+                self.conn.execute("DELETE FROM images WHERE id = ?", (image_id,))
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM images").fetchone()[0] == 0
+
+    def import_txt(self, ann_paths: List[Path] = None) -> int:
+        """
+        Copies YOLO_darknet txt files (by default every one below the root)
+        into the database, replacing any existing rows for the same image.
+        Files are committed in batches of IMPORT_BATCH_SIZE.
+
+        """
+        if ann_paths is None:
+            ann_paths = find_annotation_files(self.root)
+        ann_paths = [p for p in ann_paths if os.path.isfile(p)]
+        for start in range(0, len(ann_paths), IMPORT_BATCH_SIZE):
+            with self._lock, self.conn:
+                for ann_path in ann_paths[start:start + IMPORT_BATCH_SIZE]:
+                    with open(ann_path) as f:
+                        lines = [line.rstrip("\r\n") for line in f if line.strip()]
+                    image_id = self._image_id(ann_path, create=True)
+                    self.conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+                    self._insert_lines(image_id, lines)
+                    self._touch(image_id)
+        return len(ann_paths)
+
+    def export_txt(self) -> int:
+        """
+        Writes every image in the database back to its YOLO_darknet txt file.
+        """
+        with self._lock:
+            images = self.conn.execute("SELECT id, path FROM images ORDER BY id").fetchall()
+            n_exported = 0
+            for image_id, key in images:
+                lines = self.conn.execute(
+                    "SELECT line FROM boxes WHERE image_id = ? ORDER BY position", (image_id,)
+                ).fetchall()
+                ann_path = self.root / key
+                ann_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(ann_path, "w") as f:
+                    f.writelines(row[0] + "\n" for row in lines)
+                n_exported += 1
+        return n_exported
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_annotation_store(store_type: str, root, db_path=None):
+    if store_type == "sqlite":
+        if db_path is None:
+            db_path = Path(root) / SQLITE_FILE_NAME
+        return SqliteAnnotationStore(db_path, root)
+    return TxtAnnotationStore()
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Copy annotations between YOLO_darknet txt files and SQLite")
+    parser.add_argument(
+        "action",
+        choices=["import", "export"],
+        help="import: txt files -> database; export: database -> txt files.",
+    )
+    parser.add_argument(
+        "-f",
+        "--root-folder",
+        required=True,
+        help="Root directory of the images (annotation paths are stored relative to it).",
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        type=str,
+        help=f"Path to the SQLite database (defaults to <root-folder>/{SQLITE_FILE_NAME}).",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    store = open_annotation_store("sqlite", args.root_folder, db_path=args.db)
+    try:
+        if args.action == "import":
+            n_files = store.import_txt()
+            print("Imported {} annotation files into {}".format(n_files, store.db_path))
+        else:
+            n_files = store.export_txt()
+            print("Exported {} annotation files from {}".format(n_files, store.db_path))
+    finally:
+        store.close()
+
+
+def run():  # Entry point
+    args = get_args()
+    main(args=args)
+
+
+if __name__ == "__main__":
+    parsed_args = get_args()
+    main(args=parsed_args)
@@ -0,0 +1,158 @@
+import bisect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from open_labeling.annotation_store import TxtAnnotationStore
+from open_labeling.yolo_annotations import ANNOTATION_DIR, annotation_path_for_image, parse_yolo_text
+
+INDEX_FILE_NAME = ".class_index.json"
+
+
+def read_annotation_classes(store, ann_path: Path) -> List[int]:
+    rows = parse_yolo_text(store.read_text(ann_path))
+    return sorted(set(rows[:, 0].astype(int).tolist()))
+
+
+class ClassImageIndex:
+    """
+    Inverted index: class index -> sorted positions in image_paths_list of
+    the images whose annotation file contains that class.
+
+    The index is built in a background thread, reusing the persisted
+    per-file entries whose mtime is unchanged, and afterwards kept up to
+    date one annotation file at a time via update().
+    """
+
+    def __init__(self, image_paths: List[Path], index_path: Path = None, store=None):
+        self.store = TxtAnnotationStore() if store is None else store
+        if index_path is None and len(image_paths) > 0:
+            index_path = Path(image_paths[0]).parent / ANNOTATION_DIR / INDEX_FILE_NAME
+        self.index_path = index_path
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        # str(annotation path) -> [mtime_ns, [class indices]]
+        self._entries: Dict[str, list] = {}
+        # Paths updated by the GUI while the background build was running
+        self._touched = set()
+        self._set_image_paths(image_paths)
+
+    def _set_image_paths(self, image_paths: List[Path]):
+        self.image_paths = list(image_paths)
+        self._ann_paths = [str(annotation_path_for_image(p)) for p in self.image_paths]
+        self._position = {ann_path: i for i, ann_path in enumerate(self._ann_paths)}
+        self._rebuild_inverted()
+
+    def _rebuild_inverted(self):
+        images_by_class = {}
+        for position, ann_path in enumerate(self._ann_paths):
+            entry = self._entries.get(ann_path)
+            if entry is None:
+                continue
+            for class_index in entry[1]:
+                images_by_class.setdefault(class_index, []).append(position)
+        self._images_by_class = images_by_class
+
+    def start(self):
+        self._thread = threading.Thread(target=self.build, name="ClassImageIndex", daemon=True)
+        self._thread.start()
+
+    def build(self):
+        try:
+            persisted = self._load()
+            entries = {}
+            for ann_path in list(self._ann_paths):
+                mtime_ns = self.store.mtime_ns(ann_path)
+                entry = persisted.get(ann_path)
+                if entry is None or entry[0] != mtime_ns:
+                    try:
+                        classes = read_annotation_classes(self.store, ann_path)
+                    except (ValueError, OSError) as error:
+                        # indexed as having no classes until the file changes
+                        print("Could not index {}: {}".format(ann_path, error))
+                        classes = []
+                    entry = [mtime_ns, classes]
+                entries[ann_path] = entry
+            with self._lock:
+                for ann_path in self._touched:
+                    entries[ann_path] = self._entries[ann_path]
+                self._entries = entries
+                self._touched.clear()
+                self._rebuild_inverted()
+        finally:
+            # [j] / [k] wait for this, even if the build failed
+            self.ready.set()
+        self.save()
+
+    def update(self, ann_path):
+        """
+        Re-reads a single annotation file after it was changed by the GUI.
+        """
+        ann_path = str(ann_path)
+        classes = read_annotation_classes(self.store, ann_path)
+        with self._lock:
+            old_entry = self._entries.get(ann_path)
+            self._entries[ann_path] = [self.store.mtime_ns(ann_path), classes]
+            if not self.ready.is_set():
+                self._touched.add(ann_path)
+            position = self._position.get(ann_path)
+            if position is None:
+                return
+            old_classes = set(old_entry[1]) if old_entry is not None else set()
+            for class_index in old_classes - set(classes):
+                positions = self._images_by_class.get(class_index, [])
+                i = bisect.bisect_left(positions, position)
+                if i < len(positions) and positions[i] == position:
+                    del positions[i]
+            for class_index in set(classes) - old_classes:
+                bisect.insort(self._images_by_class.setdefault(class_index, []), position)
+
+    def set_image_paths(self, image_paths: List[Path]):
+        """
+        Call after images are removed from image_paths_list so positions
+        stay in sync; no annotation file is re-read.
+        """
+        with self._lock:
+            self._set_image_paths(image_paths)
+
+    def images_with_class(self, class_index: int) -> List[int]:
+        with self._lock:
+            return list(self._images_by_class.get(class_index, []))
+
+    def find_image(self, class_index: int, current_position: int, step: int = 1) -> Optional[int]:
+        """
+        Position of the next (step=1) or previous (step=-1) image containing
+        class_index, wrapping around the list. None if no image has it.
+        """
+        with self._lock:
+            positions = self._images_by_class.get(class_index, [])
+            if len(positions) == 0:
+                return None
+            if step > 0:
+                i = bisect.bisect_right(positions, current_position)
+                return positions[i % len(positions)]
+            i = bisect.bisect_left(positions, current_position) - 1
+            return positions[i]  # i == -1 wraps to the last image
+
+    def _load(self) -> Dict[str, list]:
+        if self.index_path is None or not Path(self.index_path).is_file():
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def save(self):
+        if self.index_path is None or not self.ready.is_set():
+            return
+        with self._lock:
+            data = dict(self._entries)
+        Path(self.index_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(str(self.index_path) + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.index_path)
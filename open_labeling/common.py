@@ -1,5 +1,14 @@
+import re
 from pathlib import Path
 
+IMAGE_SUFFIXES = (".jpg", ".png", ".ppm")
+
+
+def natural_sort_key(s, _nsre=re.compile("([0-9]+)")):
+    return [
+        int(text) if text.isdigit() else text.lower() for text in _nsre.split(str(s))
+    ]
+
 
 def check_if_folder_contains_sufficient_images(input_dir: Path, threshold: int = 2):
     """
@@ -5,38 +5,380 @@ Desc   : Wrapper class for the DaSiamRPN tracking method. This class has the
          methods required to interface with the tracking class implemented
          in main.py within the OpenLabeling package.
 """
-import torch
+import argparse
+import json
+import threading
+
+import cv2
 import numpy as np
 import sys
-from os.path import realpath, dirname, join, exists
-
-# set device, depending on whether cuda is available
-device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-
-try:
-    from DaSiamRPN.code.run_SiamRPN import SiamRPN_init, SiamRPN_track
-except ImportError:
-    # check if the user has downloaded the submodules
-    if not exists(join("DaSiamRPN", "code", "net.py")):
-        print("Error: DaSiamRPN files not found. Please run the following command:")
-        print("\tgit submodule update --init")
+from os.path import realpath, dirname, join, exists, splitext
+
+MODEL_PATH = join(realpath(dirname(__file__)), "DaSiamRPN", "code", "SiamRPNVOT.model")
+# written once by export_onnx() (label_dasiamrpn_onnx), read by the "onnx" backend
+ONNX_TEMPLATE_PATH = splitext(MODEL_PATH)[0] + "_template.onnx"
+ONNX_SEARCH_PATH = splitext(MODEL_PATH)[0] + "_search.onnx"
+ONNX_HEAD_PATH = splitext(MODEL_PATH)[0] + "_head.npz"
+BACKENDS = ["torch", "onnx"]
+
+# the network of each backend is loaded once per process and shared by every tracker
+_nets = {}
+_net_lock = threading.Lock()
+_n_threads = None
+
+
+def import_siamrpn_net():
+    """
+    The SiamRPNvot class of the DaSiamRPN submodule (this imports torch).
+    """
+    try:
+        from DaSiamRPN.code.net import SiamRPNvot
+    except ImportError:
+        # check if the user has downloaded the submodules
+        if not exists(join("DaSiamRPN", "code", "net.py")):
+            print("Error: DaSiamRPN files not found. Please run the following command:")
+            print("\tgit submodule update --init")
+            exit()
+        else:
+            # if python 3
+            if sys.version_info >= (3, 0):
+                sys.path.append(realpath(join("DaSiamRPN", "code")))
+            else:
+                # check if __init__py files exist (otherwise create them)
+                path_temp = join("DaSiamRPN", "code", "__init__.py")
+                if not exists(path_temp):
+                    open(path_temp, "w").close()
+                path_temp = join("DaSiamRPN", "__init__.py")
+                if not exists(path_temp):
+                    open(path_temp, "w").close()
+            # try to import again
+            from DaSiamRPN.code.net import SiamRPNvot
+    return SiamRPNvot
+
+
+def load_siamrpn_model():
+    import torch
+
+    # set device, depending on whether cuda is available
+    device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    net = import_siamrpn_net()()
+    # check if SiamRPNVOT.model was already downloaded (otherwise download it now)
+    print(MODEL_PATH)
+    if not exists(MODEL_PATH):
+        print(
+            "\nError: module not found. Please download the pre-trained model and copy it to the directory 'DaSiamRPN/code/'\n"
+        )
+        print(
+            "\tdownload link: https://github.com/fogx/DaSiamRPN_noCUDA/blob/master/SiamRPNVOT.model"
+        )
         exit()
+    net.load_state_dict(torch.load(MODEL_PATH, map_location=device))
+    return net.eval().to(device), device
+
+
+class TrackerConfig(object):
+    """
+    DaSiamRPN's tracker hyper-parameters (run_SiamRPN.TrackerConfig, which
+    cannot be imported without torch).
+    """
+
+    windowing = "cosine"
+    exemplar_size = 127  # input z size
+    instance_size = 271  # input x size (search region)
+    total_stride = 8
+    score_size = (instance_size - exemplar_size) / total_stride + 1
+    context_amount = 0.5  # context amount for the exemplar
+    ratios = [0.33, 0.5, 1, 2, 3]
+    scales = [8]
+    anchor_num = len(ratios) * len(scales)
+    anchor = []
+    penalty_k = 0.055
+    window_influence = 0.42
+    lr = 0.295
+    adaptive = True  # adaptive change search region
+
+    def update(self, cfg):
+        for k, v in cfg.items():
+            setattr(self, k, v)
+        self.score_size = (self.instance_size - self.exemplar_size) / self.total_stride + 1
+
+
+def generate_anchor(total_stride, scales, ratios, score_size):
+    """
+    Same anchors as run_SiamRPN.generate_anchor: (anchor_num * score_size**2, 4)
+    rows of (cx, cy, w, h) relative to the search region centre.
+    """
+    anchor_num = len(ratios) * len(scales)
+    anchor = np.zeros((anchor_num, 4), dtype=np.float32)
+    size = total_stride * total_stride
+    count = 0
+    for ratio in ratios:
+        ws = int(np.sqrt(size / ratio))
+        hs = int(ws * ratio)
+        for scale in scales:
+            anchor[count, 2] = ws * scale
+            anchor[count, 3] = hs * scale
+            count += 1
+    anchor = np.tile(anchor, score_size * score_size).reshape((-1, 4))
+    ori = -(score_size / 2) * total_stride
+    xx, yy = np.meshgrid(
+        [ori + total_stride * dx for dx in range(score_size)],
+        [ori + total_stride * dy for dy in range(score_size)],
+    )
+    xx = np.tile(xx.flatten(), (anchor_num, 1)).flatten()
+    yy = np.tile(yy.flatten(), (anchor_num, 1)).flatten()
+    anchor[:, 0], anchor[:, 1] = xx.astype(np.float32), yy.astype(np.float32)
+    return anchor
+
+
+def get_subwindow(im, pos, model_sz, original_sz, avg_chans):
+    """
+    utils.get_subwindow_tracking as a (3, model_sz, model_sz) float32 blob:
+    the original_sz square around pos, padded with avg_chans where it
+    leaves the image, resized to model_sz.
+    """
+    sz = original_sz
+    c = (original_sz + 1) / 2
+    context_xmin = round(pos[0] - c)
+    context_xmax = context_xmin + sz - 1
+    context_ymin = round(pos[1] - c)
+    context_ymax = context_ymin + sz - 1
+    left_pad = int(max(0.0, -context_xmin))
+    top_pad = int(max(0.0, -context_ymin))
+    right_pad = int(max(0.0, context_xmax - im.shape[1] + 1))
+    bottom_pad = int(max(0.0, context_ymax - im.shape[0] + 1))
+
+    context_xmin = context_xmin + left_pad
+    context_xmax = context_xmax + left_pad
+    context_ymin = context_ymin + top_pad
+    context_ymax = context_ymax + top_pad
+
+    r, c, k = im.shape
+    if any([top_pad, bottom_pad, left_pad, right_pad]):
+        te_im = np.zeros((r + top_pad + bottom_pad, c + left_pad + right_pad, k), np.uint8)
+        te_im[top_pad:top_pad + r, left_pad:left_pad + c, :] = im
+        if top_pad:
+            te_im[0:top_pad, left_pad:left_pad + c, :] = avg_chans
+        if bottom_pad:
+            te_im[r + top_pad:, left_pad:left_pad + c, :] = avg_chans
+        if left_pad:
+            te_im[:, 0:left_pad, :] = avg_chans
+        if right_pad:
+            te_im[:, c + left_pad:, :] = avg_chans
+        im_patch = te_im[int(context_ymin):int(context_ymax + 1), int(context_xmin):int(context_xmax + 1), :]
     else:
-        # if python 3
-        if sys.version_info >= (3, 0):
-            sys.path.append(realpath(join("DaSiamRPN", "code")))
-        else:
-            # check if __init__py files exist (otherwise create them)
-            path_temp = join("DaSiamRPN", "code", "__init__.py")
-            if not exists(path_temp):
-                open(path_temp, "w").close()
-            path_temp = join("DaSiamRPN", "__init__.py")
-            if not exists(path_temp):
-                open(path_temp, "w").close()
-        # try to import again
-        from DaSiamRPN.code.run_SiamRPN import SiamRPN_init, SiamRPN_track
-from DaSiamRPN.code.utils import get_axis_aligned_bbox, cxy_wh_2_rect
-from DaSiamRPN.code.net import SiamRPNvot
+        im_patch = im[int(context_ymin):int(context_ymax + 1), int(context_xmin):int(context_xmax + 1), :]
+
+    if not np.array_equal(model_sz, original_sz):
+        im_patch = cv2.resize(im_patch, (model_sz, model_sz))
+    return np.ascontiguousarray(im_patch.transpose(2, 0, 1), dtype=np.float32)
+
+
+def correlate(features, kernels):
+    """
+    Valid cross-correlation of (C, H, W) features with (O, C, k, k) kernels,
+    i.e. F.conv2d for a single image, as one matrix product.
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(features, kernels.shape[2:], axis=(1, 2))
+    return np.tensordot(kernels, windows, axes=([1, 2, 3], [0, 3, 4]))
+
+
+def softmax_score(score):
+    """
+    Foreground probability of the (2, n) classification logits.
+    """
+    score = score - score.max(axis=0)
+    exp_score = np.exp(score)
+    return exp_score[1] / exp_score.sum(axis=0)
+
+
+def tracker_eval(delta, score, target_pos, target_sz, window, scale_z, p):
+    """
+    NumPy port of DaSiamRPN's tracker_eval working on the network outputs of
+    one target, (4, n) box deltas and (n,) foreground scores, so that the
+    outputs of a batched forward pass can be decoded target by target.
+    """
+    delta = delta.copy()
+    delta[0, :] = delta[0, :] * p.anchor[:, 2] + p.anchor[:, 0]
+    delta[1, :] = delta[1, :] * p.anchor[:, 3] + p.anchor[:, 1]
+    delta[2, :] = np.exp(delta[2, :]) * p.anchor[:, 2]
+    delta[3, :] = np.exp(delta[3, :]) * p.anchor[:, 3]
+
+    def change(r):
+        return np.maximum(r, 1.0 / r)
+
+    def sz(w, h):
+        pad = (w + h) * 0.5
+        return np.sqrt((w + pad) * (h + pad))
+
+    # size and scale penalty
+    s_c = change(sz(delta[2, :], delta[3, :]) / sz(target_sz[0], target_sz[1]))
+    r_c = change((target_sz[0] / target_sz[1]) / (delta[2, :] / delta[3, :]))
+    penalty = np.exp(-(r_c * s_c - 1.0) * p.penalty_k)
+    pscore = penalty * score
+
+    # window float
+    pscore = pscore * (1 - p.window_influence) + window * p.window_influence
+    best_pscore_id = np.argmax(pscore)
+
+    target = delta[:, best_pscore_id] / scale_z
+    target_sz = target_sz / scale_z
+    lr = penalty[best_pscore_id] * score[best_pscore_id] * p.lr
+
+    res_x = target[0] + target_pos[0]
+    res_y = target[1] + target_pos[1]
+    res_w = target_sz[0] * (1 - lr) + target[2] * lr
+    res_h = target_sz[1] * (1 - lr) + target[3] * lr
+    return np.array([res_x, res_y]), np.array([res_w, res_h]), score[best_pscore_id]
+
+
+class TorchSiamRPN(object):
+    """
+    The SiamRPNvot network of the submodule, run with torch.
+    """
+
+    def __init__(self):
+        self.model, self.device = load_siamrpn_model()
+        self.cfg = self.model.cfg
+        self.anchor = self.model.anchor
+        self.feature_out = self.model.feature_out
+
+    def set_num_threads(self, n_threads):
+        import torch
+
+        torch.set_num_threads(n_threads)
+
+    def template(self, z_crop):
+        """
+        The regression and classification correlation kernels of a target.
+        """
+        import torch
+
+        model = self.model
+        with torch.inference_mode():
+            z_f = model.featureExtract(torch.from_numpy(z_crop).unsqueeze(0).to(self.device))
+            r1_kernel_raw = model.conv_r1(z_f)
+            cls1_kernel_raw = model.conv_cls1(z_f)
+        kernel_size = r1_kernel_raw.size()[-1]
+        r1_kernel = r1_kernel_raw.view(self.anchor * 4, self.feature_out, kernel_size, kernel_size)
+        cls1_kernel = cls1_kernel_raw.view(self.anchor * 2, self.feature_out, kernel_size, kernel_size)
+        return r1_kernel, cls1_kernel
+
+    def search(self, x_crops, r1_kernels, cls1_kernels):
+        """
+        Box deltas (n, 4, anchor * h * w) and classification logits
+        (n, 2, anchor * h * w) of n targets, each in its own search region,
+        with one forward pass: the search regions are stacked into a batch
+        and each target is correlated with its own kernels through a
+        grouped convolution.
+        """
+        import torch
+        import torch.nn.functional as F
+
+        model = self.model
+        n_targets = len(x_crops)
+        with torch.inference_mode():
+            x_f = model.featureExtract(torch.from_numpy(np.stack(x_crops)).to(self.device))
+            r2 = model.conv_r2(x_f)
+            cls2 = model.conv_cls2(x_f)
+            r1_kernel = torch.cat(r1_kernels)
+            cls1_kernel = torch.cat(cls1_kernels)
+            # (1, n_targets * channels, h, w) correlated with n_targets groups of kernels
+            delta = F.conv2d(r2.reshape(1, -1, *r2.shape[2:]), r1_kernel, groups=n_targets)
+            delta = model.regress_adjust(delta.view(n_targets, -1, *delta.shape[2:]))
+            score = F.conv2d(cls2.reshape(1, -1, *cls2.shape[2:]), cls1_kernel, groups=n_targets)
+            # same layout as DaSiamRPN: (4 or 2, anchor * h * w) per target
+            delta = delta.reshape(n_targets, 4, -1).cpu().numpy()
+            score = score.reshape(n_targets, 2, -1).cpu().numpy()
+        return delta, score
+
+
+class DnnSiamRPN(object):
+    """
+    The same network exported to ONNX by export_onnx() and run with
+    cv2.dnn on the CPU, so that torch is never imported. The template and
+    search branches are two networks; the target-specific correlation and
+    the 1x1 regress_adjust convolution that follows it are done in NumPy.
+    """
+
+    def __init__(self):
+        for path in (ONNX_TEMPLATE_PATH, ONNX_SEARCH_PATH, ONNX_HEAD_PATH):
+            if not exists(path):
+                print("\nError: {} not found. Please export the DaSiamRPN model to ONNX first:\n".format(path))
+                print("\tlabel_dasiamrpn_onnx")
+                exit()
+        self.template_net = cv2.dnn.readNetFromONNX(ONNX_TEMPLATE_PATH)
+        self.search_net = cv2.dnn.readNetFromONNX(ONNX_SEARCH_PATH)
+        head = np.load(ONNX_HEAD_PATH)
+        self.regress_weight = head["regress_weight"]
+        self.regress_bias = head["regress_bias"]
+        self.anchor = int(head["anchor"])
+        self.feature_out = int(head["feature_out"])
+        self.cfg = json.loads(str(head["cfg"]))
+        # the net is shared, e.g. by the propagation thread and tracking with `p`, and
+        # setInput() + forward() must not interleave
+        self._lock = threading.Lock()
+
+    def set_num_threads(self, n_threads):
+        cv2.setNumThreads(n_threads)
+
+    def template(self, z_crop):
+        with self._lock:
+            self.template_net.setInput(z_crop[np.newaxis])
+            kernels = self.template_net.forward()
+        kernel_size = kernels.shape[-1]
+        # the export concatenates the regression and classification kernels
+        n_r1 = self.anchor * 4 * self.feature_out
+        r1_kernel = kernels[:, :n_r1].reshape(self.anchor * 4, self.feature_out, kernel_size, kernel_size)
+        cls1_kernel = kernels[:, n_r1:].reshape(self.anchor * 2, self.feature_out, kernel_size, kernel_size)
+        return r1_kernel, cls1_kernel
+
+    def search(self, x_crops, r1_kernels, cls1_kernels):
+        x_crops = np.stack(x_crops)
+        with self._lock:
+            self.search_net.setInput(x_crops)
+            features = self.search_net.forward()
+        r2, cls2 = features[:, :self.feature_out], features[:, self.feature_out:]
+        return siamrpn_head(r2, cls2, r1_kernels, cls1_kernels, self.regress_weight, self.regress_bias)
+
+
+def siamrpn_head(r2, cls2, r1_kernels, cls1_kernels, regress_weight, regress_bias):
+    """
+    The correlation part of SiamRPN.forward for n targets given their search
+    features (n, C, H, W): box deltas (n, 4, -1) and logits (n, 2, -1).
+    """
+    n_targets = len(r2)
+    delta = np.stack([correlate(r2[i], r1_kernels[i]) for i in range(n_targets)])
+    # regress_adjust, a 1x1 convolution
+    delta = np.einsum("oi,nihw->nohw", regress_weight, delta) + regress_bias[:, np.newaxis, np.newaxis]
+    score = np.stack([correlate(cls2[i], cls1_kernels[i]) for i in range(n_targets)])
+    return delta.reshape(n_targets, 4, -1), score.reshape(n_targets, 2, -1)
+
+
+NET_BACKENDS = {"torch": TorchSiamRPN, "onnx": DnnSiamRPN}
+
+
+def set_num_threads(n_threads):
+    """
+    Number of CPU threads used for inference (None keeps the default of the
+    backend). Applies to the networks loaded so far and to later ones.
+    """
+    global _n_threads
+    if n_threads:
+        with _net_lock:
+            _n_threads = n_threads
+            for net in _nets.values():
+                net.set_num_threads(n_threads)
+
+
+def get_net(backend="torch"):
+    with _net_lock:
+        if backend not in _nets:
+            net = NET_BACKENDS[backend]()
+            if _n_threads:
+                net.set_num_threads(_n_threads)
+            _nets[backend] = net
+        return _nets[backend]
 
 
 class dasiamrpn(object):
@@ -44,36 +386,87 @@ class dasiamrpn(object):
     Wrapper class for incorporating DaSiamRPN into OpenLabeling
     (https://github.com/foolwood/DaSiamRPN,
     https://github.com/Cartucho/OpenLabeling)
-    """
 
-    def __init__(self):
-        self.net = SiamRPNvot()
-        # check if SiamRPNVOT.model was already downloaded (otherwise download it now)
-        model_path = join(
-            realpath(dirname(__file__)), "DaSiamRPN", "code", "SiamRPNVOT.model"
-        )
-        print(model_path)
-        if not exists(model_path):
-            print(
-                "\nError: module not found. Please download the pre-trained model and copy it to the directory 'DaSiamRPN/code/'\n"
-            )
-            print(
-                "\tdownload link: https://github.com/fogx/DaSiamRPN_noCUDA/blob/master/SiamRPNVOT.model"
-            )
-            exit()
+    All instances of a backend ("torch", or "onnx" for cv2.dnn without
+    torch) share the network returned by get_net(). The correlation
+    kernels of the target (computed by `net.temple` and kept on the network
+    in the original code) are stored per instance instead, so that several
+    targets can be tracked at once, and update_many() tracks them all with
+    one batched forward pass per frame.
+    """
 
-        if torch.cuda.is_available():
-            self.net.load_state_dict(torch.load(model_path))
-        else:
-            self.net.load_state_dict(torch.load(model_path, map_location="cpu"))
-        self.net.eval().to(device)
+    def __init__(self, backend="torch"):
+        self.net = get_net(backend)
 
     def init(self, init_frame, initial_bbox):
         """
         Initialize DaSiamRPN tracker with inital frame and bounding box.
         """
         target_pos, target_sz = self.bbox_to_pos(initial_bbox)
-        self.state = SiamRPN_init(init_frame, target_pos, target_sz, self.net)
+        p = TrackerConfig()
+        p.update(self.net.cfg)
+        im_h, im_w = init_frame.shape[:2]
+        if p.adaptive:
+            if ((target_sz[0] * target_sz[1]) / float(im_h * im_w)) < 0.004:
+                p.instance_size = 287  # small object big search region
+            else:
+                p.instance_size = 271
+        p.score_size = int((p.instance_size - p.exemplar_size) / p.total_stride + 1)
+        p.anchor = generate_anchor(p.total_stride, p.scales, p.ratios, p.score_size)
+
+        avg_chans = np.mean(init_frame, axis=(0, 1))
+        wc_z = target_sz[0] + p.context_amount * sum(target_sz)
+        hc_z = target_sz[1] + p.context_amount * sum(target_sz)
+        s_z = round(np.sqrt(wc_z * hc_z))
+        z_crop = get_subwindow(init_frame, target_pos, p.exemplar_size, s_z, avg_chans)
+        self.r1_kernel, self.cls1_kernel = self.net.template(z_crop)
+
+        window = np.outer(np.hanning(p.score_size), np.hanning(p.score_size))
+        self.state = {
+            "p": p,
+            "im_h": im_h,
+            "im_w": im_w,
+            "avg_chans": avg_chans,
+            "window": np.tile(window.flatten(), p.anchor_num),
+            "target_pos": target_pos,
+            "target_sz": target_sz,
+        }
+
+    def search_crop(self, next_image):
+        """
+        Search region around the last position, and its scale.
+        """
+        p = self.state["p"]
+        target_sz = self.state["target_sz"]
+        wc_z = target_sz[1] + p.context_amount * sum(target_sz)
+        hc_z = target_sz[0] + p.context_amount * sum(target_sz)
+        s_z = np.sqrt(wc_z * hc_z)
+        scale_z = p.exemplar_size / s_z
+        d_search = (p.instance_size - p.exemplar_size) / 2
+        pad = d_search / scale_z
+        s_x = s_z + 2 * pad
+        x_crop = get_subwindow(
+            next_image, self.state["target_pos"], p.instance_size, round(s_x), self.state["avg_chans"]
+        )
+        return x_crop, scale_z
+
+    def apply_outputs(self, delta, score, scale_z):
+        """
+        Moves the target given the network outputs for its search region
+        and returns its new bbox.
+        """
+        state = self.state
+        target_pos, target_sz, best_score = tracker_eval(
+            delta, score, state["target_pos"], state["target_sz"] * scale_z, state["window"], scale_z, state["p"]
+        )
+        target_pos[0] = max(0, min(state["im_w"], target_pos[0]))
+        target_pos[1] = max(0, min(state["im_h"], target_pos[1]))
+        target_sz[0] = max(10, min(state["im_w"], target_sz[0]))
+        target_sz[1] = max(10, min(state["im_h"], target_sz[1]))
+        state["target_pos"] = target_pos
+        state["target_sz"] = target_sz
+        state["score"] = best_score
+        return self.pos_to_bbox(target_pos, target_sz)
 
     def update(self, next_image):
         """
@@ -82,12 +475,27 @@ class dasiamrpn(object):
         in OpenLabeling, not based on feedback from tracking algorithm (unlike
         the opencv tracking algorithms).
         """
-        self.state = SiamRPN_track(self.state, next_image)
-        target_pos = self.state["target_pos"]
-        target_sz = self.state["target_sz"]
-        bbox = self.pos_to_bbox(target_pos, target_sz)
+        return self.update_many([self], next_image)[0]
 
-        return True, bbox
+    @classmethod
+    def update_many(cls, trackers, next_image):
+        """
+        Updates several trackers (of the same backend) on the same frame
+        with one forward pass. Returns a (success, bbox) pair per tracker.
+        """
+        if not trackers:
+            return []
+        crops, scales = zip(*(tracker.search_crop(next_image) for tracker in trackers))
+        delta, score = trackers[0].net.search(
+            crops,
+            [tracker.r1_kernel for tracker in trackers],
+            [tracker.cls1_kernel for tracker in trackers],
+        )
+        results = []
+        for i, tracker in enumerate(trackers):
+            bbox = tracker.apply_outputs(delta[i], softmax_score(score[i]), scales[i])
+            results.append((True, bbox))
+        return results
 
     def bbox_to_pos(self, initial_bbox):
         """
@@ -115,3 +523,77 @@ class dasiamrpn(object):
         ymin = int(target_pos[1] - h / 2)
 
         return xmin, ymin, w, h
+
+
+def export_onnx(opset_version=11):
+    """
+    Converts SiamRPNVOT.model into the files of the "onnx" backend: the
+    template branch (z crop -> regression and classification kernels,
+    concatenated), the search branch (x crops -> regression and
+    classification features, concatenated, any batch size) and the weights
+    of regress_adjust with the tracker config.
+    """
+    import torch
+
+    model, _device = load_siamrpn_model()
+    model = model.cpu()
+
+    class TemplateBranch(torch.nn.Module):
+        def forward(self, z):
+            z_f = model.featureExtract(z)
+            return torch.cat([model.conv_r1(z_f), model.conv_cls1(z_f)], dim=1)
+
+    class SearchBranch(torch.nn.Module):
+        def forward(self, x):
+            x_f = model.featureExtract(x)
+            return torch.cat([model.conv_r2(x_f), model.conv_cls2(x_f)], dim=1)
+
+    cfg = TrackerConfig()
+    cfg.update(model.cfg)
+    z = torch.zeros(1, 3, cfg.exemplar_size, cfg.exemplar_size)
+    x = torch.zeros(1, 3, cfg.instance_size, cfg.instance_size)
+    with torch.inference_mode():
+        torch.onnx.export(
+            TemplateBranch(), z, ONNX_TEMPLATE_PATH,
+            input_names=["z"], output_names=["kernels"], opset_version=opset_version,
+        )
+        torch.onnx.export(
+            SearchBranch(), x, ONNX_SEARCH_PATH,
+            input_names=["x"], output_names=["features"], opset_version=opset_version,
+            # any number of targets, and both search region sizes of the adaptive config
+            dynamic_axes={"x": {0: "n_targets", 2: "size", 3: "size"}},
+        )
+    regress_adjust = model.regress_adjust
+    np.savez(
+        ONNX_HEAD_PATH,
+        regress_weight=regress_adjust.weight.detach().numpy()[:, :, 0, 0],
+        regress_bias=regress_adjust.bias.detach().numpy(),
+        anchor=model.anchor,
+        feature_out=model.feature_out,
+        cfg=json.dumps(model.cfg),
+    )
+    return ONNX_TEMPLATE_PATH, ONNX_SEARCH_PATH, ONNX_HEAD_PATH
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Export the DaSiamRPN model to ONNX for the torch-free tracker backend (--dasiamrpn-backend onnx)"
+    )
+    parser.add_argument("--opset", default=11, type=int, help="ONNX opset version.")
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    for path in export_onnx(args.opset):
+        print("Wrote {}".format(path))
+
+
+def run():  # Entry point
+    args = get_args()
+    main(args=args)
+
+
+if __name__ == "__main__":
+    parsed_args = get_args()
+    main(args=parsed_args)
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from open_labeling.common import IMAGE_SUFFIXES, natural_sort_key
+from open_labeling.image_size import SIZE_INDEX_FILE_NAME, ImageSizeIndex, get_image_size
+from open_labeling.load_classes import resolve_class_list
+from open_labeling.yolo_annotations import (
+    ANNOTATION_DIR,
+    annotation_path_for_image,
+    read_yolo_file,
+    yolo_to_voc,
+)
+
+VOC_DIR = "PASCAL_VOC"
+CHUNK_SIZE = 500  # images per worker task
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Export YOLO_darknet annotations to COCO JSON and/or Pascal VOC")
+    parser.add_argument(
+        "-f",
+        "--root-folder",
+        required=True,
+        help="Root directory; every folder below it with a YOLO_darknet sub-folder is exported.",
+    )
+    parser.add_argument(
+        "-c",
+        "--class-list",
+        default=None,
+        nargs="*",
+        help="Class names (defaults to classes.json or class_list.txt). COCO category ids are class index + 1.",
+    )
+    parser.add_argument(
+        "--coco",
+        default=None,
+        type=str,
+        help="Path of the COCO JSON file to write.",
+    )
+    parser.add_argument(
+        "--voc",
+        action="store_true",
+        help="Write a Pascal VOC XML file per image into a PASCAL_VOC folder next to YOLO_darknet.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=None,
+        type=int,
+        help="Number of worker processes (defaults to the number of CPUs).",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def find_labelled_images(root: Path) -> List[Path]:
+    """
+    Images in every folder below root that has a YOLO_darknet sub-folder.
+    """
+    root = Path(root)
+    image_dirs = sorted({ann_dir.parent for ann_dir in root.rglob(ANNOTATION_DIR) if ann_dir.is_dir()},
+                        key=natural_sort_key)
+    image_paths = []
+    for image_dir in image_dirs:
+        image_paths.extend(sorted(
+            (p for p in image_dir.iterdir() if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES),
+            key=natural_sort_key,
+        ))
+    return image_paths
+
+
+def voc_xml(img_path: Path, width: int, height: int, objects: List[Tuple[str, int, int, int, int]]) -> ET.ElementTree:
+    annotation = ET.Element("annotation")
+    ET.SubElement(annotation, "folder").text = img_path.parent.name
+    ET.SubElement(annotation, "filename").text = img_path.name
+    ET.SubElement(annotation, "path").text = str(img_path)
+    size = ET.SubElement(annotation, "size")
+    ET.SubElement(size, "width").text = str(width)
+    ET.SubElement(size, "height").text = str(height)
+    ET.SubElement(size, "depth").text = "3"
+    ET.SubElement(annotation, "segmented").text = "0"
+    for class_name, xmin, ymin, xmax, ymax in objects:
+        obj = ET.SubElement(annotation, "object")
+        ET.SubElement(obj, "name").text = class_name
+        ET.SubElement(obj, "pose").text = "Unspecified"
+        ET.SubElement(obj, "truncated").text = "0"
+        ET.SubElement(obj, "difficult").text = "0"
+        bndbox = ET.SubElement(obj, "bndbox")
+        ET.SubElement(bndbox, "xmin").text = str(xmin)
+        ET.SubElement(bndbox, "ymin").text = str(ymin)
+        ET.SubElement(bndbox, "xmax").text = str(xmax)
+        ET.SubElement(bndbox, "ymax").text = str(ymax)
+    return ET.ElementTree(annotation)
+
+
+def export_chunk(task) -> List[Tuple[str, List[str], Optional[Tuple[int, int]]]]:
+    """
+    Worker: for each (image_id, image path, cached size) returns the COCO
+    image entry, the COCO annotation entries (as JSON text, without their
+    "id" which is assigned by the writer) and the image size if it had to
+    be read from the header, writing VOC files along the way if requested.
+
+    """
+    images, root, class_list, write_voc = task
+    results = []
+    for image_id, img_path, cached_size in images:
+        img_path = Path(img_path)
+        if cached_size is None:
+            width, height = new_size = get_image_size(img_path)
+        else:
+            (width, height), new_size = cached_size, None
+        rows = read_yolo_file(annotation_path_for_image(img_path))
+
+        image_entry = json.dumps({
+            "id": image_id,
+            "file_name": img_path.relative_to(root).as_posix(),
+            "width": width,
+            "height": height,
+        })
+        ann_entries = []
+        voc_objects = []
+        for class_index, x_center, y_center, x_width, y_height in rows.tolist():
+            class_index = int(class_index)
+            box_w = x_width * width
+            box_h = y_height * height
+            xmin = x_center * width - box_w / 2.0
+            ymin = y_center * height - box_h / 2.0
+            ann_entries.append(json.dumps({
+                "image_id": image_id,
+                "category_id": class_index + 1,
+                "bbox": [xmin, ymin, box_w, box_h],
+                "area": box_w * box_h,
+                "iscrowd": 0,
+            })[1:])  # drop the "{" so the writer can prefix the id
+            if write_voc:
+                class_name = class_list[class_index] if 0 <= class_index < len(class_list) else str(class_index)
+                voc_objects.append(
+                    (class_name, *yolo_to_voc(x_center, y_center, x_width, y_height, width, height))
+                )
+        if write_voc:
+            voc_dir = img_path.parent / VOC_DIR
+            voc_dir.mkdir(exist_ok=True)
+            voc_xml(img_path, width, height, voc_objects).write(str(voc_dir / f"{img_path.stem}.xml"))
+        results.append((image_entry, ann_entries, new_size))
+    return results
+
+
+def export_dataset(root: Path, class_list: List[str], coco_path=None, write_voc=False, n_workers=None):
+    """
+    Streams every labelled image below root through a process pool. Image
+    sizes come from the ImageSizeIndex cache at the root, falling back to
+    header parsing in the workers for new or modified images. The
+    COCO file is written incrementally: image entries go straight to the
+    output and annotation entries to a temporary file that is appended at
+    the end, so memory use does not grow with the dataset.
+
+    """
+    root = Path(root)
+    image_paths = find_labelled_images(root)
+    size_index = ImageSizeIndex(root / SIZE_INDEX_FILE_NAME)
+    mtimes = [p.stat().st_mtime_ns for p in image_paths]
+    images = [
+        (i, str(p), size_index.lookup(p, mtime_ns))
+        for i, (p, mtime_ns) in enumerate(zip(image_paths, mtimes))
+    ]
+    tasks = [
+        (images[start:start + CHUNK_SIZE], root, class_list, write_voc)
+        for start in range(0, len(images), CHUNK_SIZE)
+    ]
+
+    coco_file = ann_file = None
+    if coco_path is not None:
+        coco_file = open(coco_path, "w")
+        ann_file = tempfile.TemporaryFile("w+", dir=os.path.dirname(os.path.abspath(coco_path)))
+        coco_file.write('{"info": {"description": "Exported by OpenLabeling"}, "categories": ')
+        coco_file.write(json.dumps([{"id": i + 1, "name": name} for i, name in enumerate(class_list)]))
+        coco_file.write(', "images": [')
+
+    n_images = 0
+    n_annotations = 0
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for results in executor.map(export_chunk, tasks):
+                for image_entry, ann_entries, new_size in results:
+                    if new_size is not None:
+                        size_index.add(image_paths[n_images], mtimes[n_images], *new_size)
+                    if coco_file is not None:
+                        coco_file.write(("," if n_images else "") + image_entry)
+                        for ann_entry in ann_entries:
+                            n_annotations += 1
+                            ann_file.write("{}{{\"id\": {}, {}".format(
+                                "," if n_annotations > 1 else "", n_annotations, ann_entry
+                            ))
+                    else:
+                        n_annotations += len(ann_entries)
+                    n_images += 1
+        if coco_file is not None:
+            coco_file.write('], "annotations": [')
+            ann_file.seek(0)
+            shutil.copyfileobj(ann_file, coco_file)
+            coco_file.write("]}")
+    finally:
+        if coco_file is not None:
+            coco_file.close()
+            ann_file.close()
+        size_index.save()
+    return n_images, n_annotations
+
+
+def main(args):
+    root = Path(args.root_folder)
+    if not root.is_dir():
+        raise RuntimeError("The root-folder provided does not exist or not a folder.")
+    if args.coco is None and not args.voc:
+        raise RuntimeError("Nothing to export: pass --coco <path> and/or --voc.")
+    class_list = resolve_class_list(args.class_list, root)
+    n_images, n_annotations = export_dataset(
+        root, class_list, coco_path=args.coco, write_voc=args.voc, n_workers=args.workers
+    )
+    print("Exported {} boxes from {} images".format(n_annotations, n_images))
+
+
+def run():  # Entry point
+    args = get_args()
+    main(args=args)
+
+
+if __name__ == "__main__":
+    parsed_args = get_args()
+    main(args=parsed_args)
@@ -0,0 +1,164 @@
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+from tqdm import tqdm
+
+from open_labeling.video_source import seek_frame, video_frames_dir
+
+FRAME_FORMATS = [".jpg", ".png", ".ppm"]  # the formats the GUI loads
+JPEG_QUALITY = 95
+PNG_COMPRESSION = 1
+
+
+def encode_params(img_format: str, quality: int = JPEG_QUALITY, png_compression: int = PNG_COMPRESSION) -> List[int]:
+    if img_format == ".jpg":
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if img_format == ".png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    return []
+
+
+def frame_file_path(frames_dir: Path, video_name_ext: str, index: int, img_format: str) -> Path:
+    # same naming as video_source's virtual frame paths, so annotations carry over
+    return frames_dir / "{}_{}{}".format(video_name_ext, index, img_format)
+
+
+def write_frame(frame_path: Path, frame, params: List[int]):
+    success, buffer = cv2.imencode(frame_path.suffix, frame, params)
+    if not success:
+        raise IOError("Could not encode frame: {}".format(frame_path))
+    # write under a temporary name so an interrupted run never leaves a truncated frame behind
+    tmp_path = Path(str(frame_path) + ".part")
+    with open(tmp_path, "wb") as f:
+        f.write(buffer.tobytes())
+    os.replace(tmp_path, frame_path)
+
+
+def extract_frames(
+    video_path,
+    n_frames: Optional[int] = None,
+    img_format: str = ".jpg",
+    quality: int = JPEG_QUALITY,
+    png_compression: int = PNG_COMPRESSION,
+    stride: int = 1,
+    n_workers: Optional[int] = None,
+    frames_dir=None,
+    progress: bool = True,
+) -> Tuple[Path, str, int]:
+    """
+    Writes every `stride`-th of the first `n_frames` frames of a video to
+    `<video>_<ext>/<video>_<ext>_<index><img_format>` (the folder and names
+    convert_video_to_images always used; the index is the frame index in
+    the video, also with a stride).
+
+    The calling thread only decodes (skipping unwanted frames with grab())
+    while a thread pool encodes and writes; at most 2 * n_workers decoded
+    frames wait for an encoder. Frames already on disk are not written
+    again and decoding starts at the first missing one, so an interrupted
+    extraction resumes where it stopped.
+
+    Returns the frames folder, the video name used in the frame names and
+    the number of frames written.
+    """
+    video_path = Path(video_path)
+    frames_dir = Path(frames_dir) if frames_dir is not None else video_frames_dir(video_path)
+    video_name_ext = video_frames_dir(video_path).name
+    frames_dir.mkdir(parents=True, exist_ok=True)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    params = encode_params(img_format, quality, png_compression)
+
+    cap = cv2.VideoCapture(str(video_path))
+    n_video_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if n_frames is None or n_frames > n_video_frames > 0:
+        n_frames = n_video_frames
+    wanted = [
+        i for i in range(0, n_frames, stride)
+        if not frame_file_path(frames_dir, video_name_ext, i, img_format).is_file()
+    ]
+    if not wanted:
+        cap.release()
+        return frames_dir, video_name_ext, 0
+
+    if not seek_frame(cap, wanted[0]):
+        cap.release()
+        return frames_dir, video_name_ext, 0
+    position = wanted[0]
+    in_flight = threading.BoundedSemaphore(2 * n_workers)
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="frame_encoder") as executor:
+            for index in tqdm(wanted, disable=not progress, desc=video_name_ext):
+                while position < index:
+                    if not cap.grab():
+                        break
+                    position += 1
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                position += 1
+                in_flight.acquire()
+                future = executor.submit(
+                    write_frame, frame_file_path(frames_dir, video_name_ext, index, img_format), frame, params
+                )
+                future.add_done_callback(lambda _future: in_flight.release())
+                futures.append(future)
+    finally:
+        cap.release()
+    for future in futures:
+        future.result()  # re-raise write errors
+    return frames_dir, video_name_ext, len(futures)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Extract the frames of videos to image files")
+    parser.add_argument("videos", nargs="+", help="Video files to extract.")
+    parser.add_argument(
+        "-n",
+        "--n_frames",
+        default=None,
+        type=int,
+        help="Only extract the first n frames (defaults to all).",
+    )
+    parser.add_argument("--format", default=".jpg", choices=FRAME_FORMATS, help="Image format of the frames.")
+    parser.add_argument("--quality", default=JPEG_QUALITY, type=int, help="JPEG quality (0-100).")
+    parser.add_argument("--png-compression", default=PNG_COMPRESSION, type=int, help="PNG compression level (0-9).")
+    parser.add_argument("--stride", default=1, type=int, help="Keep every n-th frame.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=None,
+        type=int,
+        help="Number of encoding threads (defaults to the number of CPUs).",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    for video_path in args.videos:
+        frames_dir, _video_name_ext, n_written = extract_frames(
+            video_path,
+            n_frames=args.n_frames,
+            img_format=args.format,
+            quality=args.quality,
+            png_compression=args.png_compression,
+            stride=args.stride,
+            n_workers=args.workers,
+        )
+        print("{}: wrote {} frames to {}".format(video_path, n_written, frames_dir))
+
+
+def run():  # Entry point
+    args = get_args()
+    main(args=args)
+
+
+if __name__ == "__main__":
+    parsed_args = get_args()
+    main(args=parsed_args)
@@ -0,0 +1,108 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Tuple
+
+import cv2
+import numpy as np
+
+from open_labeling.video_source import read_video_frame
+
+DECODE_WORKERS = 4
+PREFETCH_WINDOW = 8  # decoded frames kept ahead of the consumer
+# JPEG frames are decoded straight at 1/2, 1/4 or 1/8 size (DCT scaling), other formats are resized
+REDUCED_READ_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def read_frame(frame_path, scale: int = 1) -> np.ndarray:
+    """
+    Decodes an image file, or a frame of an opened video given by its
+    virtual path (see video_source), reduced by `scale`.
+    """
+    frame = read_video_frame(frame_path)
+    if frame is not None:
+        if scale == 1:
+            return frame
+        height, width = frame.shape[:2]
+        return cv2.resize(frame, (width // scale, height // scale), interpolation=cv2.INTER_AREA)
+    if scale == 1:
+        return cv2.imread(str(frame_path))
+    return cv2.imread(str(frame_path), REDUCED_READ_FLAGS[scale])
+
+
+def prefetch_frames(
+    frame_paths: Iterable,
+    n_workers: int = DECODE_WORKERS,
+    window: int = PREFETCH_WINDOW,
+    loader: Callable = read_frame,
+) -> Iterator[Tuple[object, np.ndarray]]:
+    """
+    Yields (frame_path, frame) in order while a thread pool decodes up to
+    `window` of the following frames in the background (cv2.imread releases
+    the GIL). Closing the generator early cancels the frames not yet started,
+    so stopping a tracker after a few frames does not decode the whole video.
+    """
+    frame_paths = iter(frame_paths)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="frame_decoder")
+    try:
+        for frame_path in frame_paths:
+            pending.append((frame_path, executor.submit(loader, frame_path)))
+            if len(pending) >= window:
+                break
+        while pending:
+            frame_path, future = pending.popleft()
+            for next_path in frame_paths:
+                pending.append((next_path, executor.submit(loader, next_path)))
+                break
+            yield frame_path, future.result()
+    finally:
+        for _frame_path, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class BackgroundWriter:
+    """
+    Runs submitted calls one at a time, in submission order, on a worker
+    thread so that slow writes do not hold up the caller. close() waits for
+    everything submitted and re-raises the first error, if any.
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            fn, args = task
+            if self._error is None:
+                try:
+                    fn(*args)
+                except Exception as error:  # reported by close()
+                    self._error = error
+
+    def submit(self, fn: Callable, *args):
+        self._queue.put((fn, args))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,188 @@
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not.
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+EXIF_ORIENTATION_TAG = 0x0112
+PPM_HEADER_BYTES = 1024
+SIZE_INDEX_FILE_NAME = ".image_sizes.tsv"
+
+
+def _exif_swaps_axes(segment: bytes) -> bool:
+    """
+    True if an APP1 Exif segment carries an orientation (5-8) that rotates
+    the image by 90 degrees. cv2.imread applies the orientation, so the
+    size it returns is transposed relative to the SOF header.
+    """
+    if not segment.startswith(b"Exif\x00\x00"):
+        return False
+    tiff = segment[6:]
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        return False
+    try:
+        ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+        n_entries = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+        for i in range(n_entries):
+            entry = tiff[ifd_offset + 2 + 12 * i:ifd_offset + 14 + 12 * i]
+            tag = struct.unpack(endian + "H", entry[0:2])[0]
+            if tag == EXIF_ORIENTATION_TAG:
+                orientation = struct.unpack(endian + "H", entry[8:10])[0]
+                return orientation in (5, 6, 7, 8)
+    except struct.error:
+        pass
+    return False
+
+
+def _jpeg_size(f) -> Tuple[int, int]:
+    swap_axes = False
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":  # markers may be padded with fill bytes
+            byte = f.read(1)
+        if not byte:
+            raise ValueError("No SOF marker found")
+        marker = byte[0]
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue  # standalone markers have no length field
+        length = struct.unpack(">H", f.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            _precision, height, width = struct.unpack(">BHH", f.read(5))
+            return (height, width) if swap_axes else (width, height)
+        if marker == 0xE1:
+            swap_axes = swap_axes or _exif_swaps_axes(f.read(length - 2))
+        else:
+            f.seek(length - 2, 1)
+
+
+def _png_size(f) -> Tuple[int, int]:
+    header = f.read(24)
+    if header[12:16] != b"IHDR":
+        raise ValueError("PNG without IHDR chunk")
+    return struct.unpack(">II", header[16:24])
+
+
+def _ppm_size(f) -> Tuple[int, int]:
+    header = f.read(PPM_HEADER_BYTES)
+    tokens = []
+    for line in header.split(b"\n"):
+        tokens.extend(line.split(b"#")[0].split())
+        if len(tokens) >= 3:
+            break
+    return int(tokens[1]), int(tokens[2])
+
+
+def read_image_size(img_path) -> Tuple[int, int]:
+    """
+    Returns (width, height) of a JPEG, PNG or PNM image by parsing only its
+    header, matching the shape cv2.imread would decode.
+
+    """
+    with open(img_path, "rb") as f:
+        magic = f.read(8)
+        f.seek(0)
+        if magic[:2] == b"\xff\xd8":
+            return _jpeg_size(f)
+        if magic == PNG_SIGNATURE:
+            return _png_size(f)
+        if magic[:1] == b"P" and magic[1:2] in b"123456":
+            return _ppm_size(f)
+    raise ValueError("Unsupported image format: {}".format(img_path))
+
+
+def get_image_size(img_path) -> Tuple[int, int]:
+    """
+    Header-only size where possible, falling back to a full decode for
+    formats or files the header parsers do not understand.
+
+    """
+    try:
+        return read_image_size(img_path)
+    except (ValueError, struct.error, IndexError):
+        import cv2
+
+        img = cv2.imread(str(Path(img_path)))
+        if img is None:
+            raise ValueError("Could not read image: {}".format(img_path))
+        height, width = img.shape[:2]
+        return width, height
+
+
+class ImageSizeIndex:
+    """
+    Persistent cache of image sizes keyed by absolute path and mtime. The
+    cache file is one "mtime_ns<TAB>width<TAB>height<TAB>path" line per
+    image, rewritten by save() only when new sizes were added.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = Path(cache_path)
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, Tuple[int, int, int]] = {}  # path -> (mtime_ns, width, height)
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.cache_path.is_file():
+            return
+        with open(self.cache_path, encoding="utf-8") as f:
+            for line in f:
+                items = line.rstrip("\n").split("\t", 3)
+                if len(items) == 4:
+                    mtime_ns, width, height, path = items
+                    self._sizes[path] = (int(mtime_ns), int(width), int(height))
+
+    @staticmethod
+    def key(img_path) -> str:
+        return os.path.abspath(str(img_path))
+
+    def lookup(self, img_path, mtime_ns: int = None):
+        """
+        Cached (width, height) if the file has not changed, else None.
+        """
+        key = self.key(img_path)
+        if mtime_ns is None:
+            mtime_ns = os.stat(key).st_mtime_ns
+        with self._lock:
+            entry = self._sizes.get(key)
+        if entry is not None and entry[0] == mtime_ns:
+            return entry[1], entry[2]
+        return None
+
+    def add(self, img_path, mtime_ns: int, width: int, height: int):
+        with self._lock:
+            self._sizes[self.key(img_path)] = (mtime_ns, width, height)
+            self._dirty = True
+
+    def get(self, img_path) -> Tuple[int, int]:
+        key = self.key(img_path)
+        mtime_ns = os.stat(key).st_mtime_ns
+        size = self.lookup(key, mtime_ns)
+        if size is None:
+            size = get_image_size(key)
+            self.add(key, mtime_ns, *size)
+        return size
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            lines = [
+                "{}\t{}\t{}\t{}\n".format(mtime_ns, width, height, path)
+                for path, (mtime_ns, width, height) in self._sizes.items()
+            ]
+            self._dirty = False
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(str(self.cache_path) + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.cache_path)
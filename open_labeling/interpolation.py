@@ -0,0 +1,114 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from open_labeling.tracker_journal import TrackerJournal
+
+KEYFRAME_MAX_SHIFT = 0.5  # centre shift between keyframes of one object, in box sizes
+
+
+def interpolate_boxes(key_positions: Sequence[int], key_boxes, positions) -> np.ndarray:
+    """
+    Linear interpolation of the (k, 4) keyframe boxes (xmin, ymin, xmax,
+    ymax) at the frame positions given, one np.interp call per coordinate.
+    Returns an (n, 4) int array.
+
+    """
+    key_positions = np.asarray(key_positions, dtype=float)
+    key_boxes = np.asarray(key_boxes, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    boxes = np.empty((len(positions), 4))
+    for column in range(4):
+        boxes[:, column] = np.interp(positions, key_positions, key_boxes[:, column])
+    return np.rint(boxes).astype(int)
+
+
+def yolo_lines(class_index: int, boxes: np.ndarray, width, height) -> List[str]:
+    """
+    Vectorized equivalent of yolo_format for many boxes of one class,
+    producing the same text.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    columns = np.empty_like(boxes)
+    columns[:, 0] = (boxes[:, 0] + boxes[:, 2]) / (2.0 * width)
+    columns[:, 1] = (boxes[:, 1] + boxes[:, 3]) / (2.0 * height)
+    columns[:, 2] = np.abs(boxes[:, 2] - boxes[:, 0]) / width
+    columns[:, 3] = np.abs(boxes[:, 3] - boxes[:, 1]) / height
+    prefix = str(class_index)
+    return [" ".join([prefix, *map(str, row)]) for row in columns.tolist()]
+
+
+def interpolate_keyframes(
+    journal: TrackerJournal,
+    anchor_id: int,
+    frame_paths: Sequence,
+    width: int,
+    height: int,
+    write_lines: Callable,
+    positions: Optional[Dict[str, int]] = None,
+) -> int:
+    """
+    Fills the frames between the first and last keyframe of `anchor_id`
+    (the objects marked as keyframes in the tracker data) that have no box
+    for it yet with boxes interpolated linearly between the surrounding
+    keyframes, in one vectorized pass. The boxes are added to the journal
+    and their YOLO lines handed to `write_lines(frame_path, lines)`.
+
+    `frame_paths` are the frames of the video in order; `positions` maps
+    str(path) to its position in it, built from frame_paths if not given.
+    Returns the number of boxes added.
+    """
+    if positions is None:
+        positions = {str(frame_path): i for i, frame_path in enumerate(frame_paths)}
+    track = journal.track(anchor_id)
+    keyframes = sorted(
+        (positions[img_path], obj_dict)
+        for img_path, obj_dict in track.items()
+        if obj_dict.get("keyframe") and img_path in positions
+    )
+    if len(keyframes) < 2:
+        return 0
+    key_positions = np.array([position for position, _obj_dict in keyframes])
+    key_boxes = [
+        [obj_dict["bbox"]["xmin"], obj_dict["bbox"]["ymin"], obj_dict["bbox"]["xmax"], obj_dict["bbox"]["ymax"]]
+        for _position, obj_dict in keyframes
+    ]
+    missing = np.array([
+        position for position in range(key_positions[0] + 1, key_positions[-1])
+        if str(frame_paths[position]) not in track
+    ], dtype=int)
+    if len(missing) == 0:
+        return 0
+    class_index = keyframes[-1][1]["class_index"]
+    boxes = interpolate_boxes(key_positions, key_boxes, missing)
+    # like tracker predictions, count the frames since the previous keyframe
+    prediction_indexes = missing - key_positions[np.searchsorted(key_positions, missing) - 1]
+    lines = yolo_lines(class_index, boxes, width, height)
+    for position, box, prediction_index, line in zip(missing.tolist(), boxes.tolist(), prediction_indexes.tolist(), lines):
+        journal.add_object(frame_paths[position], anchor_id, prediction_index, [class_index, *box])
+        write_lines(frame_paths[position], [line])
+    return len(missing)
+
+
+def continues_track(track: Dict[str, Dict], img_path, obj, positions: Dict[str, int]) -> bool:
+    """
+    True if obj ([class_index, xmin, ymin, xmax, ymax] on img_path) can be
+    the next keyframe of `track` (see TrackerJournal.track): the frame has
+    no box of the track yet, the class is the same and the centre of obj
+    is within KEYFRAME_MAX_SHIFT box sizes of the centre of the keyframe
+    nearest to img_path. Another object of the same class labelled next
+    starts its own track instead of being merged into this one.
+    """
+    keyframes = {frame_path: obj_dict for frame_path, obj_dict in track.items() if obj_dict.get("keyframe")}
+    if not keyframes or str(img_path) in track or next(iter(keyframes.values()))["class_index"] != obj[0]:
+        return False
+    position = positions.get(str(img_path), 0)
+    nearest_path = min(keyframes, key=lambda frame_path: abs(positions.get(frame_path, position) - position))
+    nearest = keyframes[nearest_path]["bbox"]
+    _class_index, xmin, ymin, xmax, ymax = obj
+    size = (nearest["xmax"] - nearest["xmin"] + nearest["ymax"] - nearest["ymin"]) / 2.0
+    shift = np.hypot(
+        (xmin + xmax - nearest["xmin"] - nearest["xmax"]) / 2.0,
+        (ymin + ymax - nearest["ymin"] - nearest["ymax"]) / 2.0,
+    )
+    return shift <= KEYFRAME_MAX_SHIFT * size
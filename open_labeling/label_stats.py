@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from open_labeling.common import IMAGE_SUFFIXES
+from open_labeling.load_classes import resolve_class_list
+from open_labeling.yolo_annotations import find_annotation_files, load_yolo_annotations, parse_yolo_text
+
+CACHE_FILE_NAME = ".label_stats_cache.json"
+CHUNK_SIZE = 2000  # annotation files per worker task
+EPS = 1e-6  # tolerance for rounding in yolo_format when testing the [0, 1] bounds
+N_EXAMPLES = 10  # offending files listed per problem in the printed report
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Annotation statistics and validation report")
+    parser.add_argument(
+        "-f",
+        "--root-folder",
+        required=True,
+        help="Root directory; every YOLO_darknet/*.txt below it is audited.",
+    )
+    parser.add_argument(
+        "-c",
+        "--class-list",
+        default=None,
+        nargs="*",
+        help="Class list used to flag out of range class indices (defaults to classes.json or class_list.txt).",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=None,
+        type=int,
+        help="Number of worker processes (defaults to the number of CPUs).",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        type=str,
+        help="Optionally also write the full report as JSON to this path.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the per-file cache.",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def file_problem(ann_path: Path) -> Optional[str]:
+    """
+    "missing" if the file can't be read (e.g. deleted during the run),
+    "malformed" if it does not parse or has a class that is not an
+    integer, else None.
+    """
+    try:
+        with open(ann_path) as f:
+            rows = parse_yolo_text(f.read())
+    except OSError:
+        return "missing"
+    except ValueError:
+        return "malformed"
+    if not np.array_equal(rows[:, 0], np.trunc(rows[:, 0])):
+        return "malformed"
+    return None
+
+
+def chunk_file_stats(ann_paths: List[str]) -> List[Optional[Dict]]:
+    """
+    Per-file summaries for a chunk of annotation files, computed with a
+    handful of vectorized operations over all boxes in the chunk. Files
+    that do not parse (e.g. a non-numeric token or a class of 1.7) are
+    summarized as malformed, without boxes, and files that can no longer
+    be read get None, instead of failing the chunk.
+
+    """
+    ann_paths = [Path(p) for p in ann_paths]
+    try:
+        annotations = load_yolo_annotations(None, n_workers=1, annotation_paths=ann_paths, strict=True)
+    except (ValueError, OSError):
+        problems = [file_problem(ann_path) for ann_path in ann_paths]
+        good_paths = [ann_path for ann_path, problem in zip(ann_paths, problems) if problem is None]
+        annotations = load_yolo_annotations(None, n_workers=1, annotation_paths=good_paths)
+        summaries = iter(annotation_summaries(annotations, len(good_paths)))
+        return [
+            None if problem == "missing"
+            else {"n_boxes": 0, "classes": {}, "out_of_range": 0, "zero_area": 0, "malformed": True} if problem
+            else next(summaries)
+            for problem in problems
+        ]
+    return annotation_summaries(annotations, len(ann_paths))
+
+
+def annotation_summaries(annotations, n_files: int) -> List[Dict]:
+    records = annotations.records
+    image_ids = records["image_id"]
+    cx, cy, w, h = records["cx"], records["cy"], records["w"], records["h"]
+
+    values = np.stack([cx, cy, w, h])
+    out_of_range = ((values < -EPS) | (values > 1 + EPS)).any(axis=0)
+    out_of_range |= (cx - w / 2 < -EPS) | (cx + w / 2 > 1 + EPS)
+    out_of_range |= (cy - h / 2 < -EPS) | (cy + h / 2 > 1 + EPS)
+    zero_area = (w * h) <= 0
+
+    n_boxes = annotations.boxes_per_image()
+    n_out_of_range = np.bincount(image_ids, weights=out_of_range, minlength=n_files).astype(int)
+    n_zero_area = np.bincount(image_ids, weights=zero_area, minlength=n_files).astype(int)
+
+    class_counts = [{} for _ in range(n_files)]
+    if len(records) > 0:
+        pairs = np.stack([image_ids, records["class_index"]], axis=1)
+        unique_pairs, counts = np.unique(pairs, axis=0, return_counts=True)
+        for (image_id, class_index), count in zip(unique_pairs.tolist(), counts.tolist()):
+            class_counts[image_id][str(class_index)] = count
+
+    return [
+        {
+            "n_boxes": int(n_boxes[i]),
+            "classes": class_counts[i],
+            "out_of_range": int(n_out_of_range[i]),
+            "zero_area": int(n_zero_area[i]),
+            "malformed": False,
+        }
+        for i in range(n_files)
+    ]
+
+
+def load_cache(cache_path: Path) -> Dict:
+    if cache_path.is_file():
+        try:
+            with open(cache_path) as f:
+                return json.load(f)
+        except ValueError:
+            pass  # A corrupt cache is simply rebuilt.
+    return {}
+
+
+def save_cache(cache_path: Path, cache: Dict):
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def collect_file_stats(root: Path, n_workers: int = None, use_cache: bool = True) -> Dict[str, Dict]:
+    """
+    Returns {annotation path relative to root: summary}. Files whose mtime
+    matches the cached entry are not re-read.
+
+    """
+    root = Path(root)
+    cache_path = root / CACHE_FILE_NAME
+    cache = load_cache(cache_path) if use_cache else {}
+
+    file_stats = {}
+    stale_paths = []
+    stale_mtimes = []
+    for ann_path in find_annotation_files(root):
+        key = ann_path.relative_to(root).as_posix()
+        mtime_ns = ann_path.stat().st_mtime_ns
+        cached = cache.get(key)
+        if cached is not None and cached["mtime_ns"] == mtime_ns:
+            file_stats[key] = cached
+        else:
+            stale_paths.append(ann_path)
+            stale_mtimes.append(mtime_ns)
+
+    chunks = [
+        [str(p) for p in stale_paths[i:i + CHUNK_SIZE]]
+        for i in range(0, len(stale_paths), CHUNK_SIZE)
+    ]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            summaries = [summary for chunk in executor.map(chunk_file_stats, chunks) for summary in chunk]
+        for ann_path, mtime_ns, summary in zip(stale_paths, stale_mtimes, summaries):
+            if summary is None:  # deleted since it was listed
+                continue
+            summary["mtime_ns"] = mtime_ns
+            file_stats[ann_path.relative_to(root).as_posix()] = summary
+
+    if use_cache:
+        save_cache(cache_path, file_stats)
+    return file_stats
+
+
+def find_orphans(root: Path, ann_keys: List[str]) -> List[str]:
+    """
+    Annotation files with no image of the same stem in the folder that
+    holds their YOLO_darknet directory.
+    """
+    image_stems = {}
+    orphans = []
+    for key in ann_keys:
+        ann_path = root / key
+        image_dir = ann_path.parent.parent
+        if image_dir not in image_stems:
+            image_stems[image_dir] = {
+                p.stem for p in image_dir.iterdir()
+                if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES
+            }
+        if ann_path.stem not in image_stems[image_dir]:
+            orphans.append(key)
+    return orphans
+
+
+def build_report(root: Path, file_stats: Dict[str, Dict], class_list: List[str]) -> Dict:
+    max_class_index = len(class_list) - 1
+    class_histogram = Counter()
+    boxes_per_image = Counter()
+    out_of_range_files = []
+    zero_area_files = []
+    bad_class_files = []
+    malformed_files = []
+    for key, summary in file_stats.items():
+        if summary.get("malformed"):
+            malformed_files.append(key)
+            continue
+        boxes_per_image[summary["n_boxes"]] += 1
+        for class_index, count in summary["classes"].items():
+            class_histogram[int(class_index)] += count
+        if summary["out_of_range"]:
+            out_of_range_files.append(key)
+        if summary["zero_area"]:
+            zero_area_files.append(key)
+        if any(not 0 <= int(c) <= max_class_index for c in summary["classes"]):
+            bad_class_files.append(key)
+
+    n_boxes = sum(class_histogram.values())
+    return {
+        "root_folder": str(root),
+        "n_annotation_files": len(file_stats),
+        "n_boxes": n_boxes,
+        "class_histogram": {
+            (class_list[c] if 0 <= c <= max_class_index else str(c)): class_histogram[c]
+            for c in sorted(class_histogram)
+        },
+        "boxes_per_image": {str(n): boxes_per_image[n] for n in sorted(boxes_per_image)},
+        "n_boxes_out_of_range": sum(s["out_of_range"] for s in file_stats.values()),
+        "n_zero_area_boxes": sum(s["zero_area"] for s in file_stats.values()),
+        "files_with_out_of_range_boxes": sorted(out_of_range_files),
+        "files_with_zero_area_boxes": sorted(zero_area_files),
+        "files_with_unknown_classes": sorted(bad_class_files),
+        "malformed_files": sorted(malformed_files),
+        "orphan_annotation_files": sorted(find_orphans(root, list(file_stats))),
+    }
+
+
+def print_report(report: Dict):
+    print("\nRoot folder: {}".format(report["root_folder"]))
+    print("Annotation files: {}".format(report["n_annotation_files"]))
+    print("Boxes: {}".format(report["n_boxes"]))
+    print("\nClass histogram:")
+    for class_name, count in report["class_histogram"].items():
+        print("  {:<20} {}".format(class_name, count))
+    print("\nBoxes per image:")
+    for n_boxes, count in report["boxes_per_image"].items():
+        print("  {:>5} boxes: {} images".format(n_boxes, count))
+    print("\nBoxes out of [0, 1]: {}".format(report["n_boxes_out_of_range"]))
+    print("Zero-area boxes: {}".format(report["n_zero_area_boxes"]))
+    for title, key in [
+        ("Files with out of range boxes", "files_with_out_of_range_boxes"),
+        ("Files with zero-area boxes", "files_with_zero_area_boxes"),
+        ("Files with unknown class indices", "files_with_unknown_classes"),
+        ("Malformed annotation files", "malformed_files"),
+        ("Orphan annotation files", "orphan_annotation_files"),
+    ]:
+        paths = report[key]
+        print("\n{}: {}".format(title, len(paths)))
+        for path in paths[:N_EXAMPLES]:
+            print("  " + path)
+        if len(paths) > N_EXAMPLES:
+            print("  ...")
+
+
+def main(args):
+    root = Path(args.root_folder)
+    if not root.is_dir():
+        raise RuntimeError("The root-folder provided does not exist or not a folder.")
+    class_list = resolve_class_list(args.class_list, root)
+    file_stats = collect_file_stats(root, n_workers=args.workers, use_cache=not args.no_cache)
+    report = build_report(root, file_stats, class_list)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(report, outfile, indent=4)
+    return report
+
+
+def run():  # Entry point
+    args = get_args()
+    main(args=args)
+
+
+if __name__ == "__main__":
+    parsed_args = get_args()
+    main(args=parsed_args)
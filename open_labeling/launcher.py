@@ -1,11 +1,11 @@
 import argparse
-import json
 import sys
 import subprocess
 import threading
 from pathlib import Path
 
 from open_labeling.common import check_if_folder_contains_sufficient_images
+from open_labeling.load_classes import get_class_list_from_json_file
 
 if sys.platform == "win32":
     SYS_STDOUT = subprocess.PIPE  # Prefer to use sys.stdout instead of
@@ -41,15 +41,10 @@ def get_args():
     )
     args = parser.parse_args()
     if args.class_list is None:
-        potential_src_file = Path(args.root_folder).parent / "classes.json"
-        if not potential_src_file.exists():
+        args.class_list = get_class_list_from_json_file(args.root_folder)
+        if args.class_list is None:
             print("You didn't provide an arg for classes (-c). Defaulting to dummy test classes.")
             args.class_list = TEST_CLASSES
-        else:  # load the keys from this json file
-            with open(str(potential_src_file), 'r') as file:
-                # Parse the JSON data from the file into a Python dictionary
-                classes_info = json.load(file)
-                args.class_list = [val["label"] for _, val in classes_info.items()]
 
     return args
 
@@ -1,4 +1,5 @@
 import configparser
+import json
 
 from pathlib import Path
 from typing import List, Tuple
@@ -38,6 +39,34 @@ def get_class_list_from_text_file():
     return classes_labels
 
 
+def get_class_list_from_json_file(root_folder) -> List[str]:
+    """
+    Reads the labels from a classes.json file sitting next to root_folder,
+    as used by the folder launcher. Returns None if there is no such file.
+
+    """
+    potential_src_file = Path(root_folder).parent / "classes.json"
+    if not potential_src_file.exists():
+        return None
+    with open(str(potential_src_file), "r") as file:
+        classes_info = json.load(file)
+    return [val["label"] for _, val in classes_info.items()]
+
+
+def resolve_class_list(class_list, root_folder) -> List[str]:
+    """
+    Class list precedence for the batch tools: explicit -c arguments, then
+    classes.json next to the root folder, then the most recent classes file.
+
+    """
+    if class_list:
+        return list(class_list)
+    class_list = get_class_list_from_json_file(root_folder)
+    if class_list is None:
+        class_list = get_class_list_from_text_file()
+    return class_list
+
+
 def update_class_list_from_args(args) -> Tuple[List, int]:
     if args.class_list:
         class_list = [class_name for class_name in args.class_list]
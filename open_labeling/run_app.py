@@ -1,20 +1,52 @@
 import argparse
-import json
 import pyperclip
 import os
-import re
 import time
+from functools import partial
 from pathlib import Path
 from typing import List
 
 import cv2
 import numpy as np
-from tqdm import tqdm
 
+from object_detection.detector import BACKENDS, create_detector, select_backend
+from object_detection.prelabel import class_indices_for, read_detector_config
+from open_labeling.annotation_store import TxtAnnotationStore, open_annotation_store
+from open_labeling.class_index import ClassImageIndex
+from open_labeling.common import natural_sort_key
+from open_labeling.extract_frames import extract_frames
+from open_labeling.frame_pipeline import read_frame
+from open_labeling.image_size import SIZE_INDEX_FILE_NAME, ImageSizeIndex
+from open_labeling.interpolation import continues_track, interpolate_keyframes
+from open_labeling.suggestions import (
+    BoxPropagator,
+    DetectorSuggester,
+    SuggestionStore,
+    draw_dashed_rectangle,
+    neighbour_images,
+    next_still_images,
+    suggestion_text,
+)
+from open_labeling.tracker_journal import TrackerJournal
+from open_labeling.tracking import (
+    TRACKER_DIR,
+    TRACKER_SCALES,
+    LabelTracker,
+    remove_already_tracked_objects,
+    tracker_json_path,
+)
 from open_labeling.load_classes import (
     get_class_list_from_text_file,
     update_class_list_from_args,
 )
+from open_labeling.video_source import get_video_frame, is_video_file, open_video
+from open_labeling.yolo_annotations import (
+    annotation_path_for_image,
+    parse_yolo_text,
+    yolo_format,
+    yolo_line_positions,
+    yolo_to_pixel_boxes,
+)
 
 CLASS_RGB = [
     (0, 0, 255),
@@ -61,7 +93,16 @@ last_img_index = 0
 n_frames = 200
 draw_from_pascal = False
 image_paths_list = []
+image_path_positions = {}  # str(image path) -> position in image_paths_list
 video_name_map = {}
+tracker_journals = {}  # .tracker json path -> TrackerJournal
+interpolation_anchors = {}  # video name -> anchor_id of the object whose keyframes are being labelled
+suggestion_store = SuggestionStore()  # boxes proposed by --propagate or --detector, waiting for [y] / [n]
+box_propagator = None  # BoxPropagator when --propagate is on
+propagated_objects = {}  # str(image path) -> the boxes last propagated from it
+detector_suggester = None  # DetectorSuggester when --detector is on
+detector_submitted_path = None  # the image whose detections were last asked for
+main_depth = 0  # main() runs again, nested, after an image is deleted
 base_level_line_thickness = 1
 
 # selected bounding box
@@ -79,6 +120,9 @@ class_index = 0
 img = None
 img_objects = []
 annotation_formats = {"YOLO_darknet": ".txt"}  # 'PASCAL_VOC' : '.xml',
+class_image_index = None  # ClassImageIndex for jumping between images of a class
+annotation_store = TxtAnnotationStore()  # or SqliteAnnotationStore with --store sqlite
+image_size_index = None  # ImageSizeIndex for image dimensions without decoding
 
 # change to the directory of this script
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
@@ -143,6 +187,68 @@ def get_args():
         type=int,
         help="number of frames to track object for",
     )
+    parser.add_argument(
+        "--tracker-scale",
+        default=1,
+        type=int,
+        choices=TRACKER_SCALES,
+        help="Track on frames reduced by this factor, e.g. 4 for 4K video (boxes are saved in full resolution)",
+    )
+    parser.add_argument(
+        "--tracker-threads",
+        default=None,
+        type=int,
+        help="CPU threads used by the DASIAMRPN network (defaults to the backend's choice)",
+    )
+    parser.add_argument(
+        "--dasiamrpn-backend",
+        default="torch",
+        choices=["torch", "onnx"],
+        help="Run DASIAMRPN with torch, or with cv2.dnn on an ONNX export (label_dasiamrpn_onnx) without torch",
+    )
+    parser.add_argument(
+        "--propagate",
+        default=0,
+        type=int,
+        help="After leaving a still image, track its boxes in the background and suggest them on the next N images",
+    )
+    parser.add_argument(
+        "--detector",
+        default=None,
+        type=str,
+        help="Suggest the boxes of this detection model (frozen graph or ONNX, see label_prelabel) on the image shown, "
+        "detected in the background with the threshold and object ids of config.ini",
+    )
+    parser.add_argument(
+        "--detector-backend",
+        default=None,
+        choices=BACKENDS,
+        help="Run --detector with tensorflow or cv2.dnn (default: dnn for .onnx or with --detector-config, tf otherwise)",
+    )
+    parser.add_argument(
+        "--detector-config",
+        default=None,
+        type=str,
+        help="Text graph of a frozen graph --detector for the dnn backend",
+    )
+    parser.add_argument(
+        "--detector-neighbours",
+        default=2,
+        type=int,
+        help="Also detect this many images after and before the image shown, ahead of time",
+    )
+    parser.add_argument(
+        "--store",
+        default="txt",
+        choices=["txt", "sqlite"],
+        help="Annotation storage: YOLO_darknet txt files, or a single SQLite database per folder",
+    )
+    parser.add_argument(
+        "--store-path",
+        default=None,
+        type=str,
+        help="Path to the SQLite database (defaults to annotations.sqlite in the image folder)",
+    )
     parser.add_argument(
         "--goto",
         default="0",
@@ -291,9 +397,24 @@ def load_image_at_index(x):
         exit(0)
     elif x >= len(image_paths_list):
         x = 0
+    if img is not None and x != img_index:
+        # moved with the trackbar ([a], [d] and [j], [k] propagate before changing img_index)
+        propagate_boxes()
     img_index = x
     img_path = image_paths_list[img_index]
-    img = cv2.imread(str(img_path))
+    img = read_frame(img_path)
+    if img is None:
+        video_frame = get_video_frame(img_path)
+        if video_frame is not None:
+            # CAP_PROP_FRAME_COUNT may count frames past the end of the video
+            source, frame_index = video_frame
+            img = np.zeros((source.height, source.width, 3), dtype=np.uint8)
+            display_text("Could not read frame {} of {}".format(frame_index, source.video_path.name), 2000)
+            return
+    suggest_detections()
+    text = suggestion_text(len(suggestion_store.get(img_path)))
+    if text is not None:
+        display_text(text, 2000)
     # text = "Showing image {}/{}, path: {}".format(
     #     str(img_index), str(last_img_index), img_path
     # )
@@ -338,17 +459,6 @@ def draw_line(img, x, y, height, width, color, line_thickness):
     cv2.line(img, (0, y), (width, y), color, line_thickness)
 
 
-def yolo_format(class_index, point_1, point_2, width, height):
-    # YOLO wants everything normalized
-    # Order: class x_center y_center x_width y_height
-    x_center = float((point_1[0] + point_2[0]) / (2.0 * width))
-    y_center = float((point_1[1] + point_2[1]) / (2.0 * height))
-    x_width = float(abs(point_2[0] - point_1[0])) / width
-    y_height = float(abs(point_2[1] - point_1[1])) / height
-    items = map(str, [class_index, x_center, y_center, x_width, y_height])
-    return " ".join(items)
-
-
 def voc_format(class_name, point_1, point_2):
     # Order: class_name xmin ymin xmax ymax
     xmin, ymin = min(point_1[0], point_2[0]), min(point_1[1], point_2[1])
@@ -371,28 +481,22 @@ def findIndex(obj_to_find):
     return ind
 
 
+def box_line_index(lines, obj_index):
+    """
+    The line of an annotation file holding img_objects[obj_index] (-1 if
+    none): lines no box was drawn from are not counted.
+    """
+    positions = yolo_line_positions(lines)
+    return positions[obj_index] if 0 <= obj_index < len(positions) else -1
+
+
 def append_bb(ann_path, line, extension):
     if ".txt" in extension:
-        with open(ann_path, "a") as myfile:
-            myfile.write(line + "\n")  # append line
+        annotation_store.append_line(ann_path, line)
     else:
         pass
 
 
-def yolo_to_voc(x_center, y_center, x_width, y_height, width, height):
-    x_center *= float(width)
-    y_center *= float(height)
-    x_width *= float(width)
-    y_height *= float(height)
-    x_width /= 2.0
-    y_height /= 2.0
-    xmin = int(round(x_center - x_width))
-    ymin = int(round(y_center - y_height))
-    xmax = int(round(x_center + x_width))
-    ymax = int(round(y_center + y_height))
-    return xmin, ymin, xmax, ymax
-
-
 def get_xml_object_data(obj):
     class_name = obj.find("name").text
     class_index = CLASS_LIST.index(class_name)
@@ -465,59 +569,53 @@ def draw_bboxes_from_file(tmp_img, annotation_paths, width, height):
         ann_path = next(
             path for path in annotation_paths if "YOLO_darknet" in str(path)
         )
-    if os.path.isfile(ann_path):
+    if annotation_store.exists(ann_path):
         if draw_from_pascal:
             raise RuntimeError("Support for VOC.xml discontinued.")
 
         else:
             # Draw from YOLO
-            with open(ann_path) as fp:
-                for idx, line in enumerate(fp):
-                    obj = line
-                    (
-                        class_name,
-                        class_index,
-                        xmin,
-                        ymin,
-                        xmax,
-                        ymax,
-                    ) = get_txt_object_data(obj, width, height)
-                    # print('{} {} {} {} {}'.format(class_index, xmin, ymin, xmax, ymax))
-                    img_objects.append([class_index, xmin, ymin, xmax, ymax])
-                    color = class_rgb[class_index].tolist()
-                    # draw bbox
-                    thickness_multiple = int(class_index / 15)
-                    line_thickness = base_level_line_thickness + thickness_multiple
-                    cv2.rectangle(
-                        tmp_img, (xmin, ymin), (xmax, ymax), color, line_thickness
-                    )
-                    # draw resizing anchors if the object is selected
-                    if is_bbox_selected:
-                        if idx == selected_bbox:
-                            tmp_img = draw_bbox_anchors(
-                                tmp_img, xmin, ymin, xmax, ymax, color
-                            )
-                    font = cv2.FONT_HERSHEY_SIMPLEX
-                    width_label = len(class_name) * 15 + 7
-                    if ymin > 20:
-                        y_label = ymin - 5
-                        x_label = xmin
+            rows = parse_yolo_text(annotation_store.read_text(ann_path))
+            class_indices, boxes = yolo_to_pixel_boxes(rows, width, height)
+            for idx, (class_index, (xmin, ymin, xmax, ymax)) in enumerate(
+                zip(class_indices.tolist(), boxes.tolist())
+            ):
+                class_name = CLASS_LIST[class_index]
+                img_objects.append([class_index, xmin, ymin, xmax, ymax])
+                color = class_rgb[class_index].tolist()
+                # draw bbox
+                thickness_multiple = int(class_index / 15)
+                line_thickness = base_level_line_thickness + thickness_multiple
+                cv2.rectangle(
+                    tmp_img, (xmin, ymin), (xmax, ymax), color, line_thickness
+                )
+                # draw resizing anchors if the object is selected
+                if is_bbox_selected:
+                    if idx == selected_bbox:
+                        tmp_img = draw_bbox_anchors(
+                            tmp_img, xmin, ymin, xmax, ymax, color
+                        )
+                font = cv2.FONT_HERSHEY_SIMPLEX
+                width_label = len(class_name) * 15 + 7
+                if ymin > 20:
+                    y_label = ymin - 5
+                    x_label = xmin
+                else:
+                    y_label = ymin + 20
+                    if xmin > width_label:
+                        x_label = xmin - width_label
                     else:
-                        y_label = ymin + 20
-                        if xmin > width_label:
-                            x_label = xmin - width_label
-                        else:
-                            x_label = xmin + 5
-                    cv2.putText(
-                        tmp_img,
-                        class_name,
-                        (x_label, y_label),
-                        font,
-                        0.6,
-                        color,
-                        line_thickness,
-                        cv2.LINE_AA,
-                    )
+                        x_label = xmin + 5
+                cv2.putText(
+                    tmp_img,
+                    class_name,
+                    (x_label, y_label),
+                    font,
+                    0.6,
+                    color,
+                    line_thickness,
+                    cv2.LINE_AA,
+                )
     return tmp_img
 
 
@@ -595,62 +693,46 @@ def edit_bbox(obj_to_edit, action):
     # if `current_img_path` is a frame from a video
     is_from_video, video_name = is_frame_from_video(current_img_in_video_path)
     if is_from_video:
-        # get json file corresponding to that video
-        json_file_path = "{}.json".format(os.path.join(tracker_dir, video_name))
-        file_exists, json_file_data = get_json_file_data(json_file_path)
+        # get tracker data corresponding to that video
+        journal = get_tracker_journal(video_name)
         # if json file exists
-        if file_exists:
+        if journal.file_exists:
             # match obj_to_edit with the corresponding json object
-            frame_data_dict = json_file_data["frame_data_dict"]
-            json_object_list = get_json_file_object_list(
-                current_img_in_video_path, frame_data_dict
-            )
-            obj_matched = get_json_object_dict(obj_to_edit, json_object_list)
+            obj_matched = journal.find_object(current_img_in_video_path, obj_to_edit)
             # if match found
             if obj_matched is not None:
                 # get this object's anchor_id
                 anchor_id = obj_matched["anchor_id"]
 
-                frame_path_list = get_next_frame_path_list(video_name, current_img_in_video_path)
-                frame_path_list.insert(0, current_img_in_video_path)
-
-                if "change_class" in action:
-                    # add also the previous frames
-                    prev_path_list = get_prev_frame_path_list(
-                        video_name, current_img_in_video_path
-                    )
-                    frame_path_list = prev_path_list + frame_path_list
+                # the frames of this track around the current one (the previous ones only
+                # when changing the class), found through the anchor_id index
+                frame_path_list = get_track_frame_path_list(
+                    journal, anchor_id, video_name, current_img_in_video_path,
+                    include_previous="change_class" in action,
+                )
 
                 # update json file if contain the same anchor_id
                 for frame_path in frame_path_list:
-                    json_object_list = get_json_file_object_list(
-                        frame_path, frame_data_dict
-                    )
-                    json_obj = get_json_file_object_by_id(json_object_list, anchor_id)
-                    if json_obj is not None:
-                        bboxes_to_edit_dict[frame_path] = [
-                            json_obj["class_index"],
-                            json_obj["bbox"]["xmin"],
-                            json_obj["bbox"]["ymin"],
-                            json_obj["bbox"]["xmax"],
-                            json_obj["bbox"]["ymax"],
-                        ]
-                        # edit json file
-                        if "delete" in action:
-                            json_object_list.remove(json_obj)
-                        elif "change_class" in action:
-                            json_obj["class_index"] = new_class_index
-                        elif "resize_bbox" in action:
-                            json_obj["bbox"]["xmin"] = new_x_left
-                            json_obj["bbox"]["ymin"] = new_y_top
-                            json_obj["bbox"]["xmax"] = new_x_right
-                            json_obj["bbox"]["ymax"] = new_y_bottom
-                    else:
-                        break
+                    json_obj = journal.get_object(frame_path, anchor_id)
+                    bboxes_to_edit_dict[frame_path] = [
+                        json_obj["class_index"],
+                        json_obj["bbox"]["xmin"],
+                        json_obj["bbox"]["ymin"],
+                        json_obj["bbox"]["xmax"],
+                        json_obj["bbox"]["ymax"],
+                    ]
+                    # edit tracker data
+                    if "delete" in action:
+                        journal.remove_object(frame_path, anchor_id)
+                    elif "change_class" in action:
+                        journal.set_class(frame_path, anchor_id, new_class_index)
+                    elif "resize_bbox" in action:
+                        journal.set_bbox(
+                            frame_path, anchor_id, new_x_left, new_y_top, new_x_right, new_y_bottom
+                        )
 
-                # save the edited data
-                with open(json_file_path, "w") as outfile:
-                    json.dump(json_file_data, outfile, sort_keys=True, indent=4)
+                # append the edits to the journal
+                journal.flush()
 
     # 3. loop through bboxes_to_edit_dict and edit the corresponding annotation files
     for path in bboxes_to_edit_dict:
@@ -660,42 +742,41 @@ def edit_bbox(obj_to_edit, action):
         for ann_path in get_annotation_paths(path, annotation_formats):
             if ".txt" in ann_path.name:
                 # edit YOLO file
-                with open(ann_path, "r") as old_file:
-                    lines = old_file.readlines()
+                lines = annotation_store.read_lines(ann_path)
 
-                yolo_line = yolo_format(
-                    class_index, (xmin, ymin), (xmax, ymax), width, height
-                )
-                # Idea: height and width ought to be stored
-                ind = findIndex(obj_to_edit)
+                # frames other than the one on screen may differ in size
+                img_width, img_height = get_image_dimensions(path)
+                ind = box_line_index(lines, findIndex(obj_to_edit))
                 i = 0
 
-                with open(ann_path, "w") as new_file:
-                    for line in lines:
-
-                        if i != ind:
-                            new_file.write(line)
-
-                        elif "change_class" in action:
-                            new_yolo_line = yolo_format(
-                                new_class_index,
-                                (xmin, ymin),
-                                (xmax, ymax),
-                                width,
-                                height,
-                            )
-                            new_file.write(new_yolo_line + "\n")
-                        elif "resize_bbox" in action:
-                            new_yolo_line = yolo_format(
-                                class_index,
-                                (new_x_left, new_y_top),
-                                (new_x_right, new_y_bottom),
-                                width,
-                                height,
-                            )
-                            new_file.write(new_yolo_line + "\n")
-
-                        i = i + 1
+                new_lines = []
+                for line in lines:
+
+                    if i != ind:
+                        new_lines.append(line)
+
+                    elif "change_class" in action:
+                        new_yolo_line = yolo_format(
+                            new_class_index,
+                            (xmin, ymin),
+                            (xmax, ymax),
+                            img_width,
+                            img_height,
+                        )
+                        new_lines.append(new_yolo_line + "\n")
+                    elif "resize_bbox" in action:
+                        new_yolo_line = yolo_format(
+                            class_index,
+                            (new_x_left, new_y_top),
+                            (new_x_right, new_y_bottom),
+                            img_width,
+                            img_height,
+                        )
+                        new_lines.append(new_yolo_line + "\n")
+
+                    i = i + 1
+                annotation_store.write_lines(ann_path, new_lines)
+                update_class_index(ann_path)
 
             else:
                 raise RuntimeError("Support for VOC discontinued.")
@@ -796,38 +877,11 @@ def draw_info_bb_selected(tmp_img):
     return tmp_img
 
 
-def natural_sort_key(s, _nsre=re.compile("([0-9]+)")):
-    return [
-        int(text) if text.isdigit() else text.lower() for text in _nsre.split(str(s))
-    ]
-
-
 def convert_video_to_images(video_path, n_frames, desired_img_format):
-    # create folder to store images (if video was not converted to images already)
-    file_path, file_extension = os.path.splitext(video_path)
-    # append extension to avoid collision of videos with same name
-    # e.g.: `video.mp4`, `video.avi` -> `video_mp4/`, `video_avi/`
-    file_extension = file_extension.replace(".", "_")
-    file_path += file_extension
-    video_name_ext = os.path.basename(file_path)
-    if not os.path.exists(file_path):
-        print(" Converting video to individual frames...")
-        cap = cv2.VideoCapture(video_path)
-        os.makedirs(file_path)
-        # read the video
-        for i in tqdm(range(n_frames)):
-            if not cap.isOpened():
-                break
-            # capture frame-by-frame
-            ret, frame = cap.read()
-            if ret == True:
-                # save each frame (we use this format to avoid repetitions)
-                frame_name = "{}_{}{}".format(video_name_ext, i, desired_img_format)
-                frame_path = os.path.join(file_path, frame_name)
-                cv2.imwrite(frame_path, frame)
-        # release the video capture object
-        cap.release()
-    return file_path, video_name_ext
+    # extract the frames into `video_ext/` (e.g.: `video.mp4`, `video.avi` -> `video_mp4/`, `video_avi/`
+    # to avoid collision of videos with same name), resuming a previous extraction if there is one
+    file_path, video_name_ext, _n_written = extract_frames(video_path, n_frames, desired_img_format)
+    return str(file_path), video_name_ext
 
 
 def get_annotation_paths(img_path: Path, annotation_formats) -> List[Path]:
@@ -845,236 +899,200 @@ def save_bounding_box(
         if ".txt" == ann_path.suffix:
             line = yolo_format(class_index, point_1, point_2, width, height)
             append_bb(ann_path, line, ".txt")
+            update_class_index(ann_path)
         elif ".xml" == ann_path.suffix:
             line = voc_format(CLASS_LIST[class_index], point_1, point_2)
             append_bb(ann_path, line, ".xml")
 
 
+def get_image_dimensions(img_path):
+    # width and height without decoding, except for the image on screen which is already decoded
+    if img_path == image_paths_list[img_index] or image_size_index is None:
+        return width, height
+    video_frame = get_video_frame(img_path)
+    if video_frame is not None:
+        return video_frame[0].width, video_frame[0].height
+    return image_size_index.get(img_path)
+
+
+def append_tracked_bbs(frame_path, lines):
+    for ann_path in get_annotation_paths(Path(frame_path), annotation_formats):
+        if ".txt" == ann_path.suffix:
+            annotation_store.append_lines(ann_path, lines)
+            update_class_index(ann_path)
+    suggestion_store.pop(frame_path)
+
+
+def show_tracked_bbs(frame, predictions):
+    # show predictions (drawn after tracking so they don't disturb the trackers)
+    for class_index, point_1, point_2 in predictions:
+        color = class_rgb[class_index].tolist()
+        cv2.rectangle(frame, point_1, point_2, color, base_level_line_thickness)
+    cv2.imshow(WINDOW_NAME, frame)
+    cv2.waitKey(DELAY)
+
+
+def update_class_index(ann_path):
+    if class_image_index is not None:
+        class_image_index.update(ann_path)
+
+
+def jump_to_class_image(step):
+    # show the next (step=1) or previous (step=-1) image containing the selected class
+    global img_index
+    if class_image_index is None or not class_image_index.ready.is_set():
+        display_text("Still indexing the annotation files...", 2000)
+        return
+    new_index = class_image_index.find_image(class_index, img_index, step)
+    if new_index is None:
+        display_text("No image contains class {}".format(CLASS_LIST[class_index]), 2000)
+        return
+    propagate_boxes()
+    img_index = new_index
+    load_image_at_index(img_index)
+    cv2.setTrackbarPos(TRACKBAR_IMG, WINDOW_NAME, img_index)
+
+
 def is_frame_from_video(img_path):
-    for video_name in video_name_map:
-        video_dir = os.path.join(input_dir, video_name)
-        if os.path.dirname(img_path) == video_dir:
+    frames_dir = Path(img_path).parent
+    for video_name, video_info in video_name_map.items():
+        # the video may live outside input_dir (--files-list)
+        if frames_dir == video_info["frames_dir"]:
             # image belongs to a video
             return True, video_name
     return False, None
 
 
-def get_json_file_data(json_file_path):
-    if os.path.isfile(json_file_path):
-        with open(json_file_path) as f:
-            data = json.load(f)
-            return True, data
+def get_tracker_journal(video_name):
+    # tracker data is loaded once per session and kept up to date in memory
+    json_file_path = tracker_json_path(tracker_dir, video_name)
+    if json_file_path not in tracker_journals:
+        tracker_journals[json_file_path] = TrackerJournal(json_file_path)
+    return tracker_journals[json_file_path]
+
+
+def update_image_path_positions():
+    global image_path_positions
+    image_path_positions = {str(img_path): i for i, img_path in enumerate(image_paths_list)}
+
+
+def add_interpolation_keyframe(obj):
+    """
+    Marks `obj` (a box of the current frame) as a keyframe of the object being
+    interpolated in this video and fills the frames between its keyframes.
+    A box of another class, on a frame that already has a keyframe of that
+    object, or away from its nearest keyframe (see continues_track) starts a
+    new object.
+    """
+    img_path = image_paths_list[img_index]
+    is_from_video, video_name = is_frame_from_video(img_path)
+    if not is_from_video:
+        display_text("Interpolation only works on the frames of a video", 1000)
+        return
+    journal = get_tracker_journal(video_name)
+    obj_dict = journal.find_object(img_path, obj)
+    if obj_dict is not None:
+        # already tracked or interpolated: make it a keyframe of its own object
+        anchor_id = obj_dict["anchor_id"]
+        journal.set_keyframe(img_path, anchor_id)
     else:
-        return False, {"n_anchor_ids": 0, "frame_data_dict": {}}
+        anchor_id = interpolation_anchors.get(video_name)
+        track = journal.track(anchor_id) if anchor_id is not None else {}
+        if not continues_track(track, img_path, obj, image_path_positions):
+            anchor_id = journal.n_anchor_ids
+            journal.set_n_anchor_ids(anchor_id + 1)
+        journal.add_object(img_path, anchor_id, 0, obj, keyframe=True)
+    interpolation_anchors[video_name] = anchor_id
+    n_interpolated = interpolate_keyframes(
+        journal, anchor_id, image_paths_list, width, height, append_tracked_bbs, positions=image_path_positions
+    )
+    journal.flush()
+    display_text("Keyframe added, {} boxes interpolated".format(n_interpolated), 1000)
+
+
+def propagate_boxes():
+    # hand the boxes of the still image being left to the propagation thread
+    img_path = image_paths_list[img_index]
+    if box_propagator is None or not img_objects or is_frame_from_video(img_path)[0]:
+        return
+    objects = [list(obj) for obj in img_objects]
+    if propagated_objects.get(str(img_path)) == objects:
+        return  # nothing changed since the last time
+    propagated_objects[str(img_path)] = objects
+    next_paths = next_still_images(
+        image_paths_list, img_index, parsed_args.propagate, lambda path: is_frame_from_video(path)[0]
+    )
+    if next_paths:
+        box_propagator.submit(img_path, img, objects, next_paths)
+
+
+def suggest_detections():
+    # hand the image being shown and its neighbours to the detector thread
+    global detector_submitted_path
+    img_path = image_paths_list[img_index]
+    if detector_suggester is None or detector_submitted_path == img_path:
+        return
+    detector_submitted_path = img_path
+    detector_suggester.submit(img_path, neighbour_images(image_paths_list, img_index, parsed_args.detector_neighbours))
+
+
+def detector_class_indices(detected_ids, obj_ids):
+    # object ids of the detector -> class indices, -1 for those past the class list
+    return class_indices_for(detected_ids, obj_ids, MAX_CLASS_INDEX + 1)
+
+
+def draw_suggestions(tmp_img, img_path):
+    for suggested_class, xmin, ymin, xmax, ymax in suggestion_store.get(img_path):
+        color = class_rgb[suggested_class].tolist()
+        draw_dashed_rectangle(tmp_img, (xmin, ymin), (xmax, ymax), color, base_level_line_thickness)
+    return tmp_img
+
+
+def accept_suggestions(img_path, annotation_paths):
+    suggestions = suggestion_store.pop(img_path)
+    for suggested_class, xmin, ymin, xmax, ymax in suggestions:
+        # trackers may push a box past the border of the image
+        point_1 = (max(0, xmin), max(0, ymin))
+        point_2 = (min(width - 1, xmax), min(height - 1, ymax))
+        save_bounding_box(annotation_paths, suggested_class, point_1, point_2, width, height)
+    if suggestions:
+        display_text("Accepted {} suggested boxes".format(len(suggestions)), 1000)
+
+
+def has_annotations(img_path):
+    return annotation_store.read_text(annotation_path_for_image(img_path)).strip() != ""
 
 
 def get_prev_frame_path_list(video_name, img_path):
     first_index = video_name_map[video_name]["first_index"]
-    last_index = video_name_map[video_name]["last_index"]
-    img_index = image_paths_list.index(img_path)
+    img_index = image_path_positions[str(img_path)]
     return image_paths_list[first_index:img_index]
 
 
 def get_next_frame_path_list(video_name, img_path):
-    first_index = video_name_map[video_name]["first_index"]
     last_index = video_name_map[video_name]["last_index"]
-    img_index = image_paths_list.index(img_path)
+    img_index = image_path_positions[str(img_path)]
     return image_paths_list[(img_index + 1) : last_index]
 
 
-def get_json_object_dict(obj, json_object_list):
-    if len(json_object_list) > 0:
-        class_index, xmin, ymin, xmax, ymax = map(int, obj)
-        for d in json_object_list:
-            if (
-                d["class_index"] == class_index
-                and d["bbox"]["xmin"] == xmin
-                and d["bbox"]["ymin"] == ymin
-                and d["bbox"]["xmax"] == xmax
-                and d["bbox"]["ymax"] == ymax
-            ):
-                return d
-    return None
-
-
-def remove_already_tracked_objects(object_list, img_path, json_file_data):
-    frame_data_dict = json_file_data["frame_data_dict"]
-    json_object_list = get_json_file_object_list(img_path, frame_data_dict)
-    # copy the list since we will be deleting elements without restarting the loop
-    temp_object_list = object_list[:]
-    for obj in temp_object_list:
-        obj_dict = get_json_object_dict(obj, json_object_list)
-        if obj_dict is not None:
-            object_list.remove(obj)
-            json_object_list.remove(obj_dict)
-    return object_list
-
-
-def get_json_file_object_by_id(json_object_list, anchor_id):
-    for obj_dict in json_object_list:
-        if obj_dict["anchor_id"] == anchor_id:
-            return obj_dict
-    return None
-
-
-def get_json_file_object_list(img_path, frame_data_dict):
-    object_list = []
-    if img_path in frame_data_dict:
-        object_list = frame_data_dict[img_path]
-    return object_list
-
-
-def json_file_add_object(frame_data_dict, img_path, anchor_id, pred_counter, obj):
-    object_list = get_json_file_object_list(img_path, frame_data_dict)
-    class_index, xmin, ymin, xmax, ymax = obj
-
-    bbox = {"xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax}
-
-    temp_obj = {
-        "anchor_id": anchor_id,
-        "prediction_index": pred_counter,
-        "class_index": class_index,
-        "bbox": bbox,
-    }
-
-    object_list.append(temp_obj)
-    frame_data_dict[img_path] = object_list
-
-    return frame_data_dict
-
-
-class LabelTracker:
-    """Special thanks to Rafael Caballero Gonzalez"""
-
-    # extract the OpenCV version info, e.g.:
-    # OpenCV 3.3.4 -> [major_ver].[minor_ver].[subminor_ver]
-    (major_ver, minor_ver, subminor_ver) = (cv2.__version__).split(".")
-
-    # Idea: pressing ESC to stop the tracking process
-
-    def __init__(self, tracker_type, init_frame, next_frame_path_list):
-        tracker_types = [
-            "CSRT",
-            "KCF",
-            "MOSSE",
-            "MIL",
-            "BOOSTING",
-            "MEDIANFLOW",
-            "TLD",
-            "GOTURN",
-            "DASIAMRPN",
-        ]
-        """ Recomended tracker_type:
-              KCF -> KCF is usually very good (minimum OpenCV 3.1.0)
-              CSRT -> More accurate than KCF but slightly slower (minimum OpenCV 3.4.2)
-              MOSSE -> Less accurate than KCF but very fast (minimum OpenCV 3.4.1)
-        """
-        self.tracker_type = tracker_type
-        # Idea: remove this if I assume OpenCV version > 3.4.0
-        if tracker_type == tracker_types[0] or tracker_type == tracker_types[2]:
-            if int(self.major_ver == 3) and int(self.minor_ver) < 4:
-                self.tracker_type = tracker_types[1]  # Use KCF instead of CSRT or MOSSE
-        # --
-        self.init_frame = init_frame
-        self.next_frame_path_list = next_frame_path_list
-
-        self.img_h, self.img_w = init_frame.shape[:2]
-
-    def call_tracker_constructor(self, tracker_type, dasiamrpn):
-        if tracker_type == "DASIAMRPN":
-            tracker = dasiamrpn()
-        else:
-            # Idea: remove this if I assume OpenCV version > 3.4.0
-            if int(self.major_ver == 3) and int(self.minor_ver) < 3:
-                # tracker = cv2.Tracker_create(tracker_type)
-                pass
-            # --
-            else:
-                try:
-                    tracker = cv2.TrackerKCF_create()
-                except AttributeError as error:
-                    print(error)
-                    print(
-                        "\nMake sure that OpenCV contribute is installed: opencv-contrib-python\n"
-                    )
-                if tracker_type == "CSRT":
-                    tracker = cv2.TrackerCSRT_create()
-                elif tracker_type == "KCF":
-                    tracker = cv2.TrackerKCF_create()
-                elif tracker_type == "MOSSE":
-                    tracker = cv2.TrackerMOSSE_create()
-                elif tracker_type == "MIL":
-                    tracker = cv2.TrackerMIL_create()
-                elif tracker_type == "BOOSTING":
-                    tracker = cv2.TrackerBoosting_create()
-                elif tracker_type == "MEDIANFLOW":
-                    tracker = cv2.TrackerMedianFlow_create()
-                elif tracker_type == "TLD":
-                    tracker = cv2.TrackerTLD_create()
-                elif tracker_type == "GOTURN":
-                    tracker = cv2.TrackerGOTURN_create()
-        return tracker
-
-    def start_tracker(
-        self,
-        json_file_data,
-        json_file_path,
-        img_path,
-        obj,
-        color,
-        annotation_formats,
-        line_thickness,
-    ):
-        tracker = self.call_tracker_constructor(self.tracker_type)
-        anchor_id = json_file_data["n_anchor_ids"]
-        frame_data_dict = json_file_data["frame_data_dict"]
-
-        pred_counter = 0
-        frame_data_dict = json_file_add_object(
-            frame_data_dict, img_path, anchor_id, pred_counter, obj
-        )
-        # tracker bbox format: xmin, xmax, w, h
-        xmin, ymin, xmax, ymax = obj[1:5]
-        initial_bbox = (xmin, ymin, xmax - xmin, ymax - ymin)
-        tracker.init(self.init_frame, initial_bbox)
-        for frame_path in self.next_frame_path_list:
-            next_image = cv2.imread(frame_path)
-            # get the new bbox prediction of the object
-            success, bbox = tracker.update(next_image.copy())
-            if pred_counter >= n_frames:
-                success = False
-            if success:
-                pred_counter += 1
-                xmin, ymin, w, h = map(int, bbox)
-                xmax = xmin + w
-                ymax = ymin + h
-                obj = [class_index, xmin, ymin, xmax, ymax]
-                frame_data_dict = json_file_add_object(
-                    frame_data_dict, frame_path, anchor_id, pred_counter, obj
-                )
-                cv2.rectangle(
-                    next_image, (xmin, ymin), (xmax, ymax), color, line_thickness
-                )
-                # save prediction
-                annotation_paths = get_annotation_paths(frame_path, annotation_formats)
-                save_bounding_box(
-                    annotation_paths,
-                    class_index,
-                    (xmin, ymin),
-                    (xmax, ymax),
-                    self.img_w,
-                    self.img_h,
-                )
-                # show prediction
-                cv2.imshow(WINDOW_NAME, next_image)
-                pressed_key = cv2.waitKey(DELAY)
-            else:
-                break
-
-        json_file_data.update({"n_anchor_ids": (anchor_id + 1)})
-        # save the updated data
-        with open(json_file_path, "w") as outfile:
-            json.dump(json_file_data, outfile, sort_keys=True, indent=4)
+def get_track_frame_path_list(journal, anchor_id, video_name, img_path, include_previous=False):
+    """
+    The run of consecutive frames around img_path (inclusive) in which
+    anchor_id was tracked, stepping through the video only while the track
+    continues, so the cost is proportional to the length of the track.
+    """
+    first_index = video_name_map[video_name]["first_index"]
+    last_index = video_name_map[video_name]["last_index"]
+    track = journal.track(anchor_id)
+    img_index = image_path_positions[str(img_path)]
+    start = img_index
+    if include_previous:
+        while start > first_index and str(image_paths_list[start - 1]) in track:
+            start -= 1
+    end = img_index + 1
+    while end < last_index and str(image_paths_list[end]) in track:
+        end += 1
+    return image_paths_list[start:end]
 
 
 def complement_bgr(color):
@@ -1098,11 +1116,17 @@ def delete_image():
     # Consider using tkinter to make a popup to confirm deletion.
 
     img_path = Path(image_paths_list[img_index])
+    if get_video_frame(img_path) is not None:
+        display_text("Frames read from a video can't be deleted", 1000)
+        return
     annotation_path = img_path.parent / "YOLO_darknet" / f"{img_path.stem}.txt"
     image_paths_list.remove(img_path)
+    update_image_path_positions()
+    if class_image_index is not None:
+        class_image_index.set_image_paths(image_paths_list)
     load_image_at_index(img_index)
     os.unlink(str(img_path))
-    os.unlink(str(annotation_path))
+    annotation_store.delete(annotation_path)
     # PySimpleGUI removed because it went commercial.
     # layout = [[Sg.Text("Are you sure that you want to delete this image permanently?")],
     #           [Sg.OK(), Sg.Cancel()]]
@@ -1134,19 +1158,27 @@ def main(args):
     global tracker_dir, draw_from_pascal
     global input_dir, output_dir, n_frames
     global point_1, point_2, width, height, selected_bbox, is_bbox_selected, prev_was_double_click
-    global base_level_line_thickness
+    global base_level_line_thickness, class_image_index, image_size_index, annotation_store
+    global box_propagator, detector_suggester, main_depth
 
+    main_depth += 1
     if args.class_list:
         global CLASS_LIST, MAX_CLASS_INDEX
         CLASS_LIST, MAX_CLASS_INDEX = update_class_list_from_args(args=args)
 
     n_frames = args.n_frames
-    tracker_dir = os.path.join(output_dir, ".tracker")
+    if hasattr(args, "output_dir"):
+        output_dir = args.output_dir
+    tracker_dir = os.path.join(output_dir, TRACKER_DIR)
     draw_from_pascal = args.draw_from_PASCAL_files
 
     base_level_line_thickness = args.thickness
+    dasiamrpn = None
     if args.tracker == "DASIAMRPN":
-        from dasiamrpn import dasiamrpn
+        from open_labeling.dasiamrpn import dasiamrpn, set_num_threads
+
+        set_num_threads(getattr(args, "tracker_threads", None))
+        dasiamrpn = partial(dasiamrpn, getattr(args, "dasiamrpn_backend", "torch"))
     image_file_paths = []
     if args.files_list and len(args.files_list) > 0:
         image_file_paths = [Path(file_path) for file_path in args.files_list if Path(file_path).exists()]
@@ -1204,10 +1236,66 @@ def main(args):
     #                 (os.path.join(video_frames_path, frame) for frame in frame_list)
     #             )
     # but this way is faster if we are confident that we only have images
-    image_paths_list = [img_path for img_path in image_file_paths if
-                        img_path.is_file() and img_path.suffix.lower() in {".jpg", ".png", ".ppm"}]
+    # (videos are labelled straight from the container, see video_source)
+    image_paths_list = []
+    for img_path in image_file_paths:
+        if not img_path.is_file():
+            continue
+        if is_video_file(img_path):
+            source = open_video(img_path)
+            first_index = len(image_paths_list)
+            image_paths_list.extend(source.frame_paths())
+            # store information about those frames
+            video_name_map[source.name] = {
+                "frames_dir": source.frames_dir,
+                "first_index": first_index,
+                "last_index": len(image_paths_list),  # exclusive
+            }
+        elif img_path.suffix.lower() in {".jpg", ".png", ".ppm"}:
+            image_paths_list.append(img_path)
+    update_image_path_positions()
 
     current_img_in_video_path = image_paths_list[0]
+    store_type = getattr(args, "store", "txt")
+    if store_type == "sqlite":
+        store_root = Path(image_paths_list[0]).parent
+        annotation_store.close()
+        annotation_store = open_annotation_store(store_type, store_root, getattr(args, "store_path", None))
+        if annotation_store.is_empty():
+            # first session with this database: take over the existing txt files
+            annotation_store.import_txt(
+                [annotation_path_for_image(img_path) for img_path in image_paths_list]
+            )
+
+    # main() runs again after an image is deleted, the worker carries over
+    if getattr(args, "propagate", 0) > 0 and box_propagator is None:
+        box_propagator = BoxPropagator(
+            suggestion_store,
+            lambda init_frame, frame_paths: LabelTracker(
+                args.tracker, init_frame, frame_paths, dasiamrpn, getattr(args, "tracker_scale", 1)
+            ),
+            has_annotations,
+            getattr(args, "tracker_scale", 1),
+        )
+    if getattr(args, "detector", None) and detector_suggester is None:
+        score_threshold, obj_ids, cuda_visible_devices = read_detector_config()
+        if cuda_visible_devices:
+            os.environ["CUDA_VISIBLE_DEVICES"] = cuda_visible_devices
+        backend = select_backend(args.detector, args.detector_backend, args.detector_config)
+        detector_kwargs = {"config_path": args.detector_config} if backend == "dnn" else {}
+        # the model is loaded by the worker, the window opens right away
+        detector_suggester = DetectorSuggester(
+            suggestion_store,
+            partial(create_detector, args.detector, score_threshold, obj_ids, backend, **detector_kwargs),
+            partial(detector_class_indices, obj_ids=obj_ids),
+            has_annotations,
+        )
+
+    class_image_index = ClassImageIndex(image_paths_list, store=annotation_store)
+    class_image_index.start()
+    image_size_index = ImageSizeIndex(
+        Path(image_paths_list[0]).parent / "YOLO_darknet" / SIZE_INDEX_FILE_NAME
+    )
     last_img_index = len(image_paths_list) - 1
     if last_img_index == 0:  # hack: slider must have length > 0
         last_img_index += 1
@@ -1228,18 +1316,11 @@ def main(args):
                     os.makedirs(new_video_dir)
 
     # create empty annotation files for each image, if it doesn't exist already
-    for img_path in image_paths_list:
-        abs_path = os.path.abspath(img_path)
-        folder_name = os.path.dirname(img_path)
-        image_name = os.path.basename(img_path)
-
-        for ann_path in get_annotation_paths(img_path, annotation_formats):
-            if not os.path.isfile(ann_path):
-                if ".txt" in ann_path.name:
-                    ann_path.parent.mkdir(exist_ok=True)
-                    open(str(ann_path), "a").close()
-                else:
-                    raise RuntimeError("Support for VOC discontinued.")
+    annotation_store.ensure_all(
+        ann_path
+        for img_path in image_paths_list
+        for ann_path in get_annotation_paths(img_path, annotation_formats)
+    )
     class_index = 0
     if hasattr(parsed_args, "goto") and parsed_args.goto is not None:
         img_index = parsed_args.goto
@@ -1314,6 +1395,8 @@ def main(args):
             dragBBox.handler_mouse_move(mouse_x, mouse_y)
         # draw already done bounding boxes
         tmp_img = draw_bboxes_from_file(tmp_img, annotation_paths, width, height)
+        # draw the boxes suggested by --propagate or --detector, dashed
+        tmp_img = draw_suggestions(tmp_img, img_path)
         # if bounding box is selected add extra info
         if is_bbox_selected:
             tmp_img = draw_info_bb_selected(tmp_img)
@@ -1329,6 +1412,8 @@ def main(args):
                 save_bounding_box(
                     annotation_paths, class_index, point_1, point_2, width, height
                 )
+                # the image is annotated now, [y] must not add the suggestions on top
+                suggestion_store.pop(img_path)
                 reset_drag_points()
 
         cv2.imshow(WINDOW_NAME, tmp_img)
@@ -1337,6 +1422,7 @@ def main(args):
         if dragBBox.anchor_being_dragged is None:
             """Key Listeners START"""
             if pressed_key == ord("a") or pressed_key == ord("d"):
+                propagate_boxes()
                 # show previous image key listener
                 if pressed_key == ord("a"):
                     img_index = decrease_index(img_index, last_img_index)
@@ -1345,7 +1431,7 @@ def main(args):
                     img_index = increase_index(img_index, last_img_index)
                 load_image_at_index(img_index)
                 cv2.setTrackbarPos(TRACKBAR_IMG, WINDOW_NAME, img_index)
-                cv2.setWindowTitle(WINDOW_NAME, "OpenLabeling: " + image_name)
+                cv2.setWindowTitle(WINDOW_NAME, "OpenLabeling: " + os.path.basename(image_paths_list[img_index]))
                 time.sleep(0.2)
             elif pressed_key == ord("s") or pressed_key == ord("w"):
                 # change down current class key listener
@@ -1364,13 +1450,22 @@ def main(args):
                 if is_bbox_selected:
                     obj_to_edit = img_objects[selected_bbox]
                     edit_bbox(obj_to_edit, "change_class:{}".format(class_index))
+            elif pressed_key == ord("j") or pressed_key == ord("k"):
+                # previous / next image containing the selected class
+                jump_to_class_image(-1 if pressed_key == ord("j") else 1)
+            elif pressed_key == ord("i") and is_bbox_selected:
+                # keyframe of the selected box, interpolating the frames in between
+                add_interpolation_keyframe(img_objects[selected_bbox])
             # help key listener
             elif pressed_key == ord("h"):
                 text = (
                     "[e] to show edges;\n"
                     "[q] to quit;\n"
                     "[a] or [d] to change Image;\n"
-                    "[w] or [s] to change Class.\n"
+                    "[w] or [s] to change Class;\n"
+                    "[j] or [k] for the previous or next Image with this Class;\n"
+                    "[i] to make the selected box a keyframe and interpolate between keyframes;\n"
+                    "[y] or [n] to accept or reject the suggested (dashed) boxes.\n"
                 )
                 display_text(text, 5000)
             # show edges key listener
@@ -1388,13 +1483,10 @@ def main(args):
                     # get list of objects associated to that frame
                     object_list = img_objects[:]
                     # remove the objects in that frame that are already in the `.json` file
-                    json_file_path = "{}.json".format(
-                        os.path.join(tracker_dir, video_name)
-                    )
-                    file_exists, json_file_data = get_json_file_data(json_file_path)
-                    if file_exists:
+                    journal = get_tracker_journal(video_name)
+                    if journal.file_exists:
                         object_list = remove_already_tracked_objects(
-                            object_list, img_path, json_file_data
+                            object_list, img_path, journal
                         )
                     if len(object_list) > 0:
                         # get list of frames following this image
@@ -1404,19 +1496,25 @@ def main(args):
                         # initial frame
                         init_frame = img.copy()
                         label_tracker = LabelTracker(
-                            args.tracker, init_frame, next_frame_path_list
+                            args.tracker,
+                            init_frame,
+                            next_frame_path_list,
+                            dasiamrpn,
+                            getattr(args, "tracker_scale", 1),
                         )
-                        for obj in object_list:
-                            class_index = obj[0]
-                            color = class_rgb[class_index].tolist()
-                            label_tracker.start_tracker(
-                                json_file_data,
-                                json_file_path,
-                                img_path,
-                                obj,
-                                color,
-                                annotation_formats,
-                            )
+                        label_tracker.start_trackers(
+                            journal,
+                            img_path,
+                            object_list,
+                            n_frames,
+                            append_tracked_bbs,
+                            show=show_tracked_bbs,
+                        )
+            elif pressed_key == ord("y"):
+                accept_suggestions(img_path, annotation_paths)
+            elif pressed_key == ord("n"):
+                if suggestion_store.pop(img_path):
+                    display_text("Rejected the suggested boxes", 1000)
             # quit key listener
             elif pressed_key == ord("q"):
                 break
@@ -1435,6 +1533,22 @@ def main(args):
             if cv2.getWindowProperty(WINDOW_NAME, cv2.WND_PROP_VISIBLE) < 1:
                 break
 
+    class_image_index.save()
+    image_size_index.save()
+    main_depth -= 1
+    # a nested main() returns into the loop of the outer one, which still uses the workers and the store
+    if main_depth == 0:
+        if box_propagator is not None:
+            box_propagator.close()
+            box_propagator = None
+        if detector_suggester is not None:
+            detector_suggester.close()
+            detector_suggester = None
+        for journal in tracker_journals.values():
+            journal.close()
+        tracker_journals.clear()
+        annotation_store.close()
+        annotation_store = TxtAnnotationStore()
     cv2.destroyAllWindows()
 
 
@@ -1445,8 +1559,7 @@ def change_class_to_fail(obj_to_edit):
     img_path = Path(image_paths_list[img_index])
     '''img_path = Path(current_img_path)  # current_img_path only seems to be used in video frames'''
     annotation_path = img_path.parent / "YOLO_darknet" / f"{img_path.stem}.txt"
-    with open(annotation_path, "r") as old_file:
-        lines = old_file.readlines()
+    lines = annotation_store.read_lines(annotation_path)
 
     new_yolo_line = yolo_format(
         _new_class_idx,
@@ -1456,13 +1569,10 @@ def change_class_to_fail(obj_to_edit):
         height,
     )
     # Idea: height and width ought to be stored
-    ind = findIndex(obj_to_edit)
-    with open(annotation_path, "w") as new_file:
-        for i, line in enumerate(lines):
-            if i != ind:
-                new_file.write(line)
-            else:
-                new_file.write(new_yolo_line + "\n")
+    ind = box_line_index(lines, findIndex(obj_to_edit))
+    new_lines = [line if i != ind else new_yolo_line + "\n" for i, line in enumerate(lines)]
+    annotation_store.write_lines(annotation_path, new_lines)
+    update_class_index(annotation_path)
 
 
 def reset_drag_points():
@@ -0,0 +1,270 @@
+import queue
+import threading
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from open_labeling.frame_pipeline import prefetch_frames, read_frame
+
+DASH_LENGTH = 8  # pixels of each dash of a suggested box
+
+
+class SuggestionStore:
+    """
+    Boxes proposed for images the user has not seen yet, as
+    [class_index, xmin, ymin, xmax, ymax] lists keyed by image path. They
+    are only written to the annotations when the user accepts them.
+    Shared between the GUI and the propagation thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suggestions: Dict[str, List[List[int]]] = {}
+
+    def set(self, img_path, objects: List[List[int]]):
+        with self._lock:
+            self._suggestions[str(img_path)] = [list(obj) for obj in objects]
+
+    def set_unless_annotated(self, img_path, objects: List[List[int]], has_annotations: Callable = None) -> bool:
+        """
+        set() unless has_annotations(img_path), checked under the lock: the
+        GUI saves a box before popping the suggestions of its image, so a
+        box drawn while the suggestions were computed always wins.
+        """
+        with self._lock:
+            if has_annotations is not None and has_annotations(img_path):
+                return False
+            self._suggestions[str(img_path)] = [list(obj) for obj in objects]
+            return True
+
+    def get(self, img_path) -> List[List[int]]:
+        with self._lock:
+            return list(self._suggestions.get(str(img_path), []))
+
+    def pop(self, img_path) -> List[List[int]]:
+        with self._lock:
+            return self._suggestions.pop(str(img_path), [])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._suggestions)
+
+
+class BoxPropagator:
+    """
+    Tracks the boxes of a finished image through the still images that
+    follow it on a worker thread, storing the predictions as suggestions,
+    so the GUI never waits on the tracker.
+
+    `make_tracker(init_frame, frame_paths)` returns a LabelTracker for the
+    job. Only the latest job matters: submitting a new one makes the job
+    being tracked stop at its next frame and drops the ones still queued.
+    Images for which `has_annotations(img_path)` is true get no
+    suggestions (the objects are still tracked through them), and the
+    propagation stops at an image of a different size or once every
+    tracker has lost its object.
+    """
+
+    def __init__(self, store: SuggestionStore, make_tracker: Callable, has_annotations: Callable = None, scale: int = 1):
+        self.store = store
+        self.make_tracker = make_tracker
+        self.has_annotations = has_annotations
+        self.scale = scale
+        self._jobs = queue.Queue()
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run, name="BoxPropagator", daemon=True)
+        self._thread.start()
+
+    def submit(self, img_path, init_frame, object_list: List[List[int]], next_paths: List):
+        self._generation += 1
+        self._jobs.put((self._generation, img_path, init_frame.copy(), [list(obj) for obj in object_list], list(next_paths)))
+
+    def wait(self):
+        """
+        Blocks until every submitted job has been tracked (or dropped).
+        """
+        self._jobs.join()
+
+    def close(self):
+        self._generation += 1
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                if job[0] == self._generation:
+                    self._propagate(*job)
+            except Exception as error:  # keep the worker alive for the next image
+                print("Box propagation failed: {}".format(error))
+            finally:
+                self._jobs.task_done()
+
+    def _propagate(self, generation, img_path, init_frame, object_list, next_paths):
+        label_tracker = self.make_tracker(init_frame, next_paths)
+        active_trackers = label_tracker.init_trackers(img_path, object_list)
+        frames = prefetch_frames(next_paths, loader=partial(read_frame, scale=self.scale))
+        try:
+            for frame_path, next_image in frames:
+                if generation != self._generation or not active_trackers or next_image is None:
+                    break
+                # photos of another size (e.g. another camera) end the sequence
+                if any(abs(n * self.scale - m) >= self.scale for n, m in zip(next_image.shape[:2], init_frame.shape[:2])):
+                    break
+                predictions = label_tracker.predict_frame(active_trackers, next_image)
+                if not predictions or generation != self._generation:
+                    break
+                self.store.set_unless_annotated(
+                    frame_path,
+                    [[class_index, *box] for _id, class_index, box, _shown_box in predictions],
+                    self.has_annotations,
+                )
+        finally:
+            frames.close()
+
+
+class DetectorSuggester:
+    """
+    Runs an object detector on the image being shown, then on its
+    neighbours, on a worker thread and stores the detections as
+    suggestions, so the GUI never waits on the model.
+
+    `make_detector()` is called on the worker at the first job, so the
+    model loads in the background too; `class_indices_for(detected_ids)`
+    maps the object ids of the detector to class indices, negative ones
+    being dropped. Like BoxPropagator only the latest job matters: results
+    of a job that was superseded while the model ran are discarded, and
+    the images it did not reach are left to the new job. Each image is
+    detected once per session, and images with annotations or with
+    suggestions already (e.g. from --propagate) are skipped.
+    """
+
+    def __init__(
+        self,
+        store: SuggestionStore,
+        make_detector: Callable,
+        class_indices_for: Callable,
+        has_annotations: Callable = None,
+    ):
+        self.store = store
+        self.make_detector = make_detector
+        self.class_indices_for = class_indices_for
+        self.has_annotations = has_annotations
+        self._detector = None
+        self._detected = set()  # str(image path) of the images already run through the detector
+        self._jobs = queue.Queue()
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run, name="DetectorSuggester", daemon=True)
+        self._thread.start()
+
+    def submit(self, img_path, neighbour_paths: List):
+        self._generation += 1
+        self._jobs.put((self._generation, [img_path, *neighbour_paths]))
+
+    def wait(self):
+        """
+        Blocks until every submitted job has been detected (or dropped).
+        """
+        self._jobs.join()
+
+    def close(self):
+        self._generation += 1
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                if job[0] == self._generation:
+                    self._suggest(*job)
+            except Exception as error:  # keep the worker alive for the next image
+                print("Detector suggestions failed: {}".format(error))
+            finally:
+                self._jobs.task_done()
+
+    def _suggest(self, generation, img_paths):
+        if self._detector is None:
+            self._detector = self.make_detector()
+        for img_path in img_paths:
+            if generation != self._generation:
+                break
+            if str(img_path) in self._detected or self.store.get(img_path):
+                continue
+            if self.has_annotations is not None and self.has_annotations(img_path):
+                continue
+            frame = read_frame(img_path)
+            if frame is None:
+                continue
+            boxes, _scores, detected_ids = self._detector.detect(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if generation != self._generation:
+                break  # the user moved on while the model ran
+            self._detected.add(str(img_path))
+            objects = detections_to_objects(boxes, self.class_indices_for(detected_ids))
+            if objects:
+                # the user may have drawn a box while the model ran
+                self.store.set_unless_annotated(img_path, objects, self.has_annotations)
+
+
+def detections_to_objects(boxes: np.ndarray, class_indices: np.ndarray) -> List[List[int]]:
+    """
+    [class_index, xmin, ymin, xmax, ymax] lists of detected (xmin, ymin,
+    width, height) boxes, without those of a negative class index.
+    """
+    boxes = np.round(np.asarray(boxes, dtype=np.float64).reshape(-1, 4)).astype(np.int64)
+    boxes[:, 2:] += boxes[:, :2]
+    return [
+        [int(class_index), *box] for class_index, box in zip(np.asarray(class_indices).tolist(), boxes.tolist())
+        if class_index >= 0
+    ]
+
+
+def draw_dashed_rectangle(img, point_1, point_2, color, thickness: int = 1, dash: int = DASH_LENGTH):
+    (x1, y1), (x2, y2) = point_1, point_2
+    for x in range(x1, x2, 2 * dash):
+        cv2.line(img, (x, y1), (min(x + dash, x2), y1), color, thickness)
+        cv2.line(img, (x, y2), (min(x + dash, x2), y2), color, thickness)
+    for y in range(y1, y2, 2 * dash):
+        cv2.line(img, (x1, y), (x1, min(y + dash, y2)), color, thickness)
+        cv2.line(img, (x2, y), (x2, min(y + dash, y2)), color, thickness)
+    return img
+
+
+def next_still_images(image_paths_list: List, index: int, n_images: int, is_video_frame: Callable) -> List:
+    """
+    Up to n_images images following image_paths_list[index], stopping at
+    the first video frame (videos are tracked with `p` instead).
+    """
+    next_paths = []
+    for img_path in image_paths_list[index + 1:index + 1 + n_images]:
+        if is_video_frame(img_path):
+            break
+        next_paths.append(img_path)
+    return next_paths
+
+
+def neighbour_images(image_paths_list: List, index: int, n_images: int) -> List:
+    """
+    Up to n_images images after image_paths_list[index] and as many
+    before it, nearest first, the following one before the previous one.
+    """
+    neighbours = []
+    for offset in range(1, n_images + 1):
+        if index + offset < len(image_paths_list):
+            neighbours.append(image_paths_list[index + offset])
+        if index - offset >= 0:
+            neighbours.append(image_paths_list[index - offset])
+    return neighbours
+
+
+def suggestion_text(n_suggestions: int) -> Optional[str]:
+    if n_suggestions == 0:
+        return None
+    return "{} suggested box{}: [y] to accept, [n] to reject".format(n_suggestions, "" if n_suggestions == 1 else "es")
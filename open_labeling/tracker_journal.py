@@ -0,0 +1,224 @@
+import json
+import os
+from typing import Dict, List
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_EVERY = 5000  # journal records replayed on load before the snapshot is rewritten
+# pixels a box may be off once read back from its YOLO line (yolo_format rounds, yolo_to_pixel_boxes truncates)
+BOX_TOLERANCE = 1
+
+
+def empty_tracker_data() -> Dict:
+    return {"n_anchor_ids": 0, "frame_data_dict": {}}
+
+
+def match_object_dict(obj, object_dicts: List[Dict], tolerance: int = BOX_TOLERANCE):
+    """
+    The object dict of the same class as obj ([class_index, xmin, ymin,
+    xmax, ymax]) whose box is nearest to obj's, if no coordinate is more
+    than tolerance pixels off, else None.
+    """
+    class_index, *box = map(int, obj)
+    best, best_distance = None, tolerance + 1
+    for obj_dict in object_dicts:
+        if obj_dict["class_index"] != class_index:
+            continue
+        bbox = obj_dict["bbox"]
+        distance = max(abs(a - b) for a, b in zip(box, (bbox["xmin"], bbox["ymin"], bbox["xmax"], bbox["ymax"])))
+        if distance < best_distance:
+            best, best_distance = obj_dict, distance
+    return best
+
+
+class TrackerJournal:
+    """
+    Tracker data of one video: the `.tracker/<video>.json` snapshot (same
+    layout as before) plus an append-only `<video>.json.journal` holding one
+    JSON operation per line since that snapshot.
+
+    Edits are applied to the in-memory data straight away and buffered;
+    flush() appends them to the journal in a single write, so the cost of an
+    edit is proportional to the edit and not to the length of the video.
+    The journal is folded into a fresh snapshot by compact(), which flush()
+    calls once the journal holds more than compact_every records.
+
+    The snapshot records the journal generation it includes and each journal
+    record carries its generation, so a crash between writing the snapshot
+    and truncating the journal does not replay operations twice.
+
+    Alongside the per-frame lists an index anchor_id -> {frame -> object} is
+    kept up to date, so all frames of a track are found without scanning
+    the video.
+    """
+
+    def __init__(self, json_file_path, compact_every: int = COMPACT_EVERY):
+        self.json_file_path = str(json_file_path)
+        self.journal_path = self.json_file_path + JOURNAL_SUFFIX
+        self.compact_every = compact_every
+        self._pending: List[Dict] = []
+        self.data = empty_tracker_data()
+        self._tracks: Dict[int, Dict[str, Dict]] = {}
+        self.file_exists = False
+        self.generation = 0
+        self._n_journal_records = 0
+        self._load()
+
+    @property
+    def frame_data_dict(self) -> Dict[str, List[Dict]]:
+        return self.data["frame_data_dict"]
+
+    @property
+    def n_anchor_ids(self) -> int:
+        return self.data["n_anchor_ids"]
+
+    def _load(self):
+        if os.path.isfile(self.json_file_path):
+            with open(self.json_file_path) as f:
+                self.data = json.load(f)
+            self.file_exists = True
+        self.generation = self.data.pop("journal_generation", 0)
+        for img_path, object_list in self.frame_data_dict.items():
+            for obj_dict in object_list:
+                self._tracks.setdefault(obj_dict["anchor_id"], {})[img_path] = obj_dict
+        if os.path.isfile(self.journal_path):
+            self.file_exists = True
+            good_offset = 0
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final line after a crash
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_offset += len(line)
+                    if record.get("g", 0) < self.generation:
+                        continue
+                    self._apply(record)
+                    self._n_journal_records += 1
+            if good_offset < os.path.getsize(self.journal_path):
+                # cut the torn line off, or the records flushed after it would be lost on the next load
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good_offset)
+
+    def object_list(self, img_path) -> List[Dict]:
+        return self.frame_data_dict.get(str(img_path), [])
+
+    def get_object(self, img_path, anchor_id):
+        return self._tracks.get(anchor_id, {}).get(str(img_path))
+
+    def track(self, anchor_id) -> Dict[str, Dict]:
+        """
+        The frames (as path strings) in which anchor_id was tracked, mapped
+        to its object dict in each of them.
+        """
+        return self._tracks.get(anchor_id, {})
+
+    def find_object(self, img_path, obj):
+        """
+        The object dict in img_path whose class equals obj's and whose box
+        is obj's up to BOX_TOLERANCE, or None.
+        """
+        return match_object_dict(obj, self.object_list(img_path))
+
+    def _apply(self, record: Dict):
+        op = record["op"]
+        if op == "n_anchor_ids":
+            self.data["n_anchor_ids"] = record["n"]
+            return
+        img_path = record["path"]
+        if op == "add":
+            class_index, xmin, ymin, xmax, ymax = record["obj"]
+            obj_dict = {
+                "anchor_id": record["anchor_id"],
+                "prediction_index": record["prediction_index"],
+                "class_index": class_index,
+                "bbox": {"xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax},
+            }
+            if record.get("keyframe"):
+                obj_dict["keyframe"] = True
+            self.frame_data_dict.setdefault(img_path, []).append(obj_dict)
+            self._tracks.setdefault(record["anchor_id"], {})[img_path] = obj_dict
+            return
+        obj_dict = self.get_object(img_path, record["anchor_id"])
+        if obj_dict is None:
+            return
+        if op == "remove":
+            self.frame_data_dict[img_path].remove(obj_dict)
+            del self._tracks[record["anchor_id"]][img_path]
+        elif op == "keyframe":
+            obj_dict["keyframe"] = True
+        elif op == "class":
+            obj_dict["class_index"] = record["class_index"]
+        elif op == "bbox":
+            xmin, ymin, xmax, ymax = record["bbox"]
+            obj_dict["bbox"] = {"xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax}
+
+    def _record(self, record: Dict):
+        record["g"] = self.generation
+        self._apply(record)
+        self._pending.append(record)
+
+    def add_object(self, img_path, anchor_id, pred_counter, obj, keyframe=False):
+        class_index, xmin, ymin, xmax, ymax = obj
+        record = {
+            "op": "add",
+            "path": str(img_path),
+            "anchor_id": anchor_id,
+            "prediction_index": pred_counter,
+            "obj": [class_index, xmin, ymin, xmax, ymax],
+        }
+        if keyframe:
+            record["keyframe"] = True
+        self._record(record)
+
+    def remove_object(self, img_path, anchor_id):
+        self._record({"op": "remove", "path": str(img_path), "anchor_id": anchor_id})
+
+    def set_keyframe(self, img_path, anchor_id):
+        self._record({"op": "keyframe", "path": str(img_path), "anchor_id": anchor_id})
+
+    def set_class(self, img_path, anchor_id, class_index):
+        self._record({"op": "class", "path": str(img_path), "anchor_id": anchor_id, "class_index": class_index})
+
+    def set_bbox(self, img_path, anchor_id, xmin, ymin, xmax, ymax):
+        self._record({"op": "bbox", "path": str(img_path), "anchor_id": anchor_id, "bbox": [xmin, ymin, xmax, ymax]})
+
+    def set_n_anchor_ids(self, n_anchor_ids):
+        self._record({"op": "n_anchor_ids", "n": n_anchor_ids})
+
+    def flush(self):
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in self._pending))
+        self._n_journal_records += len(self._pending)
+        self._pending = []
+        self.file_exists = True
+        if self._n_journal_records > self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrites the snapshot with everything applied so far and empties
+        the journal.
+        """
+        self._pending = []
+        self.generation += 1
+        snapshot = dict(self.data, journal_generation=self.generation)
+        tmp_path = self.json_file_path + ".tmp"
+        with open(tmp_path, "w") as outfile:
+            json.dump(snapshot, outfile, sort_keys=True, indent=4)
+        os.replace(tmp_path, self.json_file_path)
+        open(self.journal_path, "w").close()
+        self._n_journal_records = 0
+        self.file_exists = True
+
+    def close(self):
+        """
+        Folds a non-empty journal into the snapshot at the end of a session.
+        """
+        self.flush()
+        if self._n_journal_records > 0:
+            self.compact()
@@ -0,0 +1,430 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from functools import partial
+from typing import Callable, List, Optional
+
+import cv2
+
+from open_labeling.annotation_store import TxtAnnotationStore
+from open_labeling.common import IMAGE_SUFFIXES, natural_sort_key
+from open_labeling.frame_pipeline import REDUCED_READ_FLAGS, BackgroundWriter, prefetch_frames, read_frame
+from open_labeling.tracker_journal import TrackerJournal, match_object_dict
+from open_labeling.video_source import is_video_file, open_video
+from open_labeling.yolo_annotations import (
+    annotation_path_for_image,
+    read_yolo_file,
+    yolo_format,
+    yolo_to_pixel_boxes,
+)
+
+TRACKER_DIR = ".tracker"
+TRACKER_SCALES = [1] + sorted(REDUCED_READ_FLAGS)
+# OpenCV >= 4.5.1 keeps most of these only in cv2.legacy (opencv-contrib-python)
+OPENCV_TRACKER_CONSTRUCTORS = {
+    "CSRT": "TrackerCSRT_create",
+    "KCF": "TrackerKCF_create",
+    "MOSSE": "TrackerMOSSE_create",
+    "MIL": "TrackerMIL_create",
+    "BOOSTING": "TrackerBoosting_create",
+    "MEDIANFLOW": "TrackerMedianFlow_create",
+    "TLD": "TrackerTLD_create",
+    "GOTURN": "TrackerGOTURN_create",
+}
+
+
+def create_opencv_tracker(tracker_type):
+    constructor_name = OPENCV_TRACKER_CONSTRUCTORS[tracker_type]
+    for module in (cv2, getattr(cv2, "legacy", None)):
+        if module is not None and hasattr(module, constructor_name):
+            return getattr(module, constructor_name)()
+    raise AttributeError(
+        "{} tracker not found in this OpenCV build. "
+        "Make sure that OpenCV contribute is installed: opencv-contrib-python".format(tracker_type)
+    )
+
+
+def available_tracker_types() -> List[str]:
+    """
+    The OpenCV tracker types this build can construct (GOTURN also needs
+    its model files in the working directory to initialise).
+    """
+    tracker_types = []
+    for tracker_type, constructor_name in OPENCV_TRACKER_CONSTRUCTORS.items():
+        for module in (cv2, getattr(cv2, "legacy", None)):
+            if module is not None and hasattr(module, constructor_name):
+                tracker_types.append(tracker_type)
+                break
+    return tracker_types
+
+
+def tracker_json_path(tracker_dir, video_name) -> str:
+    return "{}.json".format(os.path.join(tracker_dir, video_name))
+
+
+def get_json_object_dict(obj, json_object_list):
+    # the boxes read back from the YOLO files may be a pixel off those recorded
+    return match_object_dict(obj, json_object_list)
+
+
+def remove_already_tracked_objects(object_list, img_path, journal):
+    # copy the json objects since the tracker data must not be modified here
+    json_object_list = list(get_json_file_object_list(img_path, journal.frame_data_dict))
+    # copy the list since we will be deleting elements without restarting the loop
+    temp_object_list = object_list[:]
+    for obj in temp_object_list:
+        obj_dict = get_json_object_dict(obj, json_object_list)
+        if obj_dict is not None:
+            object_list.remove(obj)
+            json_object_list.remove(obj_dict)
+    return object_list
+
+
+def get_json_file_object_list(img_path, frame_data_dict):
+    object_list = []
+    if str(img_path) in frame_data_dict:
+        object_list = frame_data_dict[str(img_path)]
+    return object_list
+
+
+class LabelTracker:
+    """Special thanks to Rafael Caballero Gonzalez"""
+
+    # extract the OpenCV version info, e.g.:
+    # OpenCV 3.3.4 -> [major_ver].[minor_ver].[subminor_ver]
+    (major_ver, minor_ver, subminor_ver) = (cv2.__version__).split(".")
+
+    # Idea: pressing ESC to stop the tracking process
+
+    def __init__(self, tracker_type, init_frame, next_frame_path_list, dasiamrpn=None, scale=1):
+        tracker_types = [
+            "CSRT",
+            "KCF",
+            "MOSSE",
+            "MIL",
+            "BOOSTING",
+            "MEDIANFLOW",
+            "TLD",
+            "GOTURN",
+            "DASIAMRPN",
+        ]
+        """ Recomended tracker_type:
+              KCF -> KCF is usually very good (minimum OpenCV 3.1.0)
+              CSRT -> More accurate than KCF but slightly slower (minimum OpenCV 3.4.2)
+              MOSSE -> Less accurate than KCF but very fast (minimum OpenCV 3.4.1)
+        """
+        self.tracker_type = tracker_type
+        # Idea: remove this if I assume OpenCV version > 3.4.0
+        if tracker_type == tracker_types[0] or tracker_type == tracker_types[2]:
+            if int(self.major_ver == 3) and int(self.minor_ver) < 4:
+                self.tracker_type = tracker_types[1]  # Use KCF instead of CSRT or MOSSE
+        # --
+        self.init_frame = init_frame
+        self.next_frame_path_list = next_frame_path_list
+        self.dasiamrpn = dasiamrpn
+        # the trackers see frames reduced by `scale`; boxes are kept in full resolution
+        self.scale = scale
+
+        self.img_h, self.img_w = init_frame.shape[:2]
+
+    def get_tracker_init_frame(self, img_path):
+        if self.scale == 1:
+            return self.init_frame
+        # decode the seed frame the same way as the following ones so that all have the same size
+        init_frame = read_frame(img_path, self.scale)
+        if init_frame is None:
+            init_frame = cv2.resize(
+                self.init_frame,
+                (self.img_w // self.scale, self.img_h // self.scale),
+                interpolation=cv2.INTER_AREA,
+            )
+        return init_frame
+
+    def get_frame_ratios(self, frame):
+        # full resolution / tracker resolution, per axis (reduced sizes are rounded differently per format)
+        frame_h, frame_w = frame.shape[:2]
+        return self.img_w / frame_w, self.img_h / frame_h
+
+    def call_tracker_constructor(self, tracker_type):
+        if tracker_type == "DASIAMRPN":
+            return self.dasiamrpn()
+        return create_opencv_tracker(tracker_type)
+
+    def start_trackers(
+        self,
+        journal: TrackerJournal,
+        img_path,
+        object_list: List[List[int]],
+        n_frames: int,
+        write_lines: Callable,
+        show: Optional[Callable] = None,
+    ):
+        """
+        Tracks all objects of `object_list` (found in `img_path`) through at
+        most `n_frames` following frames in a single pass: each frame is
+        decoded once and every tracker still following its object is updated
+        on it. A tracker that loses its object stops; the pass ends when none
+        are left.
+
+        The YOLO lines predicted for a frame are handed to
+        `write_lines(frame_path, lines)` on a background thread and, when
+        given, `show(frame, predictions)` is called with the frame as fed to
+        the trackers and the (class_index, point_1, point_2) predictions of
+        each frame in that frame's coordinates.
+        """
+        first_anchor_id = journal.n_anchor_ids
+        for i, obj in enumerate(object_list):
+            journal.add_object(img_path, first_anchor_id + i, 0, obj)
+        # [tracker, anchor_id, class_index] of the objects still being tracked
+        active_trackers = self.init_trackers(img_path, object_list, first_anchor_id)
+
+        # upcoming frames are decoded by a thread pool while the trackers run and
+        # annotation writes happen on a background thread
+        frames = prefetch_frames(
+            self.next_frame_path_list[:n_frames], loader=partial(read_frame, scale=self.scale)
+        )
+        writer = BackgroundWriter()
+        try:
+            n_predictions = self._track_frames(journal, frames, active_trackers, writer, write_lines, show)
+        finally:
+            frames.close()
+            writer.close()
+
+        journal.set_n_anchor_ids(first_anchor_id + len(object_list))
+        # append the new predictions to the journal
+        journal.flush()
+        return n_predictions
+
+    @staticmethod
+    def update_trackers(active_trackers, next_image):
+        trackers = [tracker_data[0] for tracker_data in active_trackers]
+        # trackers that can (DaSiamRPN) update all targets in one batch
+        update_many = getattr(type(trackers[0]), "update_many", None)
+        if update_many is not None:
+            return update_many(trackers, next_image)
+        return [tracker.update(next_image) for tracker in trackers]
+
+    def init_trackers(self, img_path, object_list: List[List[int]], first_id: int = 0) -> List[List]:
+        """
+        One tracker per object of `object_list`, initialised on the init
+        frame, as [tracker, id, class_index] with ids counting from first_id.
+        """
+        active_trackers = []
+        init_frame = self.get_tracker_init_frame(img_path)
+        ratio_x, ratio_y = self.get_frame_ratios(init_frame)
+        for i, obj in enumerate(object_list):
+            tracker = self.call_tracker_constructor(self.tracker_type)
+            # tracker bbox format: xmin, xmax, w, h
+            xmin, ymin, xmax, ymax = obj[1:5]
+            initial_bbox = (
+                int(round(xmin / ratio_x)),
+                int(round(ymin / ratio_y)),
+                max(1, int(round((xmax - xmin) / ratio_x))),
+                max(1, int(round((ymax - ymin) / ratio_y))),
+            )
+            tracker.init(init_frame, initial_bbox)
+            active_trackers.append([tracker, first_id + i, obj[0]])
+        return active_trackers
+
+    def predict_frame(self, active_trackers, next_image):
+        """
+        Updates the trackers on next_image, dropping those that lost their
+        object. Returns (id, class_index, full resolution box, box in
+        next_image) per object still tracked, boxes as (xmin, ymin, xmax, ymax).
+        """
+        ratio_x, ratio_y = self.get_frame_ratios(next_image)
+        predictions = []
+        # get the new bbox prediction of each object
+        for tracker_data, (success, bbox) in zip(active_trackers[:], self.update_trackers(active_trackers, next_image)):
+            _tracker, anchor_id, class_index = tracker_data
+            if not success:
+                active_trackers.remove(tracker_data)
+                continue
+            xmin, ymin, w, h = map(int, bbox)
+            shown_box = (xmin, ymin, xmin + w, ymin + h)
+            if self.scale != 1:
+                # back to full resolution
+                xmin, ymin, w, h = (
+                    int(bbox[0] * ratio_x), int(bbox[1] * ratio_y), int(bbox[2] * ratio_x), int(bbox[3] * ratio_y)
+                )
+            predictions.append((anchor_id, class_index, (xmin, ymin, xmin + w, ymin + h), shown_box))
+        return predictions
+
+    def _track_frames(self, journal, frames, active_trackers, writer, write_lines, show):
+        n_predictions = 0
+        for pred_counter, (frame_path, next_image) in enumerate(frames, start=1):
+            if not active_trackers:
+                break
+            predictions = self.predict_frame(active_trackers, next_image)
+            if not predictions:
+                break
+            for anchor_id, class_index, (xmin, ymin, xmax, ymax), _shown_box in predictions:
+                journal.add_object(frame_path, anchor_id, pred_counter, [class_index, xmin, ymin, xmax, ymax])
+            n_predictions += len(predictions)
+            # save all the predictions of this frame at once
+            lines = [
+                yolo_format(class_index, (xmin, ymin), (xmax, ymax), self.img_w, self.img_h)
+                for _anchor_id, class_index, (xmin, ymin, xmax, ymax), _shown_box in predictions
+            ]
+            writer.submit(write_lines, frame_path, lines)
+            if show is not None:
+                show(next_image, [
+                    (class_index, (xmin, ymin), (xmax, ymax))
+                    for _anchor_id, class_index, _box, (xmin, ymin, xmax, ymax) in predictions
+                ])
+        return n_predictions
+
+
+def find_frame_paths(video_dir: Path) -> List[Path]:
+    return sorted(
+        (p for p in Path(video_dir).iterdir() if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES),
+        key=natural_sort_key,
+    )
+
+
+def read_seed_objects(img_path: Path, img_width, img_height) -> List[List[int]]:
+    rows = read_yolo_file(annotation_path_for_image(img_path))
+    class_indices, boxes = yolo_to_pixel_boxes(rows, img_width, img_height)
+    return [[class_index, *box] for class_index, box in zip(class_indices.tolist(), boxes.tolist())]
+
+
+def track_video(task):
+    """
+    Worker: does for one folder of video frames (or one video file, read
+    with video_source) what pressing `p` on every annotated frame does in
+    the GUI, in frame order. The objects of a
+    frame that are not in the tracker data yet (so neither tracked from an
+    earlier frame nor seeded before) are tracked through the following
+    frames, appending the predictions to their YOLO_darknet files.
+
+    """
+    video_dir, tracker_dir, tracker_type, n_frames, scale, n_threads, backend = task
+    video_dir = Path(video_dir)
+    dasiamrpn = None
+    if tracker_type == "DASIAMRPN":
+        from open_labeling.dasiamrpn import dasiamrpn, set_num_threads
+
+        set_num_threads(n_threads)
+        dasiamrpn = partial(dasiamrpn, backend)
+    store = TxtAnnotationStore()
+
+    def write_lines(frame_path, lines):
+        ann_path = annotation_path_for_image(Path(frame_path))
+        store.ensure(ann_path)
+        store.append_lines(ann_path, lines)
+
+    if is_video_file(video_dir):
+        source = open_video(video_dir)
+        frame_paths = source.frame_paths()
+        video_name = source.name
+    else:
+        frame_paths = find_frame_paths(video_dir)
+        video_name = video_dir.name
+    journal = TrackerJournal(tracker_json_path(tracker_dir, video_name))
+    n_seeds = n_predictions = 0
+    try:
+        for i, img_path in enumerate(frame_paths):
+            if not annotation_path_for_image(img_path).is_file():
+                continue
+            init_frame = None
+            object_list = []
+            if os.path.getsize(annotation_path_for_image(img_path)) > 0:
+                init_frame = read_frame(img_path)
+                img_height, img_width = init_frame.shape[:2]
+                object_list = remove_already_tracked_objects(
+                    read_seed_objects(img_path, img_width, img_height), img_path, journal
+                )
+            if len(object_list) > 0:
+                label_tracker = LabelTracker(tracker_type, init_frame, frame_paths[i + 1:], dasiamrpn, scale)
+                n_predictions += label_tracker.start_trackers(
+                    journal, img_path, object_list, n_frames, write_lines
+                )
+                n_seeds += len(object_list)
+    finally:
+        journal.close()
+    return video_name, n_seeds, n_predictions
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Propagate annotations through video frames without the GUI")
+    parser.add_argument(
+        "-i",
+        "--input-dirs",
+        required=True,
+        nargs="+",
+        help="Folders of video frames or video files; the annotated frames in each are the seeds.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output_dir",
+        default="output",
+        type=str,
+        help="Directory holding the .tracker data (same as the GUI's --output_dir).",
+    )
+    parser.add_argument(
+        "--tracker",
+        default="KCF",
+        type=str,
+        help="tracker_type being used: ['CSRT', 'KCF','MOSSE', 'MIL', 'BOOSTING', 'MEDIANFLOW', 'TLD', 'GOTURN', 'DASIAMRPN']",
+    )
+    parser.add_argument(
+        "-n",
+        "--n_frames",
+        default="200",
+        type=int,
+        help="number of frames to track object for",
+    )
+    parser.add_argument(
+        "--tracker-scale",
+        default=1,
+        type=int,
+        choices=TRACKER_SCALES,
+        help="Track on frames reduced by this factor (boxes are saved in full resolution).",
+    )
+    parser.add_argument(
+        "--tracker-threads",
+        default=None,
+        type=int,
+        help="CPU threads used by the DASIAMRPN network in each worker (defaults to the backend's choice).",
+    )
+    parser.add_argument(
+        "--dasiamrpn-backend",
+        default="torch",
+        choices=["torch", "onnx"],
+        help="Run DASIAMRPN with torch, or with cv2.dnn on an ONNX export (label_dasiamrpn_onnx) without torch.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=None,
+        type=int,
+        help="Number of worker processes, one video each (defaults to the number of CPUs).",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    tracker_dir = os.path.join(args.output_dir, TRACKER_DIR)
+    os.makedirs(tracker_dir, exist_ok=True)
+    for video_dir in args.input_dirs:
+        if not (Path(video_dir).is_dir() or (Path(video_dir).is_file() and is_video_file(video_dir))):
+            raise RuntimeError("Input is neither a folder nor a video file: {}".format(video_dir))
+    tasks = [
+        (video_dir, tracker_dir, args.tracker, args.n_frames, args.tracker_scale, args.tracker_threads, args.dasiamrpn_backend)
+        for video_dir in args.input_dirs
+    ]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for video_name, n_seeds, n_predictions in executor.map(track_video, tasks):
+            print("{}: tracked {} objects, {} predicted boxes".format(video_name, n_seeds, n_predictions))
+
+
+def run():  # Entry point
+    args = get_args()
+    main(args=args)
+
+
+if __name__ == "__main__":
+    parsed_args = get_args()
+    main(args=parsed_args)
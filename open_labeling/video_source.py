@@ -0,0 +1,192 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+VIDEO_SUFFIXES = (".mp4", ".avi", ".mov", ".mkv", ".mpg", ".mpeg", ".webm")
+FRAME_IMG_FORMAT = ".jpg"
+FRAME_CACHE_SIZE = 64  # decoded frames kept per video
+SEEK_INTERVAL = 32  # stepping backwards seeks to multiples of this and caches the frames up to the one asked for
+MAX_DECODE_AHEAD = 64  # frames decoded forward before a seek becomes cheaper
+
+
+def is_video_file(path) -> bool:
+    return Path(path).suffix.lower() in VIDEO_SUFFIXES
+
+
+def _grab_forward(cap, n_frames: int) -> bool:
+    for _ in range(n_frames):
+        if not cap.grab():
+            return False
+    return True
+
+
+def seek_frame(cap, index: int) -> bool:
+    """
+    Positions cap so that its next read() returns frame `index`. Seeking
+    with CAP_PROP_POS_FRAMES is inexact for some inter-frame codecs, and
+    the FFmpeg backend reports the requested position back, so the seek is
+    checked on the decoded timestamp (CAP_PROP_POS_MSEC) of the frame
+    before `index`: a seek that lands early is finished with grab() from
+    where it landed, one that lands late is retried further back (twice
+    as far each time). Without a frame rate the video is decoded forward
+    from the start. False if the video ends before `index`.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if index <= 0 or not fps > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return _grab_forward(cap, index)
+    target = index - 1
+    step = 1
+    while True:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        if not cap.grab():
+            return False
+        landed = int(round(cap.get(cv2.CAP_PROP_POS_MSEC) * fps / 1000.0))
+        if landed <= index - 1:
+            return _grab_forward(cap, index - 1 - landed)
+        if target == 0:  # timestamps that don't start at 0
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return _grab_forward(cap, index)
+        target = max(0, target - step)
+        step *= 2
+
+
+def video_frames_dir(video_path) -> Path:
+    """
+    The folder convert_video_to_images extracts a video to, e.g.
+    `video.mp4` -> `video_mp4/` (the extension avoids collisions).
+    """
+    file_path, file_extension = os.path.splitext(str(video_path))
+    return Path(file_path + file_extension.replace(".", "_"))
+
+
+class VideoSource:
+    """
+    Frames of a video read straight from the container with cv2.VideoCapture.
+
+    Each frame has a virtual path named as if the video had been extracted
+    by convert_video_to_images (`video_mp4/video_mp4_<index>.jpg`), so its
+    annotations live in `video_mp4/YOLO_darknet/` keyed by frame index just
+    as before; the image itself is never written.
+
+    Reading forward decodes sequentially, caching every decoded frame in an
+    LRU cache. Jumping backwards, or too far ahead, seeks to the nearest
+    seek point (a multiple of SEEK_INTERVAL) at or before the frame and
+    decodes forward from there, so stepping back through a video costs one
+    seek per SEEK_INTERVAL frames instead of one per frame.
+    """
+
+    def __init__(self, video_path, cache_size: int = FRAME_CACHE_SIZE, img_format: str = FRAME_IMG_FORMAT):
+        self.video_path = Path(video_path)
+        self.frames_dir = video_frames_dir(video_path)
+        self.name = self.frames_dir.name
+        self.img_format = img_format
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._cap = cv2.VideoCapture(str(self.video_path))
+        if not self._cap.isOpened():
+            raise ValueError("Could not open video: {}".format(video_path))
+        self.n_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._position = 0  # index of the frame the next cap.read() returns
+        self.n_seeks = 0
+
+    def frame_path(self, index: int) -> Path:
+        return self.frames_dir / "{}_{}{}".format(self.name, index, self.img_format)
+
+    def frame_paths(self) -> List[Path]:
+        return [self.frame_path(i) for i in range(self.n_frames)]
+
+    def frame_index(self, img_path) -> Optional[int]:
+        stem = Path(img_path).stem
+        prefix = self.name + "_"
+        if Path(img_path).parent != self.frames_dir or not stem.startswith(prefix):
+            return None
+        try:
+            return int(stem[len(prefix):])
+        except ValueError:
+            return None
+
+    def _cache_frame(self, index, frame):
+        self._cache[index] = frame
+        self._cache.move_to_end(index)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _seek(self, index):
+        seek_point = index - index % SEEK_INTERVAL
+        if not seek_frame(self._cap, seek_point):
+            seek_point = self.n_frames  # the video ended early, read() returns None
+        self._position = seek_point
+        self.n_seeks += 1
+
+    def read(self, index: int) -> Optional[np.ndarray]:
+        """
+        A copy of frame `index` (callers draw on the frames they get).
+        """
+        if not 0 <= index < self.n_frames:
+            return None
+        with self._lock:
+            frame = self._cache.get(index)
+            if frame is not None:
+                self._cache.move_to_end(index)
+                return frame.copy()
+            if not self._position <= index <= self._position + MAX_DECODE_AHEAD:
+                self._seek(index)
+            while self._position <= index:
+                ret, frame = self._cap.read()
+                if not ret:
+                    return None
+                self._cache_frame(self._position, frame)
+                self._position += 1
+            return frame.copy()
+
+    def release(self):
+        with self._lock:
+            self._cap.release()
+            self._cache.clear()
+
+
+# frames dir -> VideoSource, for the videos opened in this process
+_video_sources: Dict[str, VideoSource] = {}
+
+
+def open_video(video_path, cache_size: int = FRAME_CACHE_SIZE) -> VideoSource:
+    """
+    Opens (once per process) a video so that its virtual frame paths can
+    be read with read_video_frame.
+    """
+    frames_dir = str(video_frames_dir(video_path))
+    if frames_dir not in _video_sources:
+        _video_sources[frames_dir] = VideoSource(video_path, cache_size)
+    return _video_sources[frames_dir]
+
+
+def get_video_frame(img_path) -> Optional[Tuple[VideoSource, int]]:
+    """
+    (video source, frame index) if img_path is a virtual frame path of an
+    opened video, else None.
+    """
+    source = _video_sources.get(str(Path(img_path).parent))
+    if source is None:
+        return None
+    index = source.frame_index(img_path)
+    if index is None:
+        return None
+    return source, index
+
+
+def read_video_frame(img_path) -> Optional[np.ndarray]:
+    video_frame = get_video_frame(img_path)
+    if video_frame is None:
+        return None
+    source, index = video_frame
+    return source.read(index)
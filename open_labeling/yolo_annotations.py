@@ -0,0 +1,190 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from open_labeling.common import natural_sort_key
+
+ANNOTATION_DIR = "YOLO_darknet"
+N_COLUMNS = 5  # class x_center y_center x_width y_height
+
+YOLO_DTYPE = np.dtype(
+    [
+        ("image_id", np.int32),
+        ("class_index", np.int32),
+        ("cx", np.float64),
+        ("cy", np.float64),
+        ("w", np.float64),
+        ("h", np.float64),
+    ]
+)
+
+
+def yolo_format(class_index, point_1, point_2, width, height):
+    # YOLO wants everything normalized
+    # Order: class x_center y_center x_width y_height
+    x_center = float((point_1[0] + point_2[0]) / (2.0 * width))
+    y_center = float((point_1[1] + point_2[1]) / (2.0 * height))
+    x_width = float(abs(point_2[0] - point_1[0])) / width
+    y_height = float(abs(point_2[1] - point_1[1])) / height
+    items = map(str, [class_index, x_center, y_center, x_width, y_height])
+    return " ".join(items)
+
+
+def yolo_to_voc(x_center, y_center, x_width, y_height, width, height):
+    x_center *= float(width)
+    y_center *= float(height)
+    x_width *= float(width)
+    y_height *= float(height)
+    x_width /= 2.0
+    y_height /= 2.0
+    xmin = int(round(x_center - x_width))
+    ymin = int(round(y_center - y_height))
+    xmax = int(round(x_center + x_width))
+    ymax = int(round(y_center + y_height))
+    return xmin, ymin, xmax, ymax
+
+
+def annotation_path_for_image(img_path) -> Path:
+    img_path = Path(img_path)
+    return img_path.parent / ANNOTATION_DIR / f"{img_path.stem}.txt"
+
+
+def is_yolo_line(line: str) -> bool:
+    """
+    True for the lines parse_yolo_text loads a box from: five or more
+    tokens (extra columns such as scores are ignored).
+    """
+    return len(line.split()) >= N_COLUMNS
+
+
+def yolo_line_positions(lines: List[str]) -> List[int]:
+    """
+    The position in `lines` of each box parse_yolo_text loads from them,
+    so an edit of the n-th box changes the right line even when blank or
+    malformed lines come before it.
+    """
+    return [i for i, line in enumerate(lines) if is_yolo_line(line)]
+
+
+def _split_yolo_text(text: str) -> List[str]:
+    """
+    Returns the first five tokens of every line that has at least five,
+    flattened; blank and malformed lines are skipped.
+    """
+    rows = [line.split()[:N_COLUMNS] for line in text.splitlines()]
+    return list(chain.from_iterable(items for items in rows if len(items) == N_COLUMNS))
+
+
+def parse_yolo_text(text: str) -> np.ndarray:
+    """
+    Parses the contents of a YOLO_darknet .txt file into an (n, 5) float
+    array of class, x_center, y_center, width, height.
+
+    """
+    tokens = _split_yolo_text(text)
+    return np.array(tokens, dtype=np.float64).reshape(-1, N_COLUMNS)
+
+
+def read_yolo_file(ann_path) -> np.ndarray:
+    try:
+        with open(ann_path) as f:
+            text = f.read()
+    except FileNotFoundError:
+        text = ""
+    return parse_yolo_text(text)
+
+
+def yolo_to_pixel_boxes(rows: np.ndarray, img_width, img_height) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized equivalent of run_app.get_txt_object_data. Returns the class
+    indices and an (n, 4) int array of xmin, ymin, xmax, ymax, truncated
+    exactly as the per-line version does.
+
+    """
+    class_indices = rows[:, 0].astype(int)
+    center_x, center_y, bbox_width, bbox_height = rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+    boxes = np.empty((len(rows), 4), dtype=int)
+    boxes[:, 0] = (img_width * center_x - img_width * bbox_width / 2.0).astype(int)
+    boxes[:, 1] = (img_height * center_y - img_height * bbox_height / 2.0).astype(int)
+    boxes[:, 2] = (img_width * center_x + img_width * bbox_width / 2.0).astype(int)
+    boxes[:, 3] = (img_height * center_y + img_height * bbox_height / 2.0).astype(int)
+    return class_indices, boxes
+
+
+def find_annotation_files(root: Path) -> List[Path]:
+    """
+    Every YOLO_darknet/*.txt below root, in the same natural order the
+    GUI uses for images.
+    """
+    root = Path(root)
+    ann_paths = [
+        ann_path for ann_path in root.rglob("*.txt")
+        if ann_path.parent.name == ANNOTATION_DIR
+    ]
+    return sorted(ann_paths, key=natural_sort_key)
+
+
+class YoloAnnotations:
+    """
+    Columnar view of every annotation under a root folder. The boxes for
+    image i (annotation_paths[i]) are records[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, annotation_paths: List[Path], records: np.ndarray, offsets: np.ndarray):
+        self.annotation_paths = annotation_paths
+        self.records = records
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.annotation_paths)
+
+    @property
+    def n_boxes(self):
+        return len(self.records)
+
+    def image_records(self, image_id: int) -> np.ndarray:
+        return self.records[self.offsets[image_id]:self.offsets[image_id + 1]]
+
+    def boxes_per_image(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+
+def _read_tokens(ann_path: Path) -> List[str]:
+    with open(ann_path) as f:
+        return _split_yolo_text(f.read())
+
+
+def load_yolo_annotations(
+    root: Path, n_workers: int = None, annotation_paths: List[Path] = None, strict: bool = False
+) -> YoloAnnotations:
+    """
+    Loads every YOLO_darknet annotation below root into a single structured
+    array. File reads go through a thread pool; all values are converted to
+    floats in one NumPy call. With strict, a class value that is not an
+    integer raises ValueError instead of being truncated.
+
+    """
+    if annotation_paths is None:
+        annotation_paths = find_annotation_files(root)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        token_lists = list(executor.map(_read_tokens, annotation_paths))
+
+    counts = np.fromiter((len(tokens) // N_COLUMNS for tokens in token_lists), dtype=np.int64,
+                         count=len(token_lists))
+    offsets = np.zeros(len(annotation_paths) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    values = np.array(list(chain.from_iterable(token_lists)), dtype=np.float64).reshape(-1, N_COLUMNS)
+    if strict and not np.array_equal(values[:, 0], np.trunc(values[:, 0])):
+        raise ValueError("Non-integer class index")
+    records = np.empty(len(values), dtype=YOLO_DTYPE)
+    records["image_id"] = np.repeat(np.arange(len(annotation_paths), dtype=np.int32), counts)
+    records["class_index"] = values[:, 0]
+    records["cx"] = values[:, 1]
+    records["cy"] = values[:, 2]
+    records["w"] = values[:, 3]
+    records["h"] = values[:, 4]
+    return YoloAnnotations(annotation_paths, records, offsets)
@@ -0,0 +1,57 @@
+from open_labeling.annotation_store import SqliteAnnotationStore, TxtAnnotationStore
+
+LINES = "0 0.5 0.5 0.2 0.4\n3 0.123456789 0.25 0.1 0.1 0.87\n"
+
+
+def test_sqlite_store_round_trips_txt_files(tmp_path):
+    ann_dir = tmp_path / "YOLO_darknet"
+    ann_dir.mkdir()
+    (ann_dir / "a.txt").write_text(LINES)
+    (ann_dir / "b.txt").write_text("")
+
+    store = SqliteAnnotationStore(tmp_path / "annotations.sqlite", tmp_path)
+    assert store.import_txt() == 2
+    assert store.read_text(ann_dir / "a.txt") == LINES
+    assert store.exists(ann_dir / "b.txt")
+
+    (ann_dir / "a.txt").unlink()
+    (ann_dir / "b.txt").unlink()
+    assert store.export_txt() == 2
+    assert (ann_dir / "a.txt").read_text() == LINES
+    assert (ann_dir / "b.txt").read_text() == ""
+    store.close()
+
+
+def test_sqlite_store_edits(tmp_path):
+    ann_path = tmp_path / "YOLO_darknet" / "a.txt"
+    store = SqliteAnnotationStore(tmp_path / "annotations.sqlite", tmp_path)
+    assert not store.exists(ann_path)
+    assert store.mtime_ns(ann_path) == -1
+
+    store.append_line(ann_path, "0 0.5 0.5 0.2 0.2")
+    store.append_line(ann_path, "1 0.5 0.5 0.2 0.2")
+    modified_ns = store.mtime_ns(ann_path)
+    lines = store.read_lines(ann_path)
+    assert lines == ["0 0.5 0.5 0.2 0.2\n", "1 0.5 0.5 0.2 0.2\n"]
+
+    store.write_lines(ann_path, lines[1:])
+    assert store.read_text(ann_path) == "1 0.5 0.5 0.2 0.2\n"
+    assert store.mtime_ns(ann_path) > modified_ns
+    count = store.conn.execute("SELECT COUNT(*) FROM boxes WHERE class_index = 1").fetchone()[0]
+    assert count == 1
+
+    store.delete(ann_path)
+    assert not store.exists(ann_path)
+    store.close()
+
+
+def test_stores_append_lines_in_one_call(tmp_path):
+    ann_path = tmp_path / "YOLO_darknet" / "a.txt"
+    txt_store = TxtAnnotationStore()
+    txt_store.ensure(ann_path)
+    sqlite_store = SqliteAnnotationStore(tmp_path / "annotations.sqlite", tmp_path)
+    for store in (txt_store, sqlite_store):
+        store.append_line(ann_path, "0 0.5 0.5 0.2 0.2")
+        store.append_lines(ann_path, ["1 0.1 0.1 0.1 0.1", "2 0.2 0.2 0.1 0.1"])
+        assert store.read_text(ann_path) == "0 0.5 0.5 0.2 0.2\n1 0.1 0.1 0.1 0.1\n2 0.2 0.2 0.1 0.1\n"
+    sqlite_store.close()
@@ -0,0 +1,45 @@
+from open_labeling.class_index import ClassImageIndex
+
+
+def test_class_index_navigation_and_update(tmp_path):
+    ann_dir = tmp_path / "YOLO_darknet"
+    ann_dir.mkdir()
+    image_paths = [tmp_path / f"img_{i}.jpg" for i in range(4)]
+    (ann_dir / "img_0.txt").write_text("1 0.5 0.5 0.2 0.2\n")
+    (ann_dir / "img_1.txt").write_text("0 0.5 0.5 0.2 0.2\n")
+    (ann_dir / "img_2.txt").write_text("")
+    (ann_dir / "img_3.txt").write_text("1 0.5 0.5 0.2 0.2\n0 0.1 0.1 0.1 0.1\n")
+
+    index = ClassImageIndex(image_paths)
+    index.build()
+    assert index.images_with_class(1) == [0, 3]
+    assert index.find_image(1, 0, step=1) == 3
+    assert index.find_image(1, 3, step=1) == 0
+    assert index.find_image(1, 0, step=-1) == 3
+    assert index.find_image(7, 0) is None
+
+    (ann_dir / "img_2.txt").write_text("1 0.5 0.5 0.2 0.2\n")
+    index.update(ann_dir / "img_2.txt")
+    (ann_dir / "img_0.txt").write_text("")
+    index.update(ann_dir / "img_0.txt")
+    assert index.images_with_class(1) == [2, 3]
+
+    # A new session reuses the persisted entries.
+    index.save()
+    reloaded = ClassImageIndex(image_paths)
+    reloaded.build()
+    assert reloaded.images_with_class(1) == [2, 3]
+    assert reloaded.images_with_class(0) == [1, 3]
+
+
+def test_class_index_skips_malformed_files(tmp_path):
+    ann_dir = tmp_path / "YOLO_darknet"
+    ann_dir.mkdir()
+    image_paths = [tmp_path / f"img_{i}.jpg" for i in range(2)]
+    (ann_dir / "img_0.txt").write_text("car 0.5 0.5 0.2 0.2\n")
+    (ann_dir / "img_1.txt").write_text("1 0.5 0.5 0.2 0.2\n")
+
+    index = ClassImageIndex(image_paths)
+    index.build()
+    assert index.ready.is_set()
+    assert index.images_with_class(1) == [1]
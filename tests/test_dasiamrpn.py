@@ -0,0 +1,87 @@
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+
+from open_labeling.dasiamrpn import correlate, dasiamrpn, get_subwindow, siamrpn_head
+
+
+def test_import_does_not_load_torch():
+    code = "import sys, open_labeling.dasiamrpn; assert 'torch' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_correlate_matches_direct_sum():
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((3, 9, 8)).astype(np.float32)
+    kernels = rng.standard_normal((5, 3, 4, 4)).astype(np.float32)
+    result = correlate(features, kernels)
+    assert result.shape == (5, 6, 5)
+    for o in range(5):
+        for i in range(6):
+            for j in range(5):
+                expected = (kernels[o] * features[:, i:i + 4, j:j + 4]).sum()
+                assert np.isclose(result[o, i, j], expected, atol=1e-4)
+
+
+def test_get_subwindow_pads_with_average_colour():
+    im = np.full((50, 60, 3), 200, dtype=np.uint8)
+    blob = get_subwindow(im, (5, 5), 20, 20, np.array([10, 20, 30]))
+    assert blob.shape == (3, 20, 20) and blob.dtype == np.float32
+    # the window starts 5 pixels left of and above the image
+    assert tuple(blob[:, 0, 0]) == (10, 20, 30)
+    assert tuple(blob[:, 19, 19]) == (200, 200, 200)
+
+
+class FakeSiamRPN:
+    """
+    Same interface and output shapes as the real backends: features are the
+    crop resized so that the 127 template gives 4x4 kernels and the 271
+    search region 22x22 features (19x19 score maps).
+    """
+
+    cfg = {"adaptive": False, "instance_size": 271}
+    anchor = 5
+    feature_out = 3
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.r1_weight = rng.standard_normal((self.anchor * 4, 1, 1, 1)).astype(np.float32) * 1e-5
+        self.cls1_weight = rng.standard_normal((self.anchor * 2, 1, 1, 1)).astype(np.float32) * 1e-4
+        self.regress_weight = np.eye(self.anchor * 4, dtype=np.float32)
+        self.regress_bias = np.zeros(self.anchor * 4, dtype=np.float32)
+
+    def features(self, crop):
+        size = (crop.shape[-1] - 127) // 8 + 4
+        return cv2.resize(crop.transpose(1, 2, 0), (size, size), interpolation=cv2.INTER_AREA).transpose(2, 0, 1)
+
+    def template(self, z_crop):
+        z_f = self.features(z_crop) / 255.0
+        return self.r1_weight * z_f, self.cls1_weight * z_f
+
+    def search(self, x_crops, r1_kernels, cls1_kernels):
+        x_f = np.stack([self.features(crop) for crop in x_crops]) / 255.0
+        return siamrpn_head(x_f, x_f, r1_kernels, cls1_kernels, self.regress_weight, self.regress_bias)
+
+
+def test_update_many_matches_one_update_per_target():
+    rng = np.random.default_rng(1)
+    frames = [rng.integers(0, 255, (240, 320, 3), dtype=np.uint8) for _ in range(3)]
+    boxes = [(40, 50, 60, 40), (200, 120, 50, 70)]
+
+    def make_trackers():
+        trackers = []
+        for box in boxes:
+            tracker = dasiamrpn.__new__(dasiamrpn)
+            tracker.net = FakeSiamRPN()
+            tracker.init(frames[0], box)
+            trackers.append(tracker)
+        return trackers
+
+    single, batched = make_trackers(), make_trackers()
+    for frame in frames[1:]:
+        expected = [tracker.update(frame) for tracker in single]
+        assert dasiamrpn.update_many(batched, frame) == expected
+    for success, (xmin, ymin, w, h) in expected:
+        assert success and 10 <= w <= 320 and 10 <= h <= 240
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from object_detection.cache import file_hash
+from object_detection.detector import (
+    BaseDetector,
+    DnnObjectDetector,
+    detection_output_to_raw,
+    model_hash,
+    net_outputs_to_raw,
+    select_backend,
+)
+
+
+class FakeNet:
+    """
+    The DetectionOutput of an SSD: one object (class 3) in the top-left
+    quarter of image 0 and one (class 1) in the right half of image 1.
+    """
+
+    def __init__(self):
+        self.blob_shapes = []
+
+    def setInput(self, blob):
+        self.blob_shapes.append(blob.shape)
+
+    def forward(self, output_names):
+        assert output_names == ["detection_out"]
+        n_images = self.blob_shapes[-1][0]
+        rows = [[0, 3, 0.9, 0, 0, 0.5, 0.5], [1, 1, 0.8, 0.5, 0, 1, 1], [1, 2, 0.1, 0, 0, 1, 1]]
+        return [np.array([row for row in rows if row[0] < n_images], dtype=np.float32).reshape(1, 1, -1, 7)]
+
+
+def make_detector(score_threshold=0.5, obj_ids=None, class_offset=0):
+    detector = DnnObjectDetector.__new__(DnnObjectDetector)
+    detector.score_threshold = score_threshold
+    detector.objIds = obj_ids
+    detector.net = FakeNet()
+    detector.output_names = ["detection_out"]
+    detector.input_size = (32, 32)
+    detector.scale = 1.0
+    detector.mean = (0, 0, 0)
+    detector.class_offset = class_offset
+    return detector
+
+
+def test_detection_output_to_raw():
+    out = np.array([[0, 3, 0.9, 0.1, 0.2, 0.3, 0.4], [2, 1, 0.8, 0.5, 0.6, 0.7, 0.8]], dtype=np.float32)
+    raw = detection_output_to_raw(out.reshape(1, 1, -1, 7), 3, class_offset=1)
+    assert [output["num_detections"].tolist() for output in raw] == [[1], [0], [1]]
+    # ymin, xmin, ymax, xmax as from the TF object detection API
+    np.testing.assert_allclose(raw[0]["detection_boxes"], [[[0.2, 0.1, 0.4, 0.3]]])
+    assert raw[1]["detection_boxes"].shape == (1, 0, 4)
+    assert raw[2]["detection_classes"].tolist() == [[2]]
+
+
+def test_net_outputs_of_an_onnx_export_are_found_by_name():
+    names = ["detection_boxes:0", "detection_classes:0", "raw_detection_boxes:0", "detection_scores:0", "num_detections:0"]
+    outputs = [
+        np.array([[[0.1, 0.2, 0.3, 0.4], [0, 0, 0, 0]], [[0.5, 0.5, 1, 1], [0, 0, 0, 0]]]),
+        np.array([[3, 0], [0, 0]]),
+        np.zeros((2, 10, 4)),
+        np.array([[0.9, 0], [0.7, 0]]),
+        np.array([1, 1]),
+    ]
+    raw = net_outputs_to_raw(names, outputs, 2, class_offset=1)
+    assert raw[1]["num_detections"].tolist() == [1]
+    np.testing.assert_allclose(raw[0]["detection_boxes"], [[[0.1, 0.2, 0.3, 0.4], [0, 0, 0, 0]]])
+    assert raw[0]["detection_classes"].tolist() == [[4, 1]]
+    with pytest.raises(ValueError):
+        net_outputs_to_raw(["scores"], [np.zeros((1, 10))], 1)
+    with pytest.raises(TypeError):
+        BaseDetector(0.5, None)
+
+
+def test_dnn_detector_batches_and_filters_like_detect():
+    detector = make_detector()
+    images = [np.zeros((40, 80, 3), dtype=np.uint8), np.zeros((20, 10, 3), dtype=np.uint8)] * 2
+    results = detector.detect_batch(images, batch_size=2)
+    assert detector.net.blob_shapes == [(2, 3, 32, 32), (2, 3, 32, 32)]
+    (boxes, scores, classes), (boxes_1, _scores_1, classes_1) = results[:2]
+    # xmin, ymin, width, height in pixels
+    assert boxes.tolist() == [[0, 0, 40, 20]] and classes.tolist() == [3]
+    np.testing.assert_allclose(scores, [0.9])
+    assert boxes_1.tolist() == [[5, 0, 5, 20]] and classes_1.tolist() == [1]
+
+    # alone, an image is image 0 of its blob
+    boxes, scores, classes = detector.detect(images[1])
+    assert boxes.tolist() == [[0, 0, 5, 10]] and classes.tolist() == [3]
+    assert make_detector(obj_ids=[1]).detect(images[1])[0].shape[0] == 0
+
+
+def test_select_backend():
+    assert select_backend("model.onnx") == "dnn"
+    assert select_backend("frozen_inference_graph.pb") == "tf"
+    assert select_backend("frozen_inference_graph.pb", config_path="graph.pbtxt") == "dnn"
+    assert select_backend("model.onnx", "tf") == "tf"
+
+
+def test_model_hash_covers_backend_and_preprocessing(tmp_path):
+    model_path = tmp_path / "model.pb"
+    model_path.write_bytes(b"graph")
+    config_path = tmp_path / "graph.pbtxt"
+    config_path.write_text("layers")
+    # cache entries of the tf backend keep the key they had
+    assert model_hash(model_path, "tf") == file_hash(model_path)
+    hashes = {
+        model_hash(model_path, "tf"),
+        model_hash(model_path, "dnn", config_path),
+        model_hash(model_path, "dnn", config_path, input_size=(512, 512)),
+        model_hash(model_path, "dnn", config_path, mean=(127.5, 127.5, 127.5)),
+        model_hash(model_path, "dnn"),
+    }
+    assert len(hashes) == 5
+    assert model_hash(model_path, "dnn", config_path) == model_hash(model_path, "dnn", config_path, input_size=[300, 300])
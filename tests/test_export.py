@@ -0,0 +1,35 @@
+import json
+import shutil
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from open_labeling.export import export_dataset
+
+TEST_IMAGE = Path(__file__).parent / "test_data" / "Photos" / "Photo_2018_May_31_10_06_44_296_00_stripping8.jpg"
+
+
+def test_export_coco_and_voc(tmp_path):
+    shutil.copy(TEST_IMAGE, tmp_path / "a.jpg")
+    shutil.copy(TEST_IMAGE, tmp_path / "b.jpg")
+    ann_dir = tmp_path / "YOLO_darknet"
+    ann_dir.mkdir()
+    (ann_dir / "a.txt").write_text("0 0.5 0.5 0.2 0.4\n1 0.25 0.25 0.1 0.1\n")
+    (ann_dir / "b.txt").write_text("")
+
+    coco_path = tmp_path / "coco.json"
+    n_images, n_annotations = export_dataset(
+        tmp_path, ["cat", "dog"], coco_path=coco_path, write_voc=True, n_workers=1
+    )
+    assert (n_images, n_annotations) == (2, 2)
+
+    coco = json.loads(coco_path.read_text())
+    assert [c["name"] for c in coco["categories"]] == ["cat", "dog"]
+    assert coco["images"][0] == {"id": 0, "file_name": "a.jpg", "width": 300, "height": 300}
+    assert [a["id"] for a in coco["annotations"]] == [1, 2]
+    assert coco["annotations"][0]["bbox"] == [120.0, 90.0, 60.0, 120.0]
+    assert coco["annotations"][1]["category_id"] == 2
+
+    voc = ET.parse(str(tmp_path / "PASCAL_VOC" / "a.xml")).getroot()
+    assert voc.find("size/width").text == "300"
+    assert [o.find("name").text for o in voc.findall("object")] == ["cat", "dog"]
+    assert voc.find("object/bndbox/xmin").text == "120"
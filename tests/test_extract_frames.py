@@ -0,0 +1,47 @@
+import cv2
+
+from open_labeling.extract_frames import extract_frames
+from open_labeling.video_source import VideoSource
+from tests.test_video_source import frame_number, write_mp4v_video, write_numbered_video
+
+
+def test_extract_frames_with_stride_and_resume(tmp_path):
+    video_path = tmp_path / "clip.avi"
+    write_numbered_video(video_path, n_frames=30)
+
+    frames_dir, video_name_ext, n_written = extract_frames(video_path, stride=3, n_workers=3, progress=False)
+    assert (frames_dir, video_name_ext, n_written) == (tmp_path / "clip_avi", "clip_avi", 10)
+    names = sorted(p.name for p in frames_dir.iterdir())
+    assert names == sorted("clip_avi_{}.jpg".format(i) for i in range(0, 30, 3))
+    # the names match the virtual frame paths of the video source
+    source = VideoSource(video_path)
+    assert frames_dir / "clip_avi_27.jpg" == source.frame_path(27)
+    assert abs(cv2.imread(str(frames_dir / "clip_avi_27.jpg")).mean() - source.read(27).mean()) < 1
+
+    # an interrupted extraction only writes the missing frames
+    (frames_dir / "clip_avi_12.jpg").unlink()
+    (frames_dir / "clip_avi_21.jpg").unlink()
+    assert extract_frames(video_path, stride=3, progress=False)[2] == 2
+    assert abs(cv2.imread(str(frames_dir / "clip_avi_21.jpg")).mean() - source.read(21).mean()) < 1
+    assert extract_frames(video_path, stride=3, progress=False)[2] == 0
+
+
+def test_extract_frames_png(tmp_path):
+    video_path = tmp_path / "clip.avi"
+    write_numbered_video(video_path, n_frames=5)
+    frames_dir, _video_name_ext, n_written = extract_frames(
+        video_path, n_frames=3, img_format=".png", progress=False
+    )
+    assert n_written == 3
+    assert sorted(p.suffix for p in frames_dir.iterdir()) == [".png"] * 3
+    assert frame_number(cv2.imread(str(frames_dir / "clip_avi_2.png"))) == 2
+
+
+def test_resumed_extraction_of_an_inter_frame_coded_video(tmp_path):
+    video_path = tmp_path / "clip.mp4"
+    frames = write_mp4v_video(video_path, n_frames=60)
+    frames_dir = extract_frames(video_path, n_frames=20, img_format=".png", progress=False)[0]
+    # resuming starts with a seek past the first frames
+    assert extract_frames(video_path, img_format=".png", progress=False)[2] == 40
+    for index in (20, 37, 59):
+        assert (cv2.imread(str(frames_dir / "clip_mp4_{}.png".format(index))) == frames[index]).all()
@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from open_labeling.frame_pipeline import BackgroundWriter, prefetch_frames
+
+
+def test_prefetch_frames_keeps_order_and_bounds_the_window():
+    loaded = []
+    lock = threading.Lock()
+
+    def loader(frame_path):
+        with lock:
+            loaded.append(frame_path)
+        return frame_path * 10
+
+    frames = prefetch_frames(range(100), n_workers=3, window=4, loader=loader)
+    assert [next(frames) for _ in range(5)] == [(i, i * 10) for i in range(5)]
+    frames.close()
+    # 5 consumed plus at most the window decoded ahead
+    assert len(loaded) <= 9
+
+
+def test_background_writer_runs_in_order_and_reports_errors():
+    results = []
+    with BackgroundWriter(max_pending=2) as writer:
+        for i in range(20):
+            writer.submit(results.append, i)
+    assert results == list(range(20))
+
+    def fail():
+        raise OSError("disk full")
+
+    writer = BackgroundWriter()
+    writer.submit(fail)
+    writer.submit(results.append, "skipped")
+    with pytest.raises(OSError):
+        writer.close()
+    assert results[-1] == 19
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from open_labeling.image_size import ImageSizeIndex, read_image_size
+
+TEST_IMAGE = Path(__file__).parent / "test_data" / "Photos" / "Photo_2018_May_31_10_06_44_296_00_stripping8.jpg"
+
+
+def test_read_image_size_matches_decoded_shape(tmp_path):
+    img = np.zeros((37, 53, 3), dtype=np.uint8)
+    for ext in [".jpg", ".png", ".ppm"]:
+        img_path = tmp_path / f"img{ext}"
+        cv2.imwrite(str(img_path), img)
+        assert read_image_size(img_path) == (53, 37)
+    assert read_image_size(TEST_IMAGE) == (300, 300)
+
+
+def test_image_size_index_cache(tmp_path):
+    img_path = tmp_path / "img.png"
+    cv2.imwrite(str(img_path), np.zeros((10, 20, 3), dtype=np.uint8))
+    cache_path = tmp_path / "sizes.tsv"
+
+    index = ImageSizeIndex(cache_path)
+    assert index.lookup(img_path) is None
+    assert index.get(img_path) == (20, 10)
+    index.save()
+
+    reloaded = ImageSizeIndex(cache_path)
+    assert reloaded.lookup(img_path) == (20, 10)
+    # A changed file is not served from the cache.
+    assert reloaded.lookup(img_path, mtime_ns=0) is None
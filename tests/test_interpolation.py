@@ -0,0 +1,67 @@
+import numpy as np
+
+from open_labeling.interpolation import continues_track, interpolate_boxes, interpolate_keyframes, yolo_lines
+from open_labeling.tracker_journal import TrackerJournal
+from open_labeling.yolo_annotations import yolo_format
+
+
+def test_interpolate_boxes_and_yolo_lines():
+    boxes = interpolate_boxes([0, 10], [[0, 0, 10, 10], [100, 50, 120, 70]], [0, 5, 10])
+    assert boxes.tolist() == [[0, 0, 10, 10], [50, 25, 65, 40], [100, 50, 120, 70]]
+    assert yolo_lines(3, boxes, 640, 480) == [
+        yolo_format(3, (xmin, ymin), (xmax, ymax), 640, 480) for xmin, ymin, xmax, ymax in boxes.tolist()
+    ]
+
+
+def test_interpolate_keyframes_fills_only_missing_frames(tmp_path):
+    frame_paths = ["video_mp4/video_mp4_{}.jpg".format(i) for i in range(12)]
+    journal = TrackerJournal(tmp_path / "video_mp4.json")
+    journal.add_object(frame_paths[1], 0, 0, [2, 10, 10, 20, 20], keyframe=True)
+    written = {}
+
+    def write_lines(frame_path, lines):
+        written.setdefault(frame_path, []).extend(lines)
+
+    assert interpolate_keyframes(journal, 0, frame_paths, 100, 100, write_lines) == 0
+    journal.add_object(frame_paths[5], 0, 0, [2, 50, 10, 60, 20], keyframe=True)
+    assert interpolate_keyframes(journal, 0, frame_paths, 100, 100, write_lines) == 3
+    assert journal.get_object(frame_paths[3], 0)["bbox"] == {"xmin": 30, "ymin": 10, "xmax": 40, "ymax": 20}
+    assert journal.get_object(frame_paths[3], 0)["prediction_index"] == 2
+    assert "keyframe" not in journal.get_object(frame_paths[3], 0)
+
+    # a third keyframe extends the object without touching the frames already filled
+    journal.add_object(frame_paths[9], 0, 0, [2, 50, 50, 60, 60], keyframe=True)
+    assert interpolate_keyframes(journal, 0, frame_paths, 100, 100, write_lines) == 3
+    assert sorted(written) == sorted(frame_paths[i] for i in (2, 3, 4, 6, 7, 8))
+    assert written[frame_paths[7]] == [yolo_format(2, (50, 30), (60, 40), 100, 100)]
+
+    journal.flush()
+    reloaded = TrackerJournal(tmp_path / "video_mp4.json")
+    assert reloaded.get_object(frame_paths[9], 0)["keyframe"] is True
+    assert len(reloaded.track(0)) == 9
+
+
+def test_a_second_object_of_the_same_class_starts_its_own_track(tmp_path):
+    frame_paths = ["video_mp4/video_mp4_{}.jpg".format(i) for i in range(12)]
+    positions = {frame_path: i for i, frame_path in enumerate(frame_paths)}
+    journal = TrackerJournal(tmp_path / "video_mp4.json")
+    journal.add_object(frame_paths[1], 0, 0, [2, 10, 10, 30, 30], keyframe=True)
+    track = journal.track(0)
+    # the same object a few frames on, moved by less than half its size
+    assert continues_track(track, frame_paths[5], [2, 16, 12, 36, 32], positions)
+    # another object of that class labelled next, on the same or a later frame
+    assert not continues_track(track, frame_paths[5], [2, 60, 10, 80, 30], positions)
+    assert not continues_track(track, frame_paths[1], [2, 12, 10, 32, 30], positions)
+    assert not continues_track(track, frame_paths[5], [1, 16, 12, 36, 32], positions)
+    assert not continues_track({}, frame_paths[5], [2, 16, 12, 36, 32], positions)
+
+    # compared with the keyframe nearest to the frame
+    journal.add_object(frame_paths[9], 0, 0, [2, 70, 10, 90, 30], keyframe=True)
+    assert continues_track(journal.track(0), frame_paths[10], [2, 72, 10, 92, 30], positions)
+    assert not continues_track(journal.track(0), frame_paths[2], [2, 72, 10, 92, 30], positions)
+
+
+def test_interpolation_throughput_is_vectorized():
+    positions = np.arange(100000)
+    boxes = interpolate_boxes([0, 99999], [[0, 0, 10, 10], [1000, 500, 1010, 510]], positions)
+    assert boxes.shape == (100000, 4) and boxes[-1].tolist() == [1000, 500, 1010, 510]
@@ -0,0 +1,35 @@
+from open_labeling.label_stats import build_report, chunk_file_stats, collect_file_stats
+
+
+def test_label_stats_report(tmp_path):
+    ann_dir = tmp_path / "YOLO_darknet"
+    ann_dir.mkdir()
+    (tmp_path / "a.jpg").write_bytes(b"")
+    (tmp_path / "b.jpg").write_bytes(b"")
+    (ann_dir / "a.txt").write_text("0 0.5 0.5 0.2 0.2\n1 0.95 0.5 0.2 0.2\n")
+    (ann_dir / "b.txt").write_text("5 0.5 0.5 0.0 0.2\n")
+    (ann_dir / "c.txt").write_text("0 0.5 0.5 0.1 0.1\n")
+    (tmp_path / "d.jpg").write_bytes(b"")
+    (ann_dir / "d.txt").write_text("0 0.5 abc 0.1 0.1\n")
+    (tmp_path / "e.jpg").write_bytes(b"")
+    (ann_dir / "e.txt").write_text("1.7 0.5 0.5 0.1 0.1\n")
+
+    file_stats = collect_file_stats(tmp_path, n_workers=1)
+    report = build_report(tmp_path, file_stats, ["cat", "dog"])
+
+    assert report["n_boxes"] == 4
+    assert report["class_histogram"] == {"cat": 2, "dog": 1, "5": 1}
+    assert report["boxes_per_image"] == {"1": 2, "2": 1}
+    assert report["files_with_out_of_range_boxes"] == ["YOLO_darknet/a.txt"]
+    assert report["files_with_zero_area_boxes"] == ["YOLO_darknet/b.txt"]
+    assert report["files_with_unknown_classes"] == ["YOLO_darknet/b.txt"]
+    assert report["orphan_annotation_files"] == ["YOLO_darknet/c.txt"]
+    # a corrupt file is reported, the others are still counted
+    assert report["malformed_files"] == ["YOLO_darknet/d.txt", "YOLO_darknet/e.txt"]
+
+    # a file deleted during the run is skipped, not the whole chunk
+    summaries = chunk_file_stats([str(ann_dir / "c.txt"), str(ann_dir / "gone.txt")])
+    assert summaries[0]["n_boxes"] == 1 and summaries[1] is None
+
+    # Second run is served from the mtime cache.
+    assert collect_file_stats(tmp_path, n_workers=1) == file_stats
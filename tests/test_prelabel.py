@@ -0,0 +1,164 @@
+import cv2
+import numpy as np
+import pytest
+
+from object_detection.cache import DetectionCache
+from object_detection.prelabel import (
+    CHECKPOINT_FILE_NAME,
+    class_indices_for,
+    load_checkpoint,
+    prelabel_folder,
+    read_detector_config,
+)
+from object_detection.utils import ColumnarResults, post_process_batch, stack_outputs
+
+
+class FakeDetector:
+    """
+    Finds one object (id 2) covering the top-left quarter of every image
+    and, below the default threshold, one (id 1) covering the bottom-right
+    quarter; raises on call number `fail_on_call`.
+    """
+
+    def __init__(self, fail_on_call=None, score_threshold=0.5, obj_ids=None):
+        self.calls = []
+        self.fail_on_call = fail_on_call
+        self.score_threshold = score_threshold
+        self.objIds = obj_ids
+
+    def detect_raw(self, images, batch_size):
+        self.calls.append(len(images))
+        if len(self.calls) == self.fail_on_call:
+            raise KeyboardInterrupt
+        return [
+            {
+                "num_detections": np.array([2], dtype=np.float32),
+                # ymin, xmin, ymax, xmax, normalized
+                "detection_boxes": np.array([[[0, 0, 0.5, 0.5], [0.5, 0.5, 1, 1]]], dtype=np.float32),
+                "detection_scores": np.array([[0.9, 0.3]], dtype=np.float32),
+                "detection_classes": np.array([[2, 1]], dtype=np.float32),
+            }
+            for _im in images
+        ]
+
+    def detect_batch(self, images, batch_size):
+        output_dict = stack_outputs(self.detect_raw(images, batch_size))
+        image_sizes = [(im.shape[1], im.shape[0]) for im in images]
+        return list(zip(*post_process_batch(output_dict, image_sizes, self.score_threshold, self.objIds)))
+
+
+def write_images(root, n_images):
+    root.mkdir()
+    for i in range(n_images):
+        cv2.imwrite(str(root / f"img_{i}.png"), np.full((40, 80, 3), i, dtype=np.uint8))
+
+
+def test_prelabel_writes_yolo_lines_and_skips_annotated_images(tmp_path):
+    root = tmp_path / "images"
+    write_images(root, 3)
+    (root / "YOLO_darknet").mkdir()
+    (root / "YOLO_darknet" / "img_1.txt").write_text("0 0.5 0.5 0.1 0.1\n")
+
+    detector = FakeDetector()
+    assert prelabel_folder(root, detector, [1, 2], batch_size=2, progress=False) == (2, 2, 1)
+    assert detector.calls == [2]
+    # object id 2 is the second of OBJECT_IDS -> class 1
+    assert (root / "YOLO_darknet" / "img_0.txt").read_text() == "1 0.25 0.25 0.5 0.5\n"
+    assert (root / "YOLO_darknet" / "img_1.txt").read_text() == "0 0.5 0.5 0.1 0.1\n"
+    assert load_checkpoint(root / CHECKPOINT_FILE_NAME).keys() == {"img_0.png", "img_2.png"}
+
+
+def test_prelabel_drops_detections_past_the_class_list(tmp_path):
+    root = tmp_path / "images"
+    write_images(root, 1)
+    # object id 2 would be class 1 of a one-class list
+    assert prelabel_folder(root, FakeDetector(), None, progress=False, n_classes=1) == (1, 0, 0)
+    assert (root / "YOLO_darknet" / "img_0.txt").read_text() == ""
+
+
+def test_prelabel_collects_results(tmp_path):
+    root = tmp_path / "images"
+    write_images(root, 3)
+    results = ColumnarResults()
+    assert prelabel_folder(root, FakeDetector(), None, batch_size=2, progress=False, results=results) == (3, 3, 0)
+    columns = results.columns()
+    assert columns["image_id"].tolist() == [0, 1, 2]
+    assert columns["category_id"].tolist() == [2, 2, 2]
+    assert columns["bbox"].tolist() == [[0, 0, 40, 20]] * 3
+
+
+def test_result_image_ids_index_the_given_image_list(tmp_path):
+    root = tmp_path / "images"
+    write_images(root, 3)
+    img_paths = [root / "img_2.png", root / "img_0.png"]
+    results = ColumnarResults()
+    prelabel_folder(root, FakeDetector(), None, batch_size=2, progress=False, results=results, img_paths=img_paths)
+    assert results.columns()["image_id"].tolist() == [0, 1]
+    assert load_checkpoint(root / CHECKPOINT_FILE_NAME).keys() == {"img_0.png", "img_2.png"}
+
+
+def test_prelabel_resumes_after_interruption(tmp_path):
+    root = tmp_path / "images"
+    write_images(root, 5)
+    with pytest.raises(KeyboardInterrupt):
+        prelabel_folder(root, FakeDetector(fail_on_call=2), None, batch_size=2, progress=False)
+    assert len(load_checkpoint(root / CHECKPOINT_FILE_NAME)) == 2
+
+    detector = FakeDetector()
+    assert prelabel_folder(root, detector, None, batch_size=2, progress=False) == (3, 3, 2)
+    assert detector.calls == [2, 1]
+    # without OBJECT_IDS the class is the object id - 1
+    assert (root / "YOLO_darknet" / "img_4.txt").read_text().split()[0] == "1"
+
+
+def test_class_indices_and_config(tmp_path):
+    assert class_indices_for([3, 1], [1, 3]).tolist() == [1, 0]
+    assert class_indices_for([3, 1], None).tolist() == [2, 0]
+    # object ids past the class list (or below the first class) get no class
+    assert class_indices_for([3, 1, 0], None, n_classes=2).tolist() == [-1, 0, -1]
+    assert class_indices_for([3, 1], [1, 3], n_classes=1).tolist() == [-1, 0]
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        "[OBJECT_DETECTOR_PARAMETERS]\nOBJECT_SCORE_THRESHOLD = 0.65\nOBJECT_IDS = 1,2\nCUDA_VISIBLE_DEVICES = ''\n"
+    )
+    assert read_detector_config(config_path) == (0.65, [1, 2], "")
+
+
+def test_relabel_with_new_threshold_reuses_cached_outputs(tmp_path, monkeypatch):
+    root = tmp_path / "images"
+    write_images(root, 3)
+    cache = DetectionCache(tmp_path / "cache.sqlite", "model")
+    try:
+        detector = FakeDetector()
+        assert prelabel_folder(root, detector, None, batch_size=2, progress=False, cache=cache) == (3, 3, 0)
+        assert detector.calls == [2, 1] and len(cache) == 3
+
+        # images with cached outputs are not decoded again
+        def imdecode(*args):
+            raise AssertionError("decoded an image with cached outputs")
+
+        monkeypatch.setattr(cv2, "imdecode", imdecode)
+        detector = FakeDetector(score_threshold=0.2)
+        assert prelabel_folder(root, detector, None, batch_size=2, progress=False, cache=cache, relabel=True) == (
+            3, 6, 0
+        )
+        assert detector.calls == []
+        assert (root / "YOLO_darknet" / "img_0.txt").read_text() == "1 0.25 0.25 0.5 0.5\n0 0.75 0.75 0.5 0.5\n"
+    finally:
+        cache.close()
+
+
+def test_relabel_keeps_annotations_edited_since(tmp_path):
+    root = tmp_path / "images"
+    write_images(root, 3)
+    assert prelabel_folder(root, FakeDetector(), None, batch_size=2, progress=False) == (3, 3, 0)
+    # corrected in the GUI after pre-labelling
+    (root / "YOLO_darknet" / "img_1.txt").write_text("0 0.5 0.5 0.1 0.1\n")
+
+    assert prelabel_folder(root, FakeDetector(score_threshold=0.2), None, batch_size=2, progress=False, relabel=True) == (
+        2, 4, 1
+    )
+    assert (root / "YOLO_darknet" / "img_1.txt").read_text() == "0 0.5 0.5 0.1 0.1\n"
+    assert len((root / "YOLO_darknet" / "img_2.txt").read_text().splitlines()) == 2
+    # relabelled files are recorded again, so a further relabel still overwrites them
+    assert prelabel_folder(root, FakeDetector(), None, batch_size=2, progress=False, relabel=True)[0] == 2
@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+
+from object_detection.utils import ColumnarResults, format_results, read_npz_results
+
+
+def test_coco_json_matches_format_results(tmp_path):
+    rng = np.random.default_rng(0)
+    boxes = [rng.random((n, 4), dtype=np.float32) * 100 for n in (3, 0, 5)]
+    scores = [rng.random(n, dtype=np.float32) for n in (3, 0, 5)]
+    expected = []
+    results = ColumnarResults()
+    for image_id, (image_boxes, image_scores) in enumerate(zip(boxes, scores)):
+        expected += format_results(image_boxes, image_scores, image_id, 7)
+        results.add(image_boxes, image_scores, image_id, 7)
+    assert len(results) == 8
+
+    results.write(tmp_path / "results.json")
+    assert (tmp_path / "results.json").read_text() == json.dumps(expected)
+
+
+def test_npz_columns_and_empty_results(tmp_path):
+    results = ColumnarResults()
+    results.add(np.array([[1, 2, 3, 4], [5, 6, 7, 8]]), np.array([0.9, 0.6]), 4, np.array([1, 3]))
+    results.write(tmp_path / "results.npz", file_names=np.array(["a.jpg"]))
+    columns = read_npz_results(tmp_path / "results.npz")
+    assert columns["image_id"].tolist() == [4, 4]
+    assert columns["category_id"].tolist() == [1, 3]
+    assert columns["bbox"].tolist() == [[1, 2, 3, 4], [5, 6, 7, 8]]
+    assert columns["file_names"].tolist() == ["a.jpg"]
+
+    ColumnarResults().write(tmp_path / "empty.json")
+    assert json.loads((tmp_path / "empty.json").read_text()) == []
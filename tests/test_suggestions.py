@@ -0,0 +1,146 @@
+import threading
+
+import cv2
+import numpy as np
+
+from open_labeling.suggestions import (
+    BoxPropagator,
+    DetectorSuggester,
+    SuggestionStore,
+    detections_to_objects,
+    neighbour_images,
+    next_still_images,
+)
+from open_labeling.tracking import LabelTracker
+
+
+def write_photos(photo_dir, n_photos=5, step=3):
+    photo_dir.mkdir()
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)
+    texture = rng.integers(0, 255, (30, 30, 3), dtype=np.uint8)
+    paths = []
+    for i in range(n_photos):
+        frame = background.copy()
+        x = 40 + step * i
+        frame[40:70, x:x + 30] = texture
+        path = photo_dir / f"Photo_{i}.png"
+        cv2.imwrite(str(path), frame)
+        paths.append(path)
+    return paths
+
+
+def test_propagator_suggests_boxes_on_following_photos(tmp_path):
+    paths = write_photos(tmp_path / "photos")
+    store = SuggestionStore()
+    propagator = BoxPropagator(
+        store,
+        lambda init_frame, frame_paths: LabelTracker("MIL", init_frame, frame_paths),
+        has_annotations=lambda img_path: img_path == paths[2],
+    )
+    try:
+        propagator.submit(paths[0], cv2.imread(str(paths[0])), [[2, 40, 40, 70, 70]], paths[1:])
+        propagator.wait()
+    finally:
+        propagator.close()
+
+    # the already annotated photo gets no suggestion, the ones after it do
+    assert store.get(paths[2]) == []
+    for i in (1, 3, 4):
+        [[class_index, xmin, ymin, xmax, ymax]] = store.get(paths[i])
+        assert class_index == 2
+        assert abs(xmin - (40 + 3 * i)) <= 4 and abs(ymin - 40) <= 4
+        assert abs((xmax - xmin) - 30) <= 4
+    assert store.pop(paths[1]) and store.get(paths[1]) == []
+
+
+def test_next_still_images_stops_at_video_frames():
+    paths = ["a.jpg", "b.jpg", "clip_mp4/clip_mp4_0.jpg", "c.jpg"]
+
+    def is_video_frame(path):
+        return path.startswith("clip_mp4")
+
+    assert next_still_images(paths, 0, 5, is_video_frame) == ["b.jpg"]
+    assert next_still_images(paths, 2, 5, is_video_frame) == ["c.jpg"]
+    assert next_still_images(paths, 0, 0, is_video_frame) == []
+
+
+class FakeDetector:
+    """
+    Finds an object (id 1) in the top-left corner of every image; blocks
+    on `gate` before detecting and calls `on_detect` if given.
+    """
+
+    def __init__(self, gate=None, on_detect=None):
+        self.gate = gate
+        self.on_detect = on_detect
+        self.n_calls = 0
+
+    def detect(self, im):
+        self.n_calls += 1
+        if self.gate is not None:
+            self.gate.wait()
+        if self.on_detect is not None:
+            self.on_detect()
+        return np.array([[1.4, 2, 10, 20.6]]), np.array([0.9]), np.array([1])
+
+
+def make_suggester(store, detector, has_annotations=None):
+    return DetectorSuggester(store, lambda: detector, lambda ids: np.asarray(ids) - 1, has_annotations)
+
+
+def test_detector_suggests_shown_image_and_neighbours(tmp_path):
+    paths = write_photos(tmp_path / "photos")
+    store = SuggestionStore()
+    detector = FakeDetector()
+    suggester = make_suggester(store, detector, has_annotations=lambda img_path: img_path == paths[1])
+    try:
+        suggester.submit(paths[2], neighbour_images(paths, 2, 1))
+        suggester.wait()
+        assert store.get(paths[2]) == [[0, 1, 2, 11, 23]] and store.get(paths[3]) == [[0, 1, 2, 11, 23]]
+        assert store.get(paths[1]) == []
+        # rejected suggestions are not detected again
+        store.pop(paths[3])
+        suggester.submit(paths[3], neighbour_images(paths, 3, 1))
+        suggester.wait()
+        assert store.get(paths[3]) == [] and store.get(paths[4]) == [[0, 1, 2, 11, 23]]
+        assert detector.n_calls == 3
+    finally:
+        suggester.close()
+
+
+def test_detector_discards_results_once_the_user_moved_on(tmp_path):
+    paths = write_photos(tmp_path / "photos")
+    store = SuggestionStore()
+    gate = threading.Event()
+    suggester = make_suggester(store, FakeDetector(gate))
+    try:
+        suggester.submit(paths[0], paths[1:3])
+        suggester.submit(paths[4], [])  # queued while the first image is being detected
+        gate.set()
+        suggester.wait()
+        assert store.get(paths[0]) == [] and store.get(paths[1]) == []
+        assert store.get(paths[4]) == [[0, 1, 2, 11, 23]]
+    finally:
+        suggester.close()
+
+
+def test_detector_drops_results_of_an_image_annotated_while_the_model_ran(tmp_path):
+    paths = write_photos(tmp_path / "photos")
+    store = SuggestionStore()
+    annotated = set()
+    detector = FakeDetector(on_detect=lambda: annotated.add(paths[0]))
+    suggester = make_suggester(store, detector, has_annotations=lambda img_path: img_path in annotated)
+    try:
+        suggester.submit(paths[0], [])
+        suggester.wait()
+        assert detector.n_calls == 1 and store.get(paths[0]) == []
+    finally:
+        suggester.close()
+
+
+def test_detections_to_objects_and_neighbours():
+    objects = detections_to_objects(np.array([[1, 2, 3, 4], [5, 6, 7, 8]]), np.array([2, -1]))
+    assert objects == [[2, 1, 2, 4, 6]]
+    assert detections_to_objects(np.empty((0, 4)), np.empty(0)) == []
+    assert neighbour_images(list("abcde"), 1, 2) == ["c", "a", "d"]
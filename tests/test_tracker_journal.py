@@ -0,0 +1,88 @@
+import json
+
+from open_labeling.tracker_journal import TrackerJournal
+
+
+def test_journal_replay_and_compaction(tmp_path):
+    json_file_path = tmp_path / ".tracker" / "video_mp4.json"
+    journal = TrackerJournal(json_file_path)
+    assert not journal.file_exists
+
+    journal.add_object("frame_0.jpg", 0, 0, [1, 10, 10, 50, 50])
+    journal.add_object("frame_1.jpg", 0, 1, [1, 12, 10, 52, 50])
+    journal.set_n_anchor_ids(1)
+    journal.flush()
+    assert not json_file_path.exists()
+
+    journal.set_class("frame_1.jpg", 0, 3)
+    journal.set_bbox("frame_0.jpg", 0, 11, 11, 51, 51)
+    journal.flush()
+
+    reloaded = TrackerJournal(json_file_path)
+    assert reloaded.file_exists
+    assert reloaded.n_anchor_ids == 1
+    assert reloaded.get_object("frame_1.jpg", 0)["class_index"] == 3
+    assert reloaded.get_object("frame_0.jpg", 0)["bbox"] == {"xmin": 11, "ymin": 11, "xmax": 51, "ymax": 51}
+
+    reloaded.remove_object("frame_1.jpg", 0)
+    reloaded.close()
+    assert (tmp_path / ".tracker" / "video_mp4.json.journal").read_text() == ""
+    snapshot = json.loads(json_file_path.read_text())
+    assert snapshot["frame_data_dict"]["frame_1.jpg"] == []
+
+    again = TrackerJournal(json_file_path)
+    assert again.data == reloaded.data
+
+
+def test_journal_ignores_records_already_in_snapshot(tmp_path):
+    json_file_path = tmp_path / "video.json"
+    journal = TrackerJournal(json_file_path)
+    journal.add_object("frame_0.jpg", 0, 0, [0, 1, 1, 5, 5])
+    journal.flush()
+    stale_journal = (tmp_path / "video.json.journal").read_text()
+    journal.compact()
+    # simulate a crash after the snapshot was written but before the journal was emptied
+    (tmp_path / "video.json.journal").write_text(stale_journal)
+
+    reloaded = TrackerJournal(json_file_path)
+    assert len(reloaded.object_list("frame_0.jpg")) == 1
+
+
+def test_journal_records_after_a_torn_line_survive(tmp_path):
+    json_file_path = tmp_path / "video.json"
+    journal = TrackerJournal(json_file_path)
+    journal.add_object("frame_0.jpg", 0, 0, [0, 1, 1, 5, 5])
+    journal.flush()
+    with open(tmp_path / "video.json.journal", "a") as f:
+        f.write('{"op": "add", "pa')  # crash in the middle of a write
+
+    reloaded = TrackerJournal(json_file_path)
+    reloaded.add_object("frame_1.jpg", 0, 1, [0, 2, 2, 6, 6])
+    reloaded.flush()
+
+    again = TrackerJournal(json_file_path)
+    assert len(again.object_list("frame_0.jpg")) == 1
+    assert len(again.object_list("frame_1.jpg")) == 1
+
+
+def test_track_index_follows_edits(tmp_path):
+    json_file_path = tmp_path / "video.json"
+    journal = TrackerJournal(json_file_path)
+    for frame in range(3):
+        journal.add_object(f"frame_{frame}.jpg", 0, frame, [1, frame, 0, frame + 10, 10])
+    journal.add_object("frame_1.jpg", 1, 0, [2, 0, 0, 5, 5])
+    journal.remove_object("frame_2.jpg", 0)
+    journal.flush()
+
+    assert sorted(journal.track(0)) == ["frame_0.jpg", "frame_1.jpg"]
+    assert journal.find_object("frame_1.jpg", [2, 0, 0, 5, 5])["anchor_id"] == 1
+    assert journal.find_object("frame_1.jpg", [1, 0, 0, 5, 5]) is None
+    # a box read back from its YOLO line may be a pixel off
+    assert journal.find_object("frame_1.jpg", [2, 0, 1, 5, 4])["anchor_id"] == 1
+    assert journal.find_object("frame_1.jpg", [2, 0, 2, 5, 5]) is None
+
+    reloaded = TrackerJournal(json_file_path)
+    assert reloaded.track(0).keys() == journal.track(0).keys()
+    assert reloaded.get_object("frame_0.jpg", 0) is reloaded.object_list("frame_0.jpg")[0]
+    reloaded.compact()
+    assert TrackerJournal(json_file_path).track(1)["frame_1.jpg"]["class_index"] == 2
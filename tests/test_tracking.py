@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+import pytest
+
+from open_labeling.tracker_journal import TrackerJournal
+from open_labeling.tracking import available_tracker_types, create_opencv_tracker, track_video, tracker_json_path
+from open_labeling.yolo_annotations import read_yolo_file, yolo_format
+
+
+def write_moving_square_video(video_dir, n_frames=6, step=3, size=(160, 120), box_size=(30, 30), origin=(40, 40)):
+    video_dir.mkdir()
+    rng = np.random.default_rng(0)
+    width, height = size
+    box_width, box_height = box_size
+    x0, y0 = origin
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    texture = rng.integers(0, 255, (box_height, box_width, 3), dtype=np.uint8)
+    for i in range(n_frames):
+        frame = background.copy()
+        x = x0 + step * i
+        frame[y0:y0 + box_height, x:x + box_width] = texture
+        cv2.imwrite(str(video_dir / f"frame_{i}.png"), frame)
+    (video_dir / "YOLO_darknet").mkdir()
+    # seed: the square on the first frame, class 2
+    (video_dir / "YOLO_darknet" / "frame_0.txt").write_text(
+        yolo_format(2, (x0, y0), (x0 + box_width, y0 + box_height), width, height) + "\n"
+    )
+
+
+def test_track_video_propagates_seeds_once(tmp_path):
+    video_dir = tmp_path / "clip"
+    write_moving_square_video(video_dir)
+    tracker_dir = tmp_path / ".tracker"
+
+    assert track_video((video_dir, tracker_dir, "MIL", 200, 1, None, "torch")) == ("clip", 1, 5)
+    rows = read_yolo_file(video_dir / "YOLO_darknet" / "frame_5.txt")
+    assert rows.shape == (1, 5) and rows[0, 0] == 2
+    assert abs(rows[0, 1] - (40 + 15 + 15) / 160) < 0.05
+
+    journal = TrackerJournal(tracker_json_path(tracker_dir, "clip"))
+    assert journal.n_anchor_ids == 1
+    assert len(journal.track(0)) == 6
+
+    # a second run finds every box already tracked and adds nothing
+    assert track_video((video_dir, tracker_dir, "MIL", 200, 1, None, "torch")) == ("clip", 0, 0)
+    assert len(read_yolo_file(video_dir / "YOLO_darknet" / "frame_5.txt")) == 1
+
+
+def test_track_video_does_not_reseed_boxes_that_do_not_round_trip(tmp_path):
+    # at this size and with odd box sizes, pixel boxes read back from YOLO lines are often a pixel off
+    video_dir = tmp_path / "clip"
+    write_moving_square_video(video_dir, n_frames=8, step=7, size=(1280, 720), box_size=(67, 17), origin=(917, 474))
+    tracker_dir = tmp_path / ".tracker"
+
+    assert track_video((video_dir, tracker_dir, "MIL", 200, 1, None, "torch")) == ("clip", 1, 7)
+    assert len(read_yolo_file(video_dir / "YOLO_darknet" / "frame_7.txt")) == 1
+    assert TrackerJournal(tracker_json_path(tracker_dir, "clip")).n_anchor_ids == 1
+
+
+def test_reduced_scale_tracking_saves_full_resolution_boxes(tmp_path):
+    video_dir = tmp_path / "clip"
+    write_moving_square_video(video_dir)
+    for png_path in video_dir.glob("*.png"):
+        cv2.imwrite(str(png_path.with_suffix(".jpg")), cv2.imread(str(png_path)), [cv2.IMWRITE_JPEG_QUALITY, 98])
+        png_path.unlink()
+
+    assert track_video((video_dir, tmp_path / ".tracker", "MIL", 200, 2, None, "torch")) == ("clip", 1, 5)
+    journal = TrackerJournal(tracker_json_path(tmp_path / ".tracker", "clip"))
+    bbox = journal.get_object(video_dir / "frame_5.jpg", 0)["bbox"]
+    assert abs(bbox["xmin"] - 55) <= 4 and abs(bbox["xmax"] - bbox["xmin"] - 30) <= 4
+
+
+def test_opencv_trackers_are_found_in_main_or_legacy_module():
+    tracker_types = available_tracker_types()
+    assert "KCF" in tracker_types
+    for tracker_type in tracker_types:
+        if tracker_type != "GOTURN":
+            assert create_opencv_tracker(tracker_type) is not None
+    with pytest.raises(KeyError):
+        create_opencv_tracker("UNKNOWN")
+
+
+def test_track_video_reads_frames_from_a_video_file(tmp_path):
+    write_moving_square_video(tmp_path / "frames")
+    video_path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(video_path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    for i in range(6):
+        writer.write(cv2.imread(str(tmp_path / "frames" / f"frame_{i}.png")))
+    writer.release()
+    (tmp_path / "clip_avi" / "YOLO_darknet").mkdir(parents=True)
+    (tmp_path / "clip_avi" / "YOLO_darknet" / "clip_avi_0.txt").write_text("2 0.34375 0.458333 0.1875 0.25\n")
+
+    assert track_video((video_path, tmp_path / ".tracker", "MIL", 200, 1, None, "torch")) == ("clip_avi", 1, 5)
+    assert len(read_yolo_file(tmp_path / "clip_avi" / "YOLO_darknet" / "clip_avi_5.txt")) == 1
+    assert not (tmp_path / "clip_avi" / "clip_avi_5.jpg").exists()
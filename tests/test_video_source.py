@@ -0,0 +1,141 @@
+import cv2
+import numpy as np
+
+from open_labeling.frame_pipeline import read_frame
+from open_labeling.video_source import SEEK_INTERVAL, VideoSource, get_video_frame, open_video, seek_frame
+
+
+def write_numbered_video(video_path, n_frames=80, width=64, height=48):
+    writer = cv2.VideoWriter(str(video_path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (width, height))
+    for i in range(n_frames):
+        writer.write(np.full((height, width, 3), 3 * i, dtype=np.uint8))
+    writer.release()
+
+
+def frame_number(frame):
+    return int(round(frame.mean() / 3))
+
+
+def test_video_source_random_access(tmp_path):
+    video_path = tmp_path / "clip.avi"
+    write_numbered_video(video_path)
+    source = VideoSource(video_path, cache_size=8)
+    assert source.n_frames == 80
+    assert (source.width, source.height) == (64, 48)
+    assert source.frame_path(5) == tmp_path / "clip_avi" / "clip_avi_5.jpg"
+    assert source.frame_index(tmp_path / "clip_avi" / "clip_avi_12.jpg") == 12
+    assert source.frame_index(tmp_path / "other" / "clip_avi_12.jpg") is None
+
+    assert [frame_number(source.read(i)) for i in range(10)] == list(range(10))
+    assert source.n_seeks == 0
+    # stepping backwards seeks once to the seek point and then hits the cache
+    assert frame_number(source.read(70)) == 70
+    n_seeks = source.n_seeks
+    assert [frame_number(source.read(i)) for i in range(69, SEEK_INTERVAL * 2 - 1, -1)] == list(
+        range(69, SEEK_INTERVAL * 2 - 1, -1)
+    )
+    assert source.n_seeks == n_seeks
+    assert source.read(80) is None
+
+    # frames handed out are copies
+    frame = source.read(69)
+    frame[:] = 0
+    assert frame_number(source.read(69)) == 69
+    source.release()
+
+
+def test_virtual_frame_paths_are_read_through_the_frame_loader(tmp_path):
+    video_path = tmp_path / "clip.avi"
+    write_numbered_video(video_path, n_frames=20)
+    source = open_video(video_path)
+    frame_path = source.frame_paths()[13]
+    assert not frame_path.exists()
+    assert get_video_frame(frame_path) == (source, 13)
+    assert frame_number(read_frame(frame_path)) == 13
+    assert read_frame(frame_path, scale=2).shape == (24, 32, 3)
+
+
+class InexactSeekCapture:
+    """
+    A capture of frames numbered 0..n-1 at 25 fps whose CAP_PROP_POS_FRAMES
+    seeks land on the previous keyframe (every 10th frame), or the next one
+    if `late`, as with some inter-frame codecs. Like the FFmpeg backend it
+    reports the requested position back; CAP_PROP_POS_MSEC is the
+    timestamp of the frame grabbed last.
+    """
+
+    def __init__(self, n_frames=50, late=False):
+        self.n_frames = n_frames
+        self.late = late
+        self.position = 0
+        self.requested = 0
+        self.n_grabs = 0
+
+    def set(self, prop, value):
+        self.requested = int(value)
+        keyframe = self.requested - self.requested % 10
+        if self.late and keyframe < self.requested:
+            keyframe += 10
+        self.position = min(keyframe, self.n_frames)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return 25.0
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return (self.position - 1) * 40.0
+        return self.requested
+
+    def grab(self):
+        if self.position >= self.n_frames:
+            return False
+        self.position += 1
+        self.n_grabs += 1
+        return True
+
+    def read(self):
+        index = self.position
+        return self.grab(), index
+
+
+def test_seek_frame_checks_the_decoded_timestamp():
+    cap = InexactSeekCapture()
+    assert seek_frame(cap, 37) and cap.read()[1] == 37
+    # decoded forward from the keyframe, not from the start
+    assert cap.n_grabs <= 10
+    assert seek_frame(cap, 20) and cap.read()[1] == 20
+    assert not seek_frame(cap, 60)
+
+    cap = InexactSeekCapture(late=True)
+    assert seek_frame(cap, 37) and cap.read()[1] == 37
+    assert seek_frame(cap, 0) and cap.read()[1] == 0
+
+
+def write_mp4v_video(video_path, n_frames=100):
+    """
+    An inter-frame coded clip; returns its frames as decoded sequentially.
+    """
+    writer = cv2.VideoWriter(str(video_path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (64, 48))
+    rng = np.random.default_rng(0)
+    for i in range(n_frames):
+        frame = np.full((48, 64, 3), 2 * i, dtype=np.uint8)
+        frame[:, :16] = rng.integers(0, 255, (48, 16, 3), dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    cap = cv2.VideoCapture(str(video_path))
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_random_access_in_an_inter_frame_coded_video(tmp_path):
+    video_path = tmp_path / "clip.mp4"
+    frames = write_mp4v_video(video_path)
+    source = VideoSource(video_path, cache_size=4)
+    for index in (90, 37, 5, 64, 63):
+        assert np.array_equal(source.read(index), frames[index])
+    source.release()
@@ -0,0 +1,52 @@
+import numpy as np
+
+from open_labeling.yolo_annotations import (
+    load_yolo_annotations,
+    parse_yolo_text,
+    yolo_format,
+    yolo_line_positions,
+    yolo_to_pixel_boxes,
+)
+
+
+def test_parse_yolo_text_ignores_blank_lines_and_extra_columns():
+    text = "0 0.5 0.5 0.2 0.4\n\n3 0.1 0.2 0.3 0.4 0.99\n"
+    rows = parse_yolo_text(text)
+    assert rows.shape == (2, 5)
+    assert rows[1].tolist() == [3.0, 0.1, 0.2, 0.3, 0.4]
+
+
+def test_parse_yolo_text_drops_short_lines_even_when_token_count_balances():
+    # 4 + 6 tokens: as many as two good lines, but the rows must not shift
+    rows = parse_yolo_text("1 0.5 0.5 0.2\n2 0.1 0.2 0.3 0.4 0.9\n")
+    assert rows.tolist() == [[2.0, 0.1, 0.2, 0.3, 0.4]]
+
+
+def test_yolo_line_positions_match_the_parsed_rows():
+    lines = ["1 0.5 0.5 0.2\n", "\n", "2 0.1 0.2 0.3 0.4 0.9\n", "3 0.5 0.5 0.1 0.1\n"]
+    rows = parse_yolo_text("".join(lines))
+    positions = yolo_line_positions(lines)
+    assert positions == [2, 3]
+    assert [int(row[0]) for row in rows] == [int(lines[i].split()[0]) for i in positions]
+
+
+def test_yolo_to_pixel_boxes_round_trips_yolo_format():
+    line = yolo_format(2, (10, 20), (110, 70), 640, 480)
+    class_indices, boxes = yolo_to_pixel_boxes(parse_yolo_text(line), 640, 480)
+    assert class_indices.tolist() == [2]
+    assert boxes.tolist() == [[10, 20, 110, 70]]
+
+
+def test_load_yolo_annotations(tmp_path):
+    ann_dir = tmp_path / "YOLO_darknet"
+    ann_dir.mkdir()
+    (ann_dir / "img_1.txt").write_text("0 0.5 0.5 0.2 0.4\n1 0.1 0.1 0.1 0.1\n")
+    (ann_dir / "img_2.txt").write_text("")
+    (ann_dir / "img_10.txt").write_text("2 0.3 0.3 0.3 0.3\n")
+
+    annotations = load_yolo_annotations(tmp_path)
+    assert [p.name for p in annotations.annotation_paths] == ["img_1.txt", "img_2.txt", "img_10.txt"]
+    assert annotations.offsets.tolist() == [0, 2, 2, 3]
+    assert annotations.records["image_id"].tolist() == [0, 0, 2]
+    assert annotations.records["class_index"].tolist() == [0, 1, 2]
+    assert np.allclose(annotations.image_records(2)["w"], [0.3])